@@ -40,6 +40,24 @@ class Extension(ext.Extension):
         schema["auto_setup"] = config.Boolean()
         schema["auto_set_repeat"] = config.Deprecated()
         schema["cache_time_to_live"] = config.Integer(minimum=0)
+        schema["cache_max_stale"] = config.Integer(minimum=0)
+        schema["persistent_cache"] = config.Boolean()
+        schema["auth_token_lifetime"] = config.Integer(minimum=0)
+        schema["playlist_prefetch_threshold"] = config.Integer(minimum=0)
+        schema["audio_url_lifetime"] = config.Integer(minimum=0)
+        schema["http_pool_connections"] = config.Integer(minimum=1)
+        schema["http_pool_maxsize"] = config.Integer(minimum=1)
+        schema["http_keep_alive"] = config.Boolean()
+        schema["http_tcp_nodelay"] = config.Boolean()
+        schema["api_retries"] = config.Integer(minimum=0)
+        schema["circuit_breaker_threshold"] = config.Integer(minimum=0)
+        schema["circuit_breaker_reset_timeout"] = config.Integer(minimum=1)
+        schema["asyncio_api_enabled"] = config.Boolean()
+        schema["check_upcoming_tracks"] = config.Boolean()
+        schema["lookahead_tracks"] = config.Integer(minimum=1)
+        schema["image_cache_size"] = config.Integer(minimum=0)
+        schema["tracing_file"] = config.Path(optional=True)
+        schema["tracing_otlp_endpoint"] = config.String(optional=True)
         schema["event_support_enabled"] = config.Boolean()
         schema["double_click_interval"] = config.String()
         schema["on_pause_resume_click"] = config.String(
@@ -87,7 +105,9 @@ class Extension(ext.Extension):
     def setup(self, registry):
         from .backend import PandoraBackend  # noqa: PLC0415
         from .frontend import EventMonitorFrontend, PandoraFrontend  # noqa: PLC0415
+        from .web import factory  # noqa: PLC0415
 
         registry.add("backend", PandoraBackend)
         registry.add("frontend", PandoraFrontend)
         registry.add("frontend", EventMonitorFrontend)
+        registry.add("http:app", {"name": self.ext_name, "factory": factory})
@@ -0,0 +1,378 @@
+import asyncio
+import logging
+import socket
+import threading
+
+import httpx
+import requests
+from pandora import errors
+from pandora.models.ad import AdItem
+from pandora.models.bookmark import BookmarkList
+from pandora.models.playlist import Playlist
+from pandora.models.search import SearchResult
+from pandora.models.station import GenreStationList, Station, StationList
+from pandora.transport import DEFAULT_API_HOST
+
+from mopidy_pandora import metrics, tracing
+from mopidy_pandora.client import MopidyAPITransport
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopThread(threading.Thread):
+    """Daemon thread that runs an asyncio event loop forever.
+
+    :param name: the name of the thread.
+    """
+
+    def __init__(self, name="PandoraEventLoop"):
+        super().__init__(name=name, daemon=True)
+        self.loop = asyncio.new_event_loop()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+
+    def submit(self, coro):
+        """Schedule a coroutine to be run on the event loop.
+
+        :param coro: the coroutine to run.
+        :return: a :class:`concurrent.futures.Future` for the coroutine's result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout=None):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(timeout)
+
+
+class AsyncAPITransport(MopidyAPITransport):
+    """Pandora API transport that performs all HTTP requests on a dedicated
+    asyncio event loop.
+
+    The coroutine :meth:`call` can be used to make concurrent API calls. The
+    transport remains a drop-in replacement for the blocking
+    :class:`pandora.transport.APITransport`: calling it directly blocks until
+    the request has been completed on the event loop.
+
+    All requests are made with HTTPX, so the requests connection pool of
+    :class:`MopidyAPITransport` is not set up.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        cryptor,
+        api_host=DEFAULT_API_HOST,
+        proxy=None,
+        *,
+        pool_connections=10,
+        pool_maxsize=10,
+        keep_alive=True,
+        tcp_nodelay=True,
+    ):
+        # Skip MopidyAPITransport.__init__, which mounts the pooled requests
+        # adapters that this transport does not use.
+        super(MopidyAPITransport, self).__init__(cryptor, api_host, proxy)
+
+        socket_options = []
+        if tcp_nodelay:
+            socket_options.append((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1))
+        if keep_alive:
+            socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+        limits = httpx.Limits(
+            max_connections=pool_connections * pool_maxsize,
+            max_keepalive_connections=pool_maxsize if keep_alive else 0,
+        )
+        if proxy and "://" not in proxy:
+            proxy = f"http://{proxy}"
+
+        self._client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                limits=limits,
+                proxy=proxy,
+                retries=0,
+                socket_options=socket_options,
+            ),
+            headers={"User-agent": "pianobar-2022.04.01"},
+            timeout=self.TIMEOUT,
+        )
+
+        self.loop_thread = EventLoopThread()
+        self.loop_thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine to be run on the transport's event loop.
+
+        :param coro: the coroutine to run.
+        :return: a :class:`concurrent.futures.Future` for the coroutine's result.
+        """
+        return self.loop_thread.submit(coro)
+
+    def _run_blocking(self, coro):
+        if threading.current_thread() is self.loop_thread:
+            coro.close()
+            msg = "Blocking Pandora API calls cannot be made from the event loop."
+            raise RuntimeError(msg)
+        return self.submit(coro).result()
+
+    def __call__(self, method, **data):
+        return self._run_blocking(self.call(method, **data))
+
+    def test_url(self, url):
+        return self._run_blocking(self.test_url_async(url))
+
+    def close(self):
+        self._run_blocking(self._client.aclose())
+        self.loop_thread.stop()
+
+    async def call(self, method, **data):
+        """Call a Pandora API method.
+
+        :param method: the name of the Pandora API method to call.
+        :param data: the parameters to pass to the API method.
+        :return: the ``result`` part of the Pandora server's response.
+        """
+        self._start_request(method)
+
+        url = self._build_url(method)
+        data = self._build_data(method, data)
+        params = self._build_params(method)
+        result = await self._make_async_http_request(url, data, params)
+
+        return self._parse_response(result)
+
+    async def _make_async_http_request(self, url, data, params):
+        try:
+            response = await self._client.post(
+                url, content=data, params=self.remove_empty_values(params)
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise _as_request_exception(exc) from exc
+        return response.content
+
+    async def test_url_async(self, url):
+        try:
+            response = await self._client.head(url)
+        except httpx.HTTPError as exc:
+            raise _as_request_exception(exc) from exc
+        return response.status_code == httpx.codes.OK
+
+
+def _as_request_exception(exc):
+    """Translate httpx exceptions to their requests equivalents, which is what
+    the rest of mopidy-pandora expects.
+    """
+    if isinstance(exc, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(exc))
+    if isinstance(exc, httpx.HTTPStatusError):
+        return requests.exceptions.HTTPError(str(exc))
+    if isinstance(exc, httpx.TransportError):
+        return requests.exceptions.ConnectionError(str(exc))
+    return requests.exceptions.RequestException(str(exc))
+
+
+class AsyncAPIClient:
+    """Asyncio Pandora API client.
+
+    Implements coroutine versions of the :class:`MopidyAPIClient` API calls
+    so that independent requests can be made concurrently. The models that
+    are returned are bound to the blocking ``api_client`` so that they can be
+    used like any other pydora model.
+
+    :param api_client: the :class:`MopidyAPIClient` to use for authentication
+        and to bind models to. Its transport must be an
+        :class:`AsyncAPITransport`.
+    """
+
+    def __init__(self, api_client):
+        self.api_client = api_client
+        self.transport = api_client.transport
+
+    def run(self, coro):
+        """Run a coroutine on the client's event loop from another thread.
+
+        :param coro: the coroutine to run.
+        :return: a :class:`concurrent.futures.Future` for the coroutine's result.
+        """
+        return self.transport.submit(coro)
+
+    def close(self):
+        self.transport.close()
+
+    async def __call__(self, method, **kwargs):
+        with (
+            tracing.tracer.trace_api_request(method),
+            metrics.time_api_request(method),
+        ):
+            return await self.api_client.policy.call_async(
+                method, self._call, method, **kwargs
+            )
+
+    async def _call(self, method, **kwargs):
+        auth_token = self.transport.auth_token
+        if self.api_client.needs_authentication:
+            auth_token = await asyncio.to_thread(self.api_client.ensure_authenticated)
+        try:
+            return await self.transport.call(method, **kwargs)
+        except errors.InvalidAuthToken:
+            await asyncio.to_thread(self.api_client.reauthenticate, auth_token)
+            return await self.transport.call(method, **kwargs)
+
+    async def get_station_list(self):
+        return StationList.from_json(
+            self.api_client,
+            await self("user.getStationList", includeStationArtUrl=True),
+        )
+
+    async def get_station_list_checksum(self):
+        return (await self("user.getStationListChecksum"))["checksum"]
+
+    async def get_station(self, station_token):
+        return Station.from_json(
+            self.api_client,
+            await self(
+                "station.getStation",
+                stationToken=station_token,
+                includeExtendedAttributes=True,
+            ),
+        )
+
+    async def get_genre_stations(self):
+        result, checksum = await self.get_genre_stations_response()
+        genre_stations = GenreStationList.from_json(self.api_client, result)
+        genre_stations.checksum = checksum
+        return genre_stations
+
+    async def get_genre_stations_response(self):
+        """Retrieve the genre stations and their checksum concurrently.
+
+        :return: tuple of the ``station.getGenreStations`` response and the
+            genre stations checksum.
+        """
+        return await asyncio.gather(
+            self("station.getGenreStations"), self.get_genre_stations_checksum()
+        )
+
+    async def get_genre_stations_checksum(self):
+        return (await self("station.getGenreStationsChecksum"))["checksum"]
+
+    async def get_playlist(self, station_token, additional_urls=None):
+        if additional_urls is None:
+            additional_urls = []
+
+        if isinstance(additional_urls, str):
+            msg = "Additional urls should be a list"
+            raise TypeError(msg)
+
+        urls = [getattr(url, "value", url) for url in additional_urls]
+
+        resp = await self(
+            "station.getPlaylist",
+            stationToken=station_token,
+            includeTrackLength=True,
+            xplatformAdCapable=True,
+            audioAdPodCapable=True,
+            additionalAudioUrl=",".join(urls),
+        )
+
+        for item in resp["items"]:
+            item["_paramAdditionalUrls"] = additional_urls
+
+        playlist = Playlist.from_json(self.api_client, resp)
+
+        # Retrieve the metadata for all of the advertisements concurrently.
+        ad_indexes = [i for i, track in enumerate(playlist) if track.is_ad]
+        ad_items = await asyncio.gather(
+            *(self.get_ad_item(station_token, playlist[i].ad_token) for i in ad_indexes)
+        )
+        for i, ad_item in zip(ad_indexes, ad_items, strict=True):
+            playlist[i] = ad_item
+
+        return playlist
+
+    async def get_ad_item(self, station_id, ad_token):
+        if not station_id:
+            msg = f"The 'station_id' param must be defined, got: '{station_id}'"
+            raise errors.ParameterMissing(msg)
+
+        ad_item = AdItem.from_json(
+            self.api_client, await self.get_ad_metadata(ad_token)
+        )
+        ad_item.station_id = station_id
+        ad_item.ad_token = ad_token
+        return ad_item
+
+    async def get_ad_metadata(self, ad_token):
+        return await self(
+            "ad.getAdMetadata",
+            adToken=ad_token,
+            returnAdTrackingTokens=True,
+            supportAudioAds=True,
+        )
+
+    async def get_bookmarks(self):
+        return BookmarkList.from_json(self.api_client, await self("user.getBookmarks"))
+
+    async def add_feedback(self, track_token, positive):
+        return await self(
+            "station.addFeedback", trackToken=track_token, isPositive=positive
+        )
+
+    async def sleep_song(self, track_token):
+        return await self("user.sleepSong", trackToken=track_token)
+
+    async def add_artist_bookmark(self, track_token):
+        return await self("bookmark.addArtistBookmark", trackToken=track_token)
+
+    async def add_song_bookmark(self, track_token):
+        return await self("bookmark.addSongBookmark", trackToken=track_token)
+
+    async def search(
+        self, search_text, include_near_matches=False, include_genre_stations=False
+    ):
+        return SearchResult.from_json(
+            self.api_client,
+            await self(
+                "music.search",
+                searchText=search_text,
+                includeNearMatches=include_near_matches,
+                includeGenreStations=include_genre_stations,
+            ),
+        )
+
+    async def create_station(
+        self, search_token=None, artist_token=None, track_token=None, song_token=None
+    ):
+        if search_token:
+            kwargs = {"musicToken": search_token}
+        elif artist_token:
+            kwargs = {"musicToken": artist_token, "musicType": "artist"}
+        elif song_token:
+            kwargs = {"musicToken": song_token, "musicType": "song"}
+        elif track_token:
+            kwargs = {"trackToken": track_token, "musicType": "song"}
+        else:
+            msg = "Must pass a type of token"
+            raise KeyError(msg)
+
+        return Station.from_json(
+            self.api_client, await self("station.createStation", **kwargs)
+        )
+
+    async def delete_station(self, station_token):
+        return await self("station.deleteStation", stationToken=station_token)
+
+    async def test_url(self, url):
+        return await self.transport.test_url_async(url)
+
+    async def is_playable(self, track):
+        """Check if a track's audio URL can be retrieved.
+
+        Coroutine version of ``PlaylistModel.get_is_playable()``.
+        """
+        if not track.audio_url:
+            return False
+        return await self.test_url(track.audio_url)
@@ -1,11 +1,14 @@
 import logging
 
 import pykka
+import requests
 from mopidy import backend, core
 from pandora.errors import PandoraException
 
-from mopidy_pandora import listener, utils
+from mopidy_pandora import Extension, listener, metrics, tracing, utils
 from mopidy_pandora.client import MopidyAPIClient, MopidySettingsDictBuilder
+from mopidy_pandora.feedback import FeedbackQueue
+from mopidy_pandora.images import get_image_cache
 from mopidy_pandora.library import PandoraLibraryProvider
 from mopidy_pandora.playback import PandoraPlaybackProvider
 from mopidy_pandora.uri import PandoraUri
@@ -16,6 +19,7 @@ logger = logging.getLogger(__name__)
 class PandoraBackend(
     pykka.ThreadingActor,
     backend.Backend,
+    listener.TracedListener,
     core.CoreListener,
     listener.PandoraFrontendListener,
     listener.EventMonitorListener,
@@ -23,8 +27,10 @@ class PandoraBackend(
     def __init__(self, config, audio):
         super().__init__()
         self.config = config["pandora"]
+        tracing.setup(config)
         settings = {
             "CACHE_TTL": self.config.get("cache_time_to_live"),
+            "CACHE_MAX_STALE": self.config.get("cache_max_stale"),
             "API_HOST": self.config.get("api_host"),
             "DECRYPTION_KEY": self.config["partner_decryption_key"],
             "ENCRYPTION_KEY": self.config["partner_encryption_key"],
@@ -33,33 +39,87 @@ class PandoraBackend(
             "DEVICE": self.config["partner_device"],
             "PROXY": utils.format_proxy(config["proxy"]),
             "AUDIO_QUALITY": self.config.get("preferred_audio_quality"),
+            "POOL_CONNECTIONS": self.config.get("http_pool_connections"),
+            "POOL_MAXSIZE": self.config.get("http_pool_maxsize"),
+            "KEEP_ALIVE": self.config.get("http_keep_alive"),
+            "TCP_NODELAY": self.config.get("http_tcp_nodelay"),
+            "ASYNCIO": self.config.get("asyncio_api_enabled"),
+            "AUTH_TOKEN_LIFETIME": self.config.get("auth_token_lifetime"),
+            "API_RETRIES": self.config.get("api_retries"),
+            "CIRCUIT_BREAKER_THRESHOLD": self.config.get("circuit_breaker_threshold"),
+            "CIRCUIT_BREAKER_RESET_TIMEOUT": self.config.get(
+                "circuit_breaker_reset_timeout"
+            ),
         }
+        if self.config.get("persistent_cache"):
+            settings["CACHE_DIR"] = Extension.get_cache_dir(config)
+            settings["SESSION_FILE"] = Extension.get_cache_dir(config) / "session.json"
 
         self.api = MopidySettingsDictBuilder(
             settings, client_class=MopidyAPIClient
         ).build()
         self.library = PandoraLibraryProvider(
-            backend=self, sort_order=self.config.get("sort_order")
+            backend=self,
+            sort_order=self.config.get("sort_order"),
+            prefetch_threshold=self.config.get("playlist_prefetch_threshold"),
+            audio_url_lifetime=self.config.get("audio_url_lifetime"),
+            image_cache=get_image_cache(config),
+        )
+        self.playback = PandoraPlaybackProvider(
+            audio,
+            self,
+            check_upcoming_tracks=self.config.get("check_upcoming_tracks"),
         )
-        self.playback = PandoraPlaybackProvider(audio, self)
         self.uri_schemes = [PandoraUri.SCHEME]
+        self.feedback = FeedbackQueue(
+            Extension.get_data_dir(config) / "feedback.jsonl", self._send_feedback
+        )
 
     def on_start(self):
-        self.api.login(self.config["username"], self.config["password"])
+        # Log in in the background so that a slow or failing login does not
+        # hold up Mopidy's startup. API calls wait for the login to complete.
+        self.api.set_credentials(self.config["username"], self.config["password"])
+        utils.executor.submit(self._login)
+        self.feedback.start()
+
+    def _login(self):
+        try:
+            self.api.ensure_authenticated()
+        except (PandoraException, requests.exceptions.RequestException):
+            logger.exception("Error logging in to Pandora, retrying when needed.")
+
+    def on_stop(self):
+        self.feedback.stop()
+        tracing.tracer.shutdown()
+        if self.api.aio is not None:
+            self.api.aio.close()
 
     def end_of_tracklist_reached(self, station_id=None, auto_play=False):
         self.prepare_next_track(station_id, auto_play)
 
     def prepare_next_track(self, station_id, auto_play=False):
-        self._trigger_next_track_available(
-            self.library.get_next_pandora_track(station_id), auto_play
-        )
+        with metrics.next_track_duration.time():
+            track = self.library.get_next_pandora_track(station_id)
+        if track is not None:
+            self.playback.add_upcoming_track(track.uri)
+        self._trigger_next_track_available(track, auto_play)
+
+    def track_playback_started(self, tl_track):
+        self._check_upcoming_tracks(tl_track.track)
+
+    def track_playback_resumed(self, tl_track, time_position):
+        self._check_upcoming_tracks(tl_track.track, time_position)
+
+    def _check_upcoming_tracks(self, track, time_position=0):
+        if track.uri and track.uri.startswith(f"{PandoraUri.SCHEME}:"):
+            self.playback.check_upcoming_tracks(track, time_position)
 
     def event_triggered(self, track_uri, pandora_event):
         self.process_event(track_uri, pandora_event)
 
     def process_event(self, track_uri, pandora_event):
         func = getattr(self, pandora_event)
+        metrics.events_triggered.inc(event=pandora_event)
         try:
             if pandora_event == "delete_station":
                 logger.info(
@@ -71,14 +131,23 @@ class PandoraBackend(
                     f"Triggering event {pandora_event!r} for Pandora song: "
                     f"{self.library.lookup_pandora_track(track_uri).song_name!r}"
                 )
+            if pandora_event in FeedbackQueue.ACTIONS:
+                # Sent in the background, 'event_processed' is triggered once
+                # Pandora has accepted the feedback.
+                self.feedback.put(pandora_event, track_uri)
+                return True
             func(track_uri)
             self._trigger_event_processed(track_uri, pandora_event)
-        except PandoraException:
+        except (PandoraException, requests.exceptions.RequestException):
             logger.exception(f"Error calling Pandora event: {pandora_event}.")
             return False
         else:
             return True
 
+    def _send_feedback(self, pandora_event, track_uri):
+        getattr(self, pandora_event)(track_uri)
+        self._trigger_event_processed(track_uri, pandora_event)
+
     def thumbs_up(self, track_uri):
         return self.api.add_feedback(PandoraUri.factory(track_uri).token, True)
 
@@ -0,0 +1,58 @@
+import json
+import logging
+import pathlib
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    """Persists Pandora API responses in Mopidy's cache directory so that they
+    survive restarts.
+
+    Responses are stored as JSON together with their checksum, so that the
+    API client can check if they are still up to date before rebuilding its
+    models from them.
+
+    :param cache_dir: the directory that cached responses should be stored in.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = pathlib.Path(cache_dir)
+
+    def _path(self, name):
+        return self.cache_dir / f"{name}.json"
+
+    def load(self, name):
+        """Load the response that was stored as ``name``.
+
+        :param name: the name that the response was stored as.
+        :return: a ``(response, checksum)`` tuple, or None if the response is
+            not available on disk.
+        """
+        try:
+            with self._path(name).open(encoding="utf-8") as f:
+                cached = json.load(f)
+            return cached["response"], cached["checksum"]
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception(f"Error reading Pandora {name} cache from disk.")
+            return None
+
+    def save(self, name, response, checksum):
+        """Store ``response`` on disk as ``name``, replacing any previous
+        version.
+
+        :param name: the name to store the response as.
+        :param response: the JSON response of the Pandora API call.
+        :param checksum: the checksum of the response.
+        """
+        path = self._path(name)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump({"response": response, "checksum": checksum}, f)
+            tmp_path.replace(path)
+        except Exception:
+            logger.exception(f"Error writing Pandora {name} cache to disk.")
+            tmp_path.unlink(missing_ok=True)
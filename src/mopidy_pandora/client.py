@@ -1,8 +1,12 @@
+import concurrent.futures
 import logging
+import socket
+import threading
 import time
 
 import requests
 from cachetools import TTLCache
+from pandora import errors
 from pandora.client import APIClient, BaseAPIClient
 from pandora.clientbuilder import (
     DEFAULT_API_HOST,
@@ -10,36 +14,199 @@ from pandora.clientbuilder import (
     Encryptor,
     SettingsDictBuilder,
 )
+from pandora.models.station import GenreStationList, StationList
+from requests.adapters import HTTPAdapter
+
+from mopidy_pandora import metrics, tracing, utils
+from mopidy_pandora.cache import DiskCache
+from mopidy_pandora.resilience import ResiliencePolicy
+from mopidy_pandora.session import SessionStore
+from mopidy_pandora.utils import single_flight
 
 logger = logging.getLogger(__name__)
 
 
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTP adapter that applies custom socket options to all of the
+    connections in its pool.
+
+    :param tcp_nodelay: disable Nagle's algorithm, so that small requests are
+        sent immediately.
+    :param keep_alive: enable TCP keep-alive probes on idle pooled connections.
+    """
+
+    def __init__(self, *, tcp_nodelay=True, keep_alive=True, **kwargs):
+        self.socket_options = []
+        if tcp_nodelay:
+            self.socket_options.append((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1))
+        if keep_alive:
+            self.socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs["socket_options"] = self.socket_options
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+
+class MopidyAPITransport(APITransport):
+    """Pandora API transport that re-uses pooled HTTP connections.
+
+    All API calls, as well as the checks to see if tracks are playable, share
+    the same connection pool. This avoids having to set up a new TLS
+    connection for every request.
+
+    Each request is attempted once, and fails if the Pandora server does not
+    respond within ``TIMEOUT`` seconds, so that failed calls are only retried
+    by the API client's :class:`~mopidy_pandora.resilience.ResiliencePolicy`.
+
+    :param pool_connections: the number of hosts to keep connection pools for.
+    :param pool_maxsize: the maximum number of connections to keep open to
+        each host.
+    :param keep_alive: if connections should be kept open between requests.
+    :param tcp_nodelay: if Nagle's algorithm should be disabled.
+    """
+
+    TIMEOUT = 30.0
+
+    def __init__(  # noqa: PLR0913
+        self,
+        cryptor,
+        api_host=DEFAULT_API_HOST,
+        proxy=None,
+        *,
+        pool_connections=10,
+        pool_maxsize=10,
+        keep_alive=True,
+        tcp_nodelay=True,
+    ):
+        super().__init__(cryptor, api_host, proxy)
+
+        adapter = PooledHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0,
+            tcp_nodelay=tcp_nodelay,
+            keep_alive=keep_alive,
+        )
+        self._http.mount("https://", adapter)
+        self._http.mount("http://", adapter)
+
+        if not keep_alive:
+            self._http.headers["Connection"] = "close"
+
+    def __call__(self, method, **data):
+        # Failed calls are retried by the API client's ResiliencePolicy,
+        # instead of by pydora.
+        self._start_request(method)
+
+        url = self._build_url(method)
+        data = self._build_data(method, data)
+        params = self._build_params(method)
+        result = self._make_http_request(url, data, params)
+
+        return self._parse_response(result)
+
+    def _make_http_request(self, url, data, params):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        response = self._http.post(
+            url,
+            data=data,
+            params=self.remove_empty_values(params),
+            headers={"User-agent": "pianobar-2022.04.01"},
+            timeout=self.TIMEOUT,
+        )
+        response.raise_for_status()
+        return response.content
+
+    def test_url(self, url):
+        response = self._http.head(url, timeout=self.TIMEOUT)
+        return response.status_code == requests.codes.OK
+
+
 class MopidySettingsDictBuilder(SettingsDictBuilder):
     def build_from_settings_dict(self, settings):
         enc = Encryptor(settings["DECRYPTION_KEY"], settings["ENCRYPTION_KEY"])
 
-        trans = APITransport(
+        transport_class = MopidyAPITransport
+        if settings.get("ASYNCIO"):
+            from mopidy_pandora.aioclient import AsyncAPITransport  # noqa: PLC0415
+
+            transport_class = AsyncAPITransport
+
+        trans = transport_class(
             enc,
             settings.get("API_HOST", DEFAULT_API_HOST),
             settings.get("PROXY", None),
+            pool_connections=settings.get("POOL_CONNECTIONS", 10),
+            pool_maxsize=settings.get("POOL_MAXSIZE", 10),
+            keep_alive=settings.get("KEEP_ALIVE", True),
+            tcp_nodelay=settings.get("TCP_NODELAY", True),
         )
 
         quality = settings.get("AUDIO_QUALITY", self.client_class.MED_AUDIO_QUALITY)
 
-        return self.client_class(
+        client = self.client_class(
             settings["CACHE_TTL"],
             trans,
             settings["PARTNER_USER"],
             settings["PARTNER_PASSWORD"],
             settings["DEVICE"],
             quality,
+            cache_dir=settings.get("CACHE_DIR"),
+            cache_max_stale=settings.get("CACHE_MAX_STALE", 0),
+            auth_token_lifetime=settings.get("AUTH_TOKEN_LIFETIME", 0),
+            session_file=settings.get("SESSION_FILE"),
+            policy=ResiliencePolicy(
+                retries=settings.get("API_RETRIES", 2),
+                failure_threshold=settings.get("CIRCUIT_BREAKER_THRESHOLD", 5),
+                reset_timeout=settings.get("CIRCUIT_BREAKER_RESET_TIMEOUT", 30),
+            ),
         )
 
+        if settings.get("ASYNCIO"):
+            from mopidy_pandora.aioclient import AsyncAPIClient  # noqa: PLC0415
+
+            client.aio = AsyncAPIClient(client)
+
+        return client
+
 
 class MopidyAPIClient(APIClient):
     """Pydora API Client for Mopidy-Pandora
 
-    This API client implements caching of the station list.
+    This API client implements caching of the station list. If a ``cache_dir``
+    is provided, the cached station and genre lists are also stored on disk so
+    that they can be re-used after a restart once their checksums have been
+    verified.
+
+    Cached lists that are older than ``cache_ttl`` seconds are still returned
+    for up to ``cache_max_stale`` more seconds, while they are refreshed in the
+    background.
+
+    Concurrent requests for the station and genre lists, including forced
+    refreshes, as well as identical requests for stations and search results
+    are coalesced into a single request to Pandora.
+
+    Logging in can be deferred with :meth:`set_credentials`, in which case
+    the client logs in when it is first used, or when the auth tokens are
+    older than ``auth_token_lifetime`` seconds. If a ``session_file`` is
+    provided, the auth tokens are stored in it so that they can be re-used
+    after a restart.
+
+    API calls are made according to ``policy``, a
+    :class:`~mopidy_pandora.resilience.ResiliencePolicy` that retries failed
+    calls and stops contacting Pandora while it is unavailable.
+
+    If the client was built with asyncio support, ``aio`` refers to an
+    :class:`~mopidy_pandora.aioclient.AsyncAPIClient` that can be used to make
+    concurrent API calls.
     """
 
     def __init__(  # noqa: PLR0913
@@ -50,6 +217,11 @@ class MopidyAPIClient(APIClient):
         partner_password,
         device,
         default_audio_quality=BaseAPIClient.MED_AUDIO_QUALITY,
+        cache_dir=None,
+        cache_max_stale=0,
+        auth_token_lifetime=0,
+        session_file=None,
+        policy=None,
     ):
         super().__init__(
             transport,
@@ -59,53 +231,376 @@ class MopidyAPIClient(APIClient):
             default_audio_quality,
         )
 
-        self.station_list_cache = TTLCache(1, cache_ttl)
-        self.genre_stations_cache = TTLCache(1, cache_ttl)
+        self.cache_ttl = cache_ttl
+        max_age = cache_ttl + cache_max_stale if cache_ttl > 0 else 0
+        self.station_list_cache = TTLCache(1, max_age)
+        self.genre_stations_cache = TTLCache(1, max_age)
+        # Guards the in-memory caches, which are refreshed in the background.
+        self._cache_lock = threading.Lock()
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+
+        # Stations by ID and token, for the station list that is cached in
+        # 'station_list_cache'. Also holds the stations that had to be
+        # retrieved separately because they are not part of that list.
+        self._station_index = {}
+        self._indexed_station_list = None
+
+        self.disk_cache = None
+        if cache_dir and cache_ttl > 0:
+            self.disk_cache = DiskCache(cache_dir)
 
+        self.auth_token_lifetime = auth_token_lifetime
+        self.session_store = None
+        if session_file:
+            self.session_store = SessionStore(session_file)
+        self._auth_expires_at = 0
+        self._auth_lock = threading.Lock()
+
+        self.policy = policy if policy is not None else ResiliencePolicy()
+
+        self.aio = None
+
+    def __call__(self, method, **kwargs):
+        with (
+            tracing.tracer.trace_api_request(method),
+            metrics.time_api_request(method),
+        ):
+            return self.policy.call(method, self._call, method, **kwargs)
+
+    def _call(self, method, **kwargs):
+        auth_token = self.ensure_authenticated()
+        try:
+            return self.transport(method, **kwargs)
+        except errors.InvalidAuthToken:
+            self.reauthenticate(auth_token)
+            return self.transport(method, **kwargs)
+
+    def _session_key(self):
+        return SessionStore.session_key(
+            self.transport.api_host, self.partner_user, self.username
+        )
+
+    def set_credentials(self, username, password):
+        """Set the credentials to log in to Pandora with, without logging in
+        yet. The session that was stored for this user is restored if it has
+        not expired.
+
+        :param username: the Pandora username.
+        :param password: the Pandora password.
+        """
+        self.username = username
+        self.password = password
+        self._auth_expires_at = None
+        if self.session_store is not None:
+            self._auth_expires_at = self.session_store.load(
+                self.transport, self._session_key()
+            )
+
+    @property
+    def needs_authentication(self):
+        """True if the client has credentials, but no valid auth tokens."""
+        if self.username is None:
+            return False
+        expires_at = self._auth_expires_at
+        return (
+            expires_at is None
+            or self.transport.user_auth_token is None
+            or 0 < expires_at <= time.time()
+        )
+
+    def ensure_authenticated(self):
+        """Log in to Pandora, unless the client is already logged in.
+
+        :return: the auth token that API calls will be made with.
+        """
+        if self.needs_authentication:
+            with self._auth_lock:
+                if self.needs_authentication:
+                    self._authenticate()
+        return self.transport.auth_token
+
+    def reauthenticate(self, rejected_auth_token):
+        """Log in to Pandora again after an API call was rejected, unless
+        another call has already done so in the meantime.
+
+        :param rejected_auth_token: the auth token that the call was made with.
+        """
+        with self._auth_lock:
+            if self.transport.auth_token == rejected_auth_token:
+                logger.info("Pandora auth token expired, logging in again.")
+                self._authenticate()
+
+    def _authenticate(self):
+        self._auth_expires_at = None
+        user = super()._authenticate()
+
+        self._auth_expires_at = 0
+        if self.auth_token_lifetime > 0:
+            self._auth_expires_at = time.time() + self.auth_token_lifetime
+        if self.session_store is not None:
+            self.session_store.save(
+                self.transport, self._session_key(), self._auth_expires_at
+            )
+        return user
+
+    def _get_cached(self, cache):
+        """Return the ``(fetched_at, value)`` item in ``cache``, or None if it
+        is empty.
+        """
+        with self._cache_lock:
+            return next(iter(cache.items()), None)
+
+    def _set_cached(self, cache, value):
+        # The caches only hold a single item, so this replaces the old value.
+        with self._cache_lock:
+            cache[time.time()] = value
+
+    def _restore_from_disk(self, cache, name, model_class, get_checksum):
+        """Populate an empty in-memory cache with the response that was stored
+        on disk, provided that it is still up to date.
+
+        :param cache: the in-memory cache to populate.
+        :param name: the name that the response was stored on disk as.
+        :param model_class: the model to build from the stored response.
+        :param get_checksum: function that returns the current checksum of the
+            data on the Pandora server.
+        """
+        if self.disk_cache is None or self._get_cached(cache) is not None:
+            return
+
+        cached = self.disk_cache.load(name)
+        if cached is None:
+            return
+        response, checksum = cached
+
+        try:
+            if get_checksum() != checksum:
+                return
+        except requests.exceptions.RequestException:
+            logger.warning(
+                f"Unable to verify checksum of cached Pandora {name}, "
+                "using cached version."
+            )
+
+        model = model_class.from_json(self, response)
+        model.checksum = checksum
+        self._set_cached(cache, model)
+
+    # Forced refreshes are coalesced with other calls here, as calls to
+    # get_station_list() with different arguments are not coalesced.
+    @single_flight
+    def _fetch_station_list(self):
+        response = self("user.getStationList", includeStationArtUrl=True)
+        if self.disk_cache is not None:
+            self.disk_cache.save("station_list", response, response.get("checksum"))
+        return StationList.from_json(self, response)
+
+    @single_flight
+    def _fetch_genre_stations(self):
+        if self.aio is not None:
+            # Retrieves the genre stations and their checksum concurrently.
+            response, checksum = self.aio.run(
+                self.aio.get_genre_stations_response()
+            ).result()
+        else:
+            response = self("station.getGenreStations")
+            checksum = self.get_genre_stations_checksum()
+        if self.disk_cache is not None:
+            self.disk_cache.save("genre_stations", response, checksum)
+        genre_stations = GenreStationList.from_json(self, response)
+        genre_stations.checksum = checksum
+        return genre_stations
+
+    def _revalidate_if_stale(self, cache, name, has_changed, fetch):
+        """Refresh the contents of ``cache`` in the background if they are
+        older than the cache TTL.
+
+        :param cache: the in-memory cache to refresh.
+        :param name: the name that the data is stored on disk as.
+        :param has_changed: function that accepts the cached data and returns
+            True if it has changed on the Pandora server.
+        :param fetch: function that retrieves the data from the Pandora server.
+        """
+        item = self._get_cached(cache)
+        if item is None:
+            return
+        fetched_at, cached = item
+        if time.time() - fetched_at <= self.cache_ttl:
+            return
+
+        with self._revalidating_lock:
+            if name in self._revalidating:
+                return
+            self._revalidating.add(name)
+        utils.executor.submit(self._revalidate, cache, name, cached, has_changed, fetch)
+
+    def _revalidate(self, cache, name, cached, has_changed, fetch):
+        try:
+            value = fetch() if has_changed(cached) else cached
+            self._set_cached(cache, value)
+        except (errors.PandoraException, requests.exceptions.RequestException):
+            logger.warning(
+                f"Error refreshing Pandora {name}, using cached version.",
+                exc_info=True,
+            )
+        finally:
+            with self._revalidating_lock:
+                self._revalidating.discard(name)
+
+    @single_flight
     def get_station_list(self, force_refresh=False):
         station_list = []
         try:
-            if self.station_list_cache.currsize == 0 or (
-                force_refresh
-                and next(iter(self.station_list_cache.values())).has_changed()
-            ):
-                station_list = super().get_station_list()
-                self.station_list_cache[time.time()] = station_list
+            self._restore_from_disk(
+                self.station_list_cache,
+                "station_list",
+                StationList,
+                self.get_station_list_checksum,
+            )
+            cached = self._get_cached(self.station_list_cache)
+            if cached is None or (force_refresh and cached[1].has_changed()):
+                metrics.record_cache_lookup("station_list", hit=False)
+                station_list = self._fetch_station_list()
+                self._set_cached(self.station_list_cache, station_list)
+            else:
+                metrics.record_cache_lookup("station_list", hit=True)
+                self._revalidate_if_stale(
+                    self.station_list_cache,
+                    "station_list",
+                    lambda cached: cached.has_changed(),
+                    self._fetch_station_list,
+                )
 
         except requests.exceptions.RequestException:
             logger.exception("Error retrieving Pandora station list.")
             station_list = []
 
-        try:
-            return next(iter(self.station_list_cache.values()))
-        except StopIteration:
+        cached = self._get_cached(self.station_list_cache)
+        if cached is None:
             # Cache disabled
             return station_list
+        return cached[1]
+
+    def get_playlist(self, station_token, additional_urls=None):
+        if self.aio is not None:
+            # Retrieves the metadata for all advertisements concurrently.
+            return self.aio.run(
+                self.aio.get_playlist(station_token, additional_urls)
+            ).result()
+        return super().get_playlist(station_token, additional_urls)
 
     def get_station(self, station_token):
-        try:
-            return self.get_station_list()[station_token]
-        except TypeError:
+        station = self._get_indexed_station(station_token)
+        if station is None:
             # Could not find station_token in cached list, try retrieving from
             # Pandora server.
-            return super().get_station(station_token)
+            station = self._get_station(station_token)
+            self._station_index[station_token] = station
+        return station
+
+    def get_stations(self, station_tokens):
+        """Retrieve several stations concurrently.
+
+        Stations that are not in the station list are retrieved on the
+        asyncio event loop if ``aio`` is available, or by the worker pool
+        otherwise.
 
+        :param station_tokens: the IDs or tokens of the stations to retrieve.
+        :return: dict of a :class:`concurrent.futures.Future` for each
+            station, by station ID or token.
+        """
+        station_tokens = list(station_tokens)
+        if self.aio is None:
+            if len(station_tokens) > 1:
+                # Make sure that the station list is cached, so that it is not
+                # retrieved again by every one of the concurrent lookups.
+                self.get_station_list()
+            return {
+                token: utils.executor.submit(self.get_station, token)
+                for token in station_tokens
+            }
+
+        futures = {}
+        for token in station_tokens:
+            station = self._get_indexed_station(token)
+            if station is None:
+                futures[token] = self.aio.run(self._get_station_async(token))
+            else:
+                futures[token] = concurrent.futures.Future()
+                futures[token].set_result(station)
+        return futures
+
+    def _get_indexed_station(self, station_token):
+        station_list = self.get_station_list()
+        if station_list is not self._indexed_station_list:
+            self._index_stations(station_list)
+        return self._station_index.get(station_token)
+
+    @single_flight
+    def _get_station(self, station_token):
+        return super().get_station(station_token)
+
+    async def _get_station_async(self, station_token):
+        station = await self.aio.get_station(station_token)
+        self._station_index[station_token] = station
+        return station
+
+    def _index_stations(self, station_list):
+        index = {}
+        for station in station_list:
+            index[station.id] = station
+            index[station.token] = station
+        self._station_index = index
+        self._indexed_station_list = station_list
+
+    @single_flight
     def get_genre_stations(self, force_refresh=False):
         genre_stations = []
         try:
-            if self.genre_stations_cache.currsize == 0 or (
-                force_refresh
-                and next(iter(self.genre_stations_cache.values())).has_changed()
+            self._restore_from_disk(
+                self.genre_stations_cache,
+                "genre_stations",
+                GenreStationList,
+                self.get_genre_stations_checksum,
+            )
+            cached = self._get_cached(self.genre_stations_cache)
+            if cached is None or (
+                force_refresh and self._genre_stations_changed(cached[1])
             ):
-                genre_stations = super().get_genre_stations()
-                self.genre_stations_cache[time.time()] = genre_stations
+                metrics.record_cache_lookup("genre_stations", hit=False)
+                genre_stations = self._fetch_genre_stations()
+                self._set_cached(self.genre_stations_cache, genre_stations)
+            else:
+                metrics.record_cache_lookup("genre_stations", hit=True)
+                self._revalidate_if_stale(
+                    self.genre_stations_cache,
+                    "genre_stations",
+                    self._genre_stations_changed,
+                    self._fetch_genre_stations,
+                )
 
         except requests.exceptions.RequestException:
             logger.exception("Error retrieving Pandora genre stations.")
             return genre_stations
 
-        try:
-            return next(iter(self.genre_stations_cache.values()))
-        except StopIteration:
+        cached = self._get_cached(self.genre_stations_cache)
+        if cached is None:
             # Cache disabled
             return genre_stations
+        return cached[1]
+
+    def _genre_stations_changed(self, genre_stations):
+        # GenreStationList.has_changed() compares against the checksum of the
+        # user's station list, so check the genre checksum directly.
+        return self.get_genre_stations_checksum() != genre_stations.checksum
+
+    @single_flight
+    def search(
+        self, search_text, include_near_matches=False, include_genre_stations=False
+    ):
+        return super().search(
+            search_text,
+            include_near_matches=include_near_matches,
+            include_genre_stations=include_genre_stations,
+        )
@@ -0,0 +1,245 @@
+import json
+import logging
+import pathlib
+import threading
+from collections import deque
+from typing import NamedTuple
+
+import requests
+from pandora import errors
+from pandora.transport import delay_exponential
+
+from mopidy_pandora.uri import PandoraUri
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackAction(NamedTuple):
+    id: int
+    action: str
+    track_uri: str
+
+    @property
+    def key(self):
+        """Actions with the same key supersede each other."""
+        group = FEEDBACK_GROUPS.get(self.action, self.action)
+        return group, PandoraUri.factory(self.track_uri).token
+
+
+# Thumbs up and thumbs down for the same track cancel each other out, so only
+# the most recent one needs to be sent.
+FEEDBACK_GROUPS = {"thumbs_up": "feedback", "thumbs_down": "feedback"}
+
+
+class FeedbackQueue:
+    """Durable queue of feedback actions that are sent to Pandora in the
+    background.
+
+    Every action is appended to a journal file before :meth:`put` returns,
+    and a worker thread drains the queue in batches, retrying with
+    exponential backoff while Pandora cannot be reached. Completed actions
+    are recorded in the journal, which is compacted when the queue is
+    loaded and whenever it runs empty. Actions are delivered at least once.
+
+    :param path: the journal file to store pending actions in.
+    :param handler: function that is called with the action name and track
+        URI to send each action to Pandora.
+    :param max_delay: the maximum number of seconds to wait between retries.
+    """
+
+    ACTIONS = frozenset(
+        [
+            "thumbs_up",
+            "thumbs_down",
+            "sleep",
+            "add_artist_bookmark",
+            "add_song_bookmark",
+        ]
+    )
+    RETRY_ERRORS = (
+        requests.exceptions.RequestException,
+        errors.InternalServerError,
+        errors.MaintenanceMode,
+        errors.ReadOnlyMode,
+    )
+
+    def __init__(self, path, handler, max_delay=300):
+        self.path = pathlib.Path(path)
+        self.handler = handler
+        self.max_delay = max_delay
+
+        self._pending = deque()
+        self._in_flight = []
+        self._next_id = 1
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+        self._load()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending) + len(self._in_flight)
+
+    def _load(self):
+        actions = {}
+        try:
+            with self.path.open() as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Partially written line, e.g. after a crash.
+                        continue
+                    if "done" in record:
+                        actions.pop(record["done"], None)
+                    else:
+                        action = FeedbackAction(**record)
+                        actions[action.id] = action
+                        self._next_id = max(self._next_id, action.id + 1)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.exception("Error reading Pandora feedback queue from disk.")
+
+        self._pending.extend(actions.values())
+        if self._pending:
+            logger.info(
+                f"Restored {len(self._pending)} pending Pandora feedback actions."
+            )
+        self._compact()
+
+    def _compact(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            with tmp_path.open("w") as f:
+                for action in [*self._in_flight, *self._pending]:
+                    f.write(json.dumps(action._asdict()) + "\n")
+            tmp_path.replace(self.path)
+        except Exception:
+            logger.exception("Error writing Pandora feedback queue to disk.")
+            tmp_path.unlink(missing_ok=True)
+
+    def _append(self, records):
+        if not records:
+            return
+        try:
+            with self.path.open("a") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+        except Exception:
+            logger.exception("Error writing Pandora feedback queue to disk.")
+
+    def put(self, action, track_uri):
+        """Queue a feedback action to be sent to Pandora.
+
+        :param action: the name of the action, one of :attr:`ACTIONS`.
+        :param track_uri: the URI of the track that the action applies to.
+        :return: False if the action duplicates one that is already queued.
+        """
+        if action not in self.ACTIONS:
+            msg = f"Unsupported feedback action: {action!r}"
+            raise ValueError(msg)
+
+        with self._cond:
+            new_action = FeedbackAction(self._next_id, action, track_uri)
+            records = []
+
+            if any(
+                a.key == new_action.key and a.action == action
+                for a in [*self._in_flight, *self._pending]
+            ):
+                logger.debug(f"Ignoring duplicate Pandora feedback: {action!r}.")
+                return False
+
+            for queued in list(self._pending):
+                if queued.key == new_action.key:
+                    # Superseded by the new action, e.g. thumbs down after
+                    # thumbs up.
+                    self._pending.remove(queued)
+                    records.append({"done": queued.id})
+
+            self._next_id += 1
+            self._pending.append(new_action)
+            self._append([*records, new_action._asdict()])
+            self._start()
+            return True
+
+    def start(self):
+        """Start sending any actions that were restored from disk."""
+        with self._cond:
+            self._stopped = False
+            if self._pending:
+                self._start()
+
+    def _start(self):
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(
+                target=self._run, name="PandoraFeedback", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop sending actions. Pending actions remain on disk."""
+        with self._cond:
+            thread = self._thread
+            self._stopped = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+
+    def wait(self, timeout=None):
+        """Block until all queued actions have been processed.
+
+        :param timeout: the maximum number of seconds to wait.
+        :return: True if the queue is empty, False if the timeout expired.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not (self._pending or self._in_flight), timeout
+            )
+
+    def _run(self):
+        attempt = 0
+        while True:
+            with self._cond:
+                if self._stopped or not self._pending:
+                    self._thread = None
+                    if not self._pending:
+                        self._compact()
+                    self._cond.notify_all()
+                    return
+                self._in_flight = list(self._pending)
+                self._pending.clear()
+
+            batch, completed = self._in_flight, []
+            try:
+                for action in batch:
+                    self._send(action)
+                    completed.append(action)
+                attempt = 0
+            except self.RETRY_ERRORS:
+                attempt += 1
+                delay = min(self.max_delay, delay_exponential(0.5, 2, attempt))
+                logger.warning(
+                    f"Error sending Pandora feedback, retrying in {delay:.1f}s.",
+                    exc_info=True,
+                )
+            finally:
+                with self._cond:
+                    self._in_flight = []
+                    self._pending.extendleft(reversed(batch[len(completed) :]))
+                    self._append([{"done": action.id} for action in completed])
+                    self._cond.notify_all()
+
+            if attempt:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopped, delay)
+
+    def _send(self, action):
+        try:
+            self.handler(action.action, action.track_uri)
+        except self.RETRY_ERRORS:
+            raise
+        except Exception:
+            # Retrying will not help, e.g. because the track token has expired.
+            logger.exception(f"Error calling Pandora event: {action.action}.")
@@ -3,9 +3,7 @@ from __future__ import annotations
 import logging
 import threading
 import time
-from difflib import SequenceMatcher
-from functools import total_ordering, wraps
-from queue import PriorityQueue
+from functools import wraps
 from typing import TYPE_CHECKING, Any, NamedTuple, override
 
 import pykka
@@ -14,7 +12,7 @@ from mopidy.types import PlaybackState
 
 from mopidy_pandora import listener
 from mopidy_pandora.uri import AdItemUri, PandoraUri
-from mopidy_pandora.utils import run_async
+from mopidy_pandora.utils import Scheduler, run_async
 
 if TYPE_CHECKING:
     from mopidy.config import Config
@@ -81,8 +79,96 @@ def get_active_uri(core, *_args, **kwargs):
     return uri
 
 
+class TracklistMirror:
+    """Local copy of the Mopidy tracklist and its playback options.
+
+    The copy is kept up to date by the core events that are passed to
+    :meth:`on_event`, and by the changes that are made through the mirror
+    itself. Data is only retrieved from core again after a change event has
+    been received, so that reading it does not require a round trip to the
+    core actor.
+
+    Changes are not applied incrementally: core's change events do not say
+    what changed, so the first read after a ``tracklist_changed`` or
+    ``options_changed`` event retrieves the whole tracklist or all of the
+    options again.
+
+    :param core: the Mopidy core to mirror the tracklist of.
+    """
+
+    OPTIONS = ("consume", "repeat", "random", "single")
+
+    def __init__(self, core: core.CoreProxy):
+        self.core = core
+        self.current_tlid = None
+
+        # None means that the data has to be retrieved from core.
+        self._tl_tracks = None
+        self._options = None
+
+    def on_event(self, event, **kwargs):
+        if event == "tracklist_changed":
+            self._tl_tracks = None
+        elif event == "options_changed":
+            self._options = None
+        elif event.startswith("track_playback_") and "tl_track" in kwargs:
+            self.current_tlid = kwargs["tl_track"].tlid
+
+    @property
+    def tl_tracks(self):
+        if self._tl_tracks is None:
+            self._tl_tracks = list(self.core.tracklist.get_tl_tracks().get())
+        return self._tl_tracks
+
+    @property
+    def options(self):
+        if self._options is None:
+            futures = [getattr(self.core.tracklist, f"get_{o}")() for o in self.OPTIONS]
+            self._options = dict(zip(self.OPTIONS, pykka.get_all(futures), strict=True))
+        return self._options
+
+    def set_option(self, name, value):
+        getattr(self.core.tracklist, f"set_{name}")(value)
+        if self._options is not None:
+            self._options[name] = value
+
+    def index(self, uri=None):
+        """Find the position of a track in the tracklist.
+
+        :param uri: the URI of the track to find, or None for the current track.
+        :return: the index of the first matching track, or None if not found.
+        """
+        if uri is None and self.current_tlid is None:
+            # No track has been played since the mirror was created.
+            return self.core.tracklist.index().get()
+
+        for i, tl_track in enumerate(self.tl_tracks):
+            if uri is None and tl_track.tlid == self.current_tlid:
+                return i
+            if uri is not None and tl_track.track.uri == uri:
+                return i
+        return None
+
+    def add(self, uris):
+        tl_tracks = self.core.tracklist.add(uris=uris).get()
+        if self._tl_tracks is not None:
+            self._tl_tracks.extend(tl_tracks)
+        return tl_tracks
+
+    def remove(self, tlids=None, uris=None):
+        criteria = {"tlid": tlids} if tlids is not None else {"uri": uris}
+        self.core.tracklist.remove(criteria)
+        if self._tl_tracks is not None:
+            self._tl_tracks = [
+                t
+                for t in self._tl_tracks
+                if t.tlid not in (tlids or ()) and t.track.uri not in (uris or ())
+            ]
+
+
 class PandoraFrontend(
     pykka.ThreadingActor,
+    listener.TracedListener,
     core.CoreListener,
     listener.PandoraBackendListener,
     listener.PandoraPlaybackListener,
@@ -93,28 +179,35 @@ class PandoraFrontend(
 
         self.config = config["pandora"]
         self.auto_setup = self.config.get("auto_setup")
+        self.lookahead_tracks = self.config.get("lookahead_tracks", 1)
+
+        # The number of tracks that have been requested from the backend, but
+        # have not been added to the tracklist yet.
+        self._requested_tracks = 0
 
         self.setup_required = True
         self.core = core
+        self.tracklist = TracklistMirror(core)
 
         self.track_change_completed_event = threading.Event()
         self.track_change_completed_event.set()
 
+    def on_event(self, event, **kwargs):
+        self.tracklist.on_event(event, **kwargs)
+        super().on_event(event, **kwargs)
+
     def set_options(self):
         # Setup playback to mirror behaviour of official Pandora front-ends.
         if self.auto_setup and self.setup_required:
-            if self.core.tracklist.get_consume().get() is False:
-                self.core.tracklist.set_consume(True)
-                return
-            if self.core.tracklist.get_repeat().get() is True:
-                self.core.tracklist.set_repeat(False)
-                return
-            if self.core.tracklist.get_random().get() is True:
-                self.core.tracklist.set_random(False)
-                return
-            if self.core.tracklist.get_single().get() is True:
-                self.core.tracklist.set_single(False)
-                return
+            required = {
+                "consume": True,
+                "repeat": False,
+                "random": False,
+                "single": False,
+            }
+            for name, value in required.items():
+                if self.tracklist.options[name] is not value:
+                    self.tracklist.set_option(name, value)
 
             self.setup_required = False
 
@@ -151,17 +244,22 @@ class PandoraFrontend(
         self.set_options()
 
     def is_end_of_tracklist_reached(self, track=None):
-        length = self.core.tracklist.get_length().get()
+        length = len(self.tracklist.tl_tracks)
         if length <= 1:
             return True
-        if track:
-            tl_track = self.core.tracklist.filter({"uri": [track.uri]}).get()[0]
-            track_index = self.core.tracklist.index(tl_track).get()
-        else:
-            track_index = self.core.tracklist.index().get()
+        track_index = self.tracklist.index(track.uri if track else None)
 
         return track_index == length - 1
 
+    def get_upcoming_track_count(self, track=None):
+        """Count the tracks that follow ``track`` (or the current track) in the
+        tracklist.
+        """
+        track_index = self.tracklist.index(track.uri if track else None)
+        if track_index is None:
+            return 0
+        return len(self.tracklist.tl_tracks) - track_index - 1
+
     def is_station_changed(self, track):
         try:
             previous_track_uri = PandoraUri.factory(
@@ -185,23 +283,40 @@ class PandoraFrontend(
         if self.is_station_changed(track):
             # Station has changed, remove tracks from previous station from tracklist.
             self._trim_tracklist(keep_only=track)
-        if self.is_end_of_tracklist_reached(track):
-            self._trigger_end_of_tracklist_reached(
-                PandoraUri.factory(track).station_id, auto_play=False
-            )
+        self._request_upcoming_tracks(PandoraUri.factory(track).station_id, track)
+
+    def _request_upcoming_tracks(self, station_id, track=None):
+        # Ask the backend for enough tracks to fill up the look-ahead. The
+        # backend adds them to the tracklist as they become available.
+        missing = (
+            self.lookahead_tracks
+            - self.get_upcoming_track_count(track)
+            - self._requested_tracks
+        )
+        for _ in range(missing):
+            self._requested_tracks += 1
+            self._trigger_end_of_tracklist_reached(station_id, auto_play=False)
 
     @override
     def track_unplayable(self, track):
         if self.is_end_of_tracklist_reached(track):
             self.core.playback.stop()
+            self._requested_tracks += 1
             self._trigger_end_of_tracklist_reached(
                 PandoraUri.factory(track).station_id, auto_play=True
             )
 
-        self.core.tracklist.remove({"uri": [track.uri]})
+        self.tracklist.remove(uris=[track.uri])
+
+    @override
+    def upcoming_track_unplayable(self, track):
+        # Replace the track while the current track is still playing.
+        self.tracklist.remove(uris=[track.uri])
+        self._request_upcoming_tracks(PandoraUri.factory(track).station_id)
 
     @override
     def next_track_available(self, track, auto_play=False):
+        self._requested_tracks = max(0, self._requested_tracks - 1)
         if track:
             self.add_track(track, auto_play)
         else:
@@ -214,26 +329,26 @@ class PandoraFrontend(
 
     def add_track(self, track, auto_play=False):
         # Add the next Pandora track
-        self.core.tracklist.add(uris=[track.uri])
-        if auto_play:
-            tl_tracks = self.core.tracklist.get_tl_tracks().get()
+        tl_tracks = self.tracklist.add(uris=[track.uri])
+        if auto_play and tl_tracks:
             self.core.playback.play(tlid=tl_tracks[-1].tlid)
-        self._trim_tracklist(maxsize=2)
+        # Keep the current track as well as the upcoming ones.
+        self._trim_tracklist(maxsize=self.lookahead_tracks + 1)
 
     def _trim_tracklist(self, keep_only: Track | None = None, maxsize=2):
-        tl_tracks = self.core.tracklist.get_tl_tracks().get()
+        tl_tracks = self.tracklist.tl_tracks
 
         if keep_only:
             trim_tlids = [t.tlid for t in tl_tracks if t.track.uri != keep_only.uri]
             if len(trim_tlids) > 0:
-                self.core.tracklist.remove({"tlid": trim_tlids})
+                self.tracklist.remove(tlids=trim_tlids)
             return
 
         if len(tl_tracks) > maxsize:
             # Only need two tracks in the tracklist at any given time, remove
             # the oldest tracks
-            self.core.tracklist.remove(
-                {"tlid": [tl_tracks[t].tlid for t in range(len(tl_tracks) - maxsize)]}
+            self.tracklist.remove(
+                tlids=[tl_tracks[t].tlid for t in range(len(tl_tracks) - maxsize)]
             )
 
     def _trigger_end_of_tracklist_reached(self, station_id, auto_play=False):
@@ -244,32 +359,20 @@ class PandoraFrontend(
         )
 
 
-@total_ordering
-class MatchResult:
-    def __init__(self, marker, ratio):
-        super().__init__()
-
-        self.marker = marker
-        self.ratio = ratio
-
-    def __eq__(self, other):
-        return self.ratio == other.ratio
-
-    def __lt__(self, other):
-        return self.ratio < other.ratio
-
-    def __hash__(self):
-        return hash((self.marker, self.ratio))
-
-
 class EventMarker(NamedTuple):
     event: Any
     uri: Any
     time: Any
 
 
+class MatchResult(NamedTuple):
+    marker: EventMarker
+    ratio: float
+
+
 class EventMonitorFrontend(
     pykka.ThreadingActor,
+    listener.TracedListener,
     core.CoreListener,
     audio.AudioListener,
     listener.PandoraFrontendListener,
@@ -281,9 +384,9 @@ class EventMonitorFrontend(
         super().__init__()
         self.core = core
         self.event_sequences = []
-        self.sequence_match_results = None
+        self.sequence_monitor = None
         self._track_changed_marker = None
-        self._monitor_lock = threading.Lock()
+        self.scheduler = Scheduler(name="PandoraEventMonitor")
 
         self.config = config["pandora"]
         self.is_active = self.config["event_support_enabled"]
@@ -293,14 +396,11 @@ class EventMonitorFrontend(
             return
 
         interval = float(self.config["double_click_interval"])
-        self.sequence_match_results = PriorityQueue(maxsize=4)
 
         self.event_sequences.append(
             EventSequence(
                 self.config["on_pause_resume_click"],
                 ["track_playback_paused", "track_playback_resumed"],
-                self.sequence_match_results,
-                interval=interval,
             )
         )
 
@@ -312,8 +412,6 @@ class EventMonitorFrontend(
                     "track_playback_resumed",
                     "track_playback_paused",
                 ],
-                self.sequence_match_results,
-                interval=interval,
             )
         )
 
@@ -325,9 +423,7 @@ class EventMonitorFrontend(
                     "track_playback_ended",
                     "track_playback_paused",
                 ],
-                self.sequence_match_results,
                 wait_for="track_changed_previous",
-                interval=interval,
             )
         )
 
@@ -339,13 +435,19 @@ class EventMonitorFrontend(
                     "track_playback_ended",
                     "track_playback_paused",
                 ],
-                self.sequence_match_results,
                 wait_for="track_changed_next",
-                interval=interval,
             )
         )
 
-        self.trigger_events = {e.target_sequence[0] for e in self.event_sequences}
+        self.sequence_monitor = SequenceMonitor(
+            self.event_sequences,
+            self.scheduler,
+            self.process_match,
+            interval=interval,
+        )
+
+    def on_stop(self):
+        self.scheduler.stop()
 
     @only_execute_for_pandora_uris
     def on_event(self, event, **kwargs):
@@ -355,26 +457,12 @@ class EventMonitorFrontend(
         super().on_event(event, **kwargs)
         self._detect_track_change(event, **kwargs)
 
-        if self._monitor_lock.acquire(False):
-            if event in self.trigger_events:
-                # Monitor not running and current event will not trigger any
-                # starts either, ignore
-                self.notify_all(
-                    event,
-                    uri=get_active_uri(self.core, event, **kwargs),
-                    **kwargs,
-                )
-                self.monitor_sequences()
-            else:
-                self._monitor_lock.release()
-                return
-        else:
-            # Just pass on the event
-            self.notify_all(event, **kwargs)
-
-    def notify_all(self, event, **kwargs):
-        for es in self.event_sequences:
-            es.notify(event, **kwargs)
+        if (
+            not self.sequence_monitor.is_monitoring()
+            and event in self.sequence_monitor.trigger_events
+        ):
+            kwargs["uri"] = get_active_uri(self.core, event, **kwargs)
+        self.sequence_monitor.notify(event, **kwargs)
 
     def _detect_track_change(self, event, **kwargs):
         if not self._track_changed_marker and event == "track_playback_ended":
@@ -398,29 +486,16 @@ class EventMonitorFrontend(
                 self._track_changed_marker = None
 
     @run_async
-    def monitor_sequences(self):
-        for es in self.event_sequences:
-            # Wait until all sequences have been processed
-            es.wait()
-
-        # Get the last item in the queue (will have highest ratio)
-        match = None
-        while not self.sequence_match_results.empty():
-            match = self.sequence_match_results.get()
-            self.sequence_match_results.task_done()
-
-        if match and match.ratio == 1.0:
-            if match.marker.uri and isinstance(
-                PandoraUri.factory(match.marker.uri), AdItemUri
-            ):
-                logger.info("Ignoring doubleclick event for Pandora advertisement...")
-            else:
-                self._trigger_event_triggered(match.marker.event, match.marker.uri)
-            # Resume playback...
-            if self.core.playback.get_state().get() != PlaybackState.PLAYING:
-                self.core.playback.resume()
-
-        self._monitor_lock.release()
+    def process_match(self, match):
+        if match.marker.uri and isinstance(
+            PandoraUri.factory(match.marker.uri), AdItemUri
+        ):
+            logger.info("Ignoring doubleclick event for Pandora advertisement...")
+        else:
+            self._trigger_event_triggered(match.marker.event, match.marker.uri)
+        # Resume playback...
+        if self.core.playback.get_state().get() != PlaybackState.PLAYING:
+            self.core.playback.resume()
 
     def event_processed(self, track_uri, pandora_event):  # noqa: ARG002
         if pandora_event == "delete_station":
@@ -461,120 +536,228 @@ class EventMonitorFrontend(
 
 
 class EventSequence:
-    pykka_traversable = True
+    """A sequence of events that should trigger ``on_match_event``.
+
+    :param on_match_event: the Pandora event to trigger when the sequence
+        is matched.
+    :param target_sequence: the list of events to match.
+    :param strict: if True, no other events may occur between the events in
+        ``target_sequence``. Otherwise events that are not part of the
+        sequence are ignored.
+    :param wait_for: an optional event that must occur after
+        ``target_sequence`` has been matched.
+    """
 
-    def __init__(  # noqa: PLR0913
-        self,
-        on_match_event,
-        target_sequence,
-        result_queue,
-        *,
-        interval=1.0,
-        strict=False,
-        wait_for=None,
-    ):
+    def __init__(self, on_match_event, target_sequence, *, strict=False, wait_for=None):
         self.on_match_event = on_match_event
         self.target_sequence = target_sequence
-        self.result_queue = result_queue
-        self.interval = interval
         self.strict = strict
         self.wait_for = wait_for
 
-        self.wait_for_event = threading.Event()
-        if not self.wait_for:
-            self.wait_for_event.set()
+    @property
+    def match_sequence(self):
+        if self.wait_for:
+            return [*self.target_sequence, self.wait_for]
+        return self.target_sequence
+
+
+class SequenceAutomaton:
+    """Matches events against several :class:`EventSequence` at once.
+
+    The sequences are compiled into a single deterministic automaton. Each
+    state is a tuple with the position reached in every sequence, or
+    :attr:`DEAD` if the events seen so far can no longer match it.
+    Transitions are computed the first time that they are needed and are
+    cached in a table, so each event is processed with one lookup.
+
+    :param sequences: the :class:`EventSequence` objects to match.
+    """
+
+    DEAD = -1
+
+    def __init__(self, sequences):
+        self.sequences = list(sequences)
+        self.trigger_events = frozenset(s.target_sequence[0] for s in self.sequences)
+        self.start_state = (0,) * len(self.sequences)
+        self.state = self.start_state
+
+        self._alphabets = [frozenset(s.match_sequence) for s in self.sequences]
+        self._transitions = {}
+
+    def reset(self):
+        self.state = self.start_state
+
+    def feed(self, event):
+        """Advance the automaton by one event.
+
+        :param event: the name of the event.
+        :return: the new state of the automaton.
+        """
+        key = (self.state, event)
+        try:
+            self.state = self._transitions[key]
+        except KeyError:
+            self.state = self._transitions[key] = self._transition(*key)
+        return self.state
+
+    def _transition(self, state, event):
+        return tuple(
+            self._advance(i, position, event) for i, position in enumerate(state)
+        )
+
+    def _advance(self, i, position, event):
+        if position == self.DEAD:
+            return self.DEAD
+
+        sequence = self.sequences[i]
+        if not sequence.strict and event not in self._alphabets[i]:
+            # Ignore events that are not part of the sequence.
+            return position
+
+        match_sequence = sequence.match_sequence
+        if position < len(match_sequence) and match_sequence[position] == event:
+            return position + 1
+        return self.DEAD
+
+    def best_match(self):
+        """Get the sequence that the events seen so far match best.
+
+        :return: a ``(sequence, score)`` tuple. ``score`` is the fraction of
+            the sequence that has been matched, where 1.0 is a complete match.
+            ``sequence`` is None if none of the sequences match at all.
+        """
+        best, best_score = None, 0.0
+        for sequence, position in zip(self.sequences, self.state, strict=True):
+            if position == self.DEAD:
+                continue
+            score = position / len(sequence.match_sequence)
+            if score > best_score:
+                best, best_score = sequence, score
+        return best, best_score
+
+    def is_awaiting_wait_for(self):
+        """Check if a sequence has been matched up to its ``wait_for`` event."""
+        return any(
+            sequence.wait_for and position == len(sequence.target_sequence)
+            for sequence, position in zip(self.sequences, self.state, strict=True)
+        )
+
+
+class SequenceMonitor:
+    """Monitors events for occurrences of any of the :class:`EventSequence`.
+
+    Monitoring starts when the first event of one of the sequences occurs,
+    and runs for ``interval`` seconds. The window is extended by another
+    ``interval`` if a sequence still needs its ``wait_for`` event.
+    ``on_match`` is called with a :class:`MatchResult` if a sequence was
+    matched completely.
 
-        self.events_seen = []
-        self._timer = None
+    :param sequences: the :class:`EventSequence` objects to monitor.
+    :param scheduler: the :class:`~mopidy_pandora.utils.Scheduler` that
+        handles the monitoring deadlines.
+    :param on_match: the function to call when a sequence is matched.
+    :param interval: the length of the monitoring window in seconds.
+    """
+
+    pykka_traversable = True
+
+    def __init__(self, sequences, scheduler, on_match, *, interval=1.0):
+        self.automaton = SequenceAutomaton(sequences)
+        self.scheduler = scheduler
+        self.on_match = on_match
+        self.interval = interval
         self.target_uri = None
 
+        # Notifications arrive on the actor's thread while monitoring
+        # deadlines are processed on the scheduler's thread.
+        self._lock = threading.RLock()
+        self._deadline = None
+        self._generation = 0
+        self._awaiting_wait_for = False
+
         self.monitoring_completed = threading.Event()
         self.monitoring_completed.set()
 
-    @classmethod
-    def match_sequence(cls, a, b):
-        sm = SequenceMatcher(a=" ".join(a), b=" ".join(b))
-        return sm.ratio()
+    @property
+    def trigger_events(self):
+        return self.automaton.trigger_events
 
     def notify(self, event, **kwargs):
-        if self.is_monitoring():
-            self.events_seen.append(event)
-            if not self.wait_for_event.is_set() and self.wait_for == event:
-                self.wait_for_event.set()
-
-        elif self.target_sequence[0] == event:
-            if kwargs.get("time_position", 0) == 0:
-                # Don't do anything if track playback has not yet started.
-                return
-            self.start_monitor(kwargs.get("uri"))
-            self.events_seen.append(event)
+        with self._lock:
+            if self.is_monitoring():
+                self.automaton.feed(event)
+                if self._awaiting_wait_for and self.automaton.best_match()[1] == 1.0:
+                    # The monitoring window has already closed and was only
+                    # extended to wait for this event.
+                    self._deadline.cancel()
+                    self._complete(self._generation)
+
+            elif event in self.trigger_events:
+                if kwargs.get("time_position", 0) == 0:
+                    # Don't do anything if track playback has not yet started.
+                    return
+                self.start_monitor(kwargs.get("uri"))
+                self.automaton.feed(event)
 
     def is_monitoring(self):
         return not self.monitoring_completed.is_set()
 
     def start_monitor(self, uri):
-        self.monitoring_completed.clear()
+        with self._lock:
+            self.monitoring_completed.clear()
+
+            self.target_uri = uri
+            self.automaton.reset()
+            self._generation += 1
+            self._deadline = self.scheduler.call_later(
+                self.interval, self.stop_monitor, self._generation
+            )
 
-        self.target_uri = uri
-        self._timer = threading.Timer(
-            self.interval, self.stop_monitor, args=(self.interval,)
-        )
-        self._timer.daemon = True
-        self._timer.start()
+    def stop_monitor(self, generation=None):
+        """Close the monitoring window.
 
-    @run_async
-    def stop_monitor(self, timeout):
-        try:
-            if self.strict:
-                i = 0
-                try:
-                    for e in self.target_sequence:
-                        i = self.events_seen[i:].index(e) + 1
-                except ValueError:
-                    # Make sure that we have seen every event in the target
-                    # sequence, and in the right order
-                    return
-            elif not all(e in self.events_seen for e in self.target_sequence):
-                # Make sure that we have seen every event in the target
-                # sequence, ignoring order
+        :param generation: the monitoring session that the deadline belongs
+            to. Deadlines of previous sessions are ignored.
+        """
+        with self._lock:
+            if generation is None:
+                generation = self._generation
+            elif generation != self._generation or not self.is_monitoring():
                 return
-            if self.wait_for_event.wait(timeout=timeout):
-                self.result_queue.put(
-                    MatchResult(
-                        EventMarker(
-                            self.on_match_event,
-                            self.target_uri,
-                            int(time.time() * 1000),
-                        ),
-                        self.get_ratio(),
-                    )
+
+            _, score = self.automaton.best_match()
+            if score < 1.0 and self.automaton.is_awaiting_wait_for():
+                self._awaiting_wait_for = True
+                self._deadline = self.scheduler.call_later(
+                    self.interval, self._complete, generation
                 )
-        finally:
-            self.reset()
-            self.monitoring_completed.set()
+            else:
+                self._complete(generation)
 
-    def reset(self):
-        if self.wait_for:
-            self.wait_for_event.clear()
-        else:
-            self.wait_for_event.set()
+    def _complete(self, generation):
+        with self._lock:
+            if generation != self._generation or not self.is_monitoring():
+                return
 
-        self.events_seen = []
+            sequence, score = self.automaton.best_match()
+            match = None
+            if score == 1.0:
+                match = MatchResult(
+                    EventMarker(
+                        sequence.on_match_event,
+                        self.target_uri,
+                        int(time.time() * 1000),
+                    ),
+                    score,
+                )
 
-    def get_ratio(self):
-        if self.wait_for:
-            # Add 'wait_for' event as well to make ratio more accurate.
-            match_sequence = [*self.target_sequence, self.wait_for]
-        else:
-            match_sequence = self.target_sequence
-        if self.strict:
-            ratio = EventSequence.match_sequence(self.events_seen, match_sequence)
-        else:
-            filtered_list = [e for e in self.events_seen if e in match_sequence]
-            ratio = EventSequence.match_sequence(filtered_list, match_sequence)
-        if ratio < 1.0 and self.strict:
-            return 0
-        return ratio
+            self._deadline = None
+            self._awaiting_wait_for = False
+            self.automaton.reset()
+            self.monitoring_completed.set()
+
+        if match is not None:
+            self.on_match(match)
 
     def wait(self, timeout=None):
         return self.monitoring_completed.wait(timeout=timeout)
@@ -0,0 +1,234 @@
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
+
+import requests
+from tornado import web
+
+from mopidy_pandora import Extension, utils
+
+logger = logging.getLogger(__name__)
+
+URL_PREFIX = f"/{Extension.ext_name}/images/"
+
+
+class ImageCache:
+    """Stores Pandora artwork in Mopidy's cache directory so that every image
+    only has to be downloaded once, no matter how many clients display it.
+
+    Image URLs are registered by the library provider, which hands out local
+    URLs in their place. Images are downloaded the first time that their local
+    URL is requested, and the least recently used images are removed once the
+    cache grows beyond ``max_size`` bytes. Only registered URLs can be
+    downloaded.
+
+    Removed images are downloaded again when their local URL is requested, so
+    the small index files that map keys to image URLs are kept until their
+    URL has not been registered for ``INDEX_MAX_AGE`` seconds and no image is
+    stored for them.
+
+    :param cache_dir: the directory that images should be stored in.
+    :param max_size: the maximum number of bytes to use for storing images.
+    :param proxy: the proxy server to download images through, if any.
+    """
+
+    TIMEOUT = 10
+    KEY_LENGTH = 32
+    INDEX_MAX_AGE = 30 * 24 * 60 * 60
+    PRUNE_INTERVAL = 24 * 60 * 60
+
+    def __init__(self, cache_dir, max_size, proxy=None):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_size = max_size
+
+        self.session = requests.Session()
+        if proxy:
+            self.session.proxies = {"http": proxy, "https": proxy}
+
+        # Concurrent requests for the same image result in a single download.
+        self._downloads = utils.SingleFlight()
+
+        # The sizes of the stored images by key, from least to most recently
+        # used, and their total. Loaded from disk when first needed.
+        self._images = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pruned_at = 0
+
+    @classmethod
+    def key(cls, url):
+        return hashlib.sha256(url.encode()).hexdigest()[: cls.KEY_LENGTH]
+
+    def _index_path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def _image_path(self, key):
+        return self.cache_dir / f"{key}.img"
+
+    def register(self, url):
+        """Register an image URL so that it can be served from the cache.
+
+        :param url: the URL of the image on the Pandora servers.
+        :return: the local URL to retrieve the image from, or ``url`` itself if
+            it could not be registered.
+        """
+        key = self.key(url)
+        index_path = self._index_path(key)
+        try:
+            # Mark the index as recently registered, so that it is not pruned.
+            os.utime(index_path)
+        except FileNotFoundError:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                index_path.write_text(json.dumps({"url": url}))
+            except OSError:
+                logger.exception(f"Error registering Pandora image {url!r}.")
+                return url
+        except OSError:
+            logger.warning(f"Error registering Pandora image {url!r}.", exc_info=True)
+        return URL_PREFIX + key
+
+    def get(self, key):
+        """Retrieve an image, downloading it if it is not cached yet.
+
+        :param key: the key of the image, as used in its local URL.
+        :return: tuple of the image data and its content type, or None if no
+            image has been registered for ``key``.
+        """
+        try:
+            index = json.loads(self._index_path(key).read_text())
+        except (OSError, ValueError):
+            return None
+
+        data = self._read(key)
+        if data is None:
+            data, index = self._downloads.do(key, self._fetch, key, index)
+
+        return data, index.get("content_type") or "image/jpeg"
+
+    def _read(self, key):
+        image_path = self._image_path(key)
+        try:
+            data = image_path.read_bytes()
+            # Mark the image as recently used.
+            os.utime(image_path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            images = self._load_images()
+            if key in images:
+                images.move_to_end(key)
+        return data
+
+    def _fetch(self, key, index):
+        # Another request may have downloaded the image in the meantime.
+        data = self._read(key)
+        if data is None:
+            data, content_type = self._download(index["url"])
+            index = {**index, "content_type": content_type}
+            self._store(key, index, data)
+        return data, index
+
+    def _download(self, url):
+        logger.debug(f"Downloading Pandora image {url!r}...")
+        response = self.session.get(url, timeout=self.TIMEOUT)
+        response.raise_for_status()
+        return response.content, response.headers.get("Content-Type")
+
+    def _store(self, key, index, data):
+        image_path = self._image_path(key)
+        tmp_path = image_path.with_suffix(".tmp")
+        try:
+            tmp_path.write_bytes(data)
+            tmp_path.replace(image_path)
+            self._index_path(key).write_text(json.dumps(index))
+        except OSError:
+            logger.exception(f"Error writing Pandora image {index['url']!r} to disk.")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            images = self._load_images()
+            self._size += len(data) - images.pop(key, 0)
+            images[key] = len(data)
+            self._evict(images)
+            if time.time() - self._pruned_at > self.PRUNE_INTERVAL:
+                self._prune_index()
+
+    def _load_images(self):
+        if self._images is None:
+            found = []
+            for path in self.cache_dir.glob("*.img"):
+                try:
+                    found.append((path.stat(), path.stem))
+                except FileNotFoundError:
+                    continue
+            found.sort(key=lambda image: image[0].st_mtime)
+            self._images = collections.OrderedDict(
+                (key, stat.st_size) for stat, key in found
+            )
+            self._size = sum(self._images.values())
+        return self._images
+
+    def _evict(self, images):
+        while self._size > self.max_size and len(images) > 1:
+            key, size = images.popitem(last=False)
+            logger.debug(f"Removing Pandora image {key!r} from cache.")
+            # The index is kept, so that the image can be downloaded again.
+            self._image_path(key).unlink(missing_ok=True)
+            self._size -= size
+
+    def _prune_index(self):
+        # Called with self._lock held, so that no images are stored meanwhile.
+        self._pruned_at = time.time()
+        expired = self._pruned_at - self.INDEX_MAX_AGE
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                if path.stem in self._images or path.stat().st_mtime > expired:
+                    continue
+                logger.debug(f"Removing Pandora image index {path.stem!r}.")
+                path.unlink()
+            except FileNotFoundError:
+                continue
+
+
+def get_image_cache(config):
+    """Create an :class:`ImageCache` as configured in ``config``.
+
+    :return: the image cache, or None if image caching is disabled, or if
+        Mopidy's HTTP server is not enabled to serve the cached images from.
+    """
+    max_size = config["pandora"]["image_cache_size"]
+    if not max_size or not config["http"]["enabled"]:
+        return None
+    return ImageCache(
+        Extension.get_cache_dir(config) / "images",
+        max_size * 1024 * 1024,
+        proxy=utils.format_proxy(config["proxy"]),
+    )
+
+
+class ImageHandler(web.RequestHandler):
+    def initialize(self, image_cache):
+        self.image_cache = image_cache
+
+    async def get(self, key):
+        try:
+            image = await asyncio.to_thread(self.image_cache.get, key)
+        except requests.exceptions.RequestException:
+            logger.warning(f"Error downloading Pandora image {key!r}.", exc_info=True)
+            raise web.HTTPError(502) from None
+        if image is None:
+            raise web.HTTPError(404)
+
+        data, content_type = image
+        self.set_header("Content-Type", content_type)
+        # The key is derived from the image URL, so the content never changes.
+        self.set_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.write(data)
@@ -1,12 +1,17 @@
 import contextlib
 import logging
 import re
+import threading
+import time
+from collections import deque
 from typing import Any, NamedTuple, override
 
+import requests
 from cachetools import LRUCache
 from mopidy import backend, models
-from pydora.utils import iterate_forever
+from pandora.errors import PandoraException
 
+from mopidy_pandora import metrics, tracing, utils
 from mopidy_pandora.uri import (
     AdItemUri,
     GenreStationUri,
@@ -16,6 +21,7 @@ from mopidy_pandora.uri import (
     StationUri,
     TrackUri,
 )
+from mopidy_pandora.utils import run_async
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +34,14 @@ class StationCacheItem(NamedTuple):
 class TrackCacheItem(NamedTuple):
     ref: models.Ref
     track: models.Track
+    playable: bool | None = None
+    fetched_at: float | None = None
+
+
+class BufferedTrack(NamedTuple):
+    track: Any
+    playable: Any
+    fetched_at: float
 
 
 class PandoraLibraryProvider(backend.LibraryProvider):
@@ -41,9 +55,19 @@ class PandoraLibraryProvider(backend.LibraryProvider):
         name=GENRE_DIR_NAME, uri=PandoraUri("genres").uri
     )
 
-    def __init__(self, backend, sort_order):
+    def __init__(
+        self,
+        backend,
+        sort_order,
+        prefetch_threshold=1,
+        audio_url_lifetime=0,
+        image_cache=None,
+    ):
         super().__init__(backend)
         self.sort_order = sort_order.lower()
+        self.prefetch_threshold = prefetch_threshold
+        self.audio_url_lifetime = audio_url_lifetime
+        self.image_cache = image_cache
 
         self.pandora_station_cache = StationCache(self, maxsize=5)
         self.pandora_track_cache = LRUCache(maxsize=10)
@@ -133,46 +157,85 @@ class PandoraLibraryProvider(backend.LibraryProvider):
     @override
     def get_images(self, uris):
         result = {}
+        station_uris = {}
         for uri in uris:
-            image_uris = set()
-            try:
-                image_uri = None
-                pandora_uri = PandoraUri.factory(uri)
+            result[uri] = []
+            pandora_uri = PandoraUri.factory(uri)
 
-                logger.info(
-                    "Retrieving images for Pandora "
-                    f"{pandora_uri.uri_type} {pandora_uri.uri}..."
+            logger.info(
+                "Retrieving images for Pandora "
+                f"{pandora_uri.uri_type} {pandora_uri.uri}..."
+            )
+
+            if isinstance(pandora_uri, (AdItemUri, TrackUri)):
+                self._add_image(result, uri, self._get_track_image_url(uri))
+            elif isinstance(pandora_uri, GenreStationUri):
+                # GenreStations don't appear to have artwork available via the
+                # json API
+                continue
+            elif isinstance(pandora_uri, StationUri):
+                # Stations are looked up together once all URIs have been
+                # grouped, so that each station is only retrieved once.
+                station_uris.setdefault(pandora_uri.station_id, []).append(uri)
+            else:
+                logger.warning(
+                    "No images available for Pandora URIs of "
+                    f"type {pandora_uri.uri_type!r}."
                 )
 
-                if isinstance(pandora_uri, (AdItemUri, TrackUri)):
-                    track = self.lookup_pandora_track(uri)
-                    if track.is_ad is True:
-                        image_uri = track.image_url
-                    else:
-                        image_uri = track.album_art_url
-                elif isinstance(pandora_uri, StationUri):
-                    # GenreStations don't appear to have artwork available via the
-                    # json API
-                    if not isinstance(pandora_uri, GenreStationUri):
-                        station = self.backend.api.get_station(pandora_uri.station_id)
-                        image_uri = station.art_url
-                else:
-                    # Lookup
-                    logger.warning(
-                        "No images available for Pandora URIs of "
-                        f"type {pandora_uri.uri_type!r}."
-                    )
+        for station_id, station in self._get_stations(station_uris).items():
+            for uri in station_uris[station_id]:
+                self._add_image(result, uri, station.art_url)
+        return result
 
-                if image_uri:
-                    image_uris.update([image_uri.replace("http://", "https://", 1)])
-            except (TypeError, KeyError):
-                pandora_uri = PandoraUri.factory(uri)
-                if isinstance(pandora_uri, TrackUri):
-                    # Could not find the track as expected - exception.
-                    logger.exception(f"Failed to lookup image for Pandora URI '{uri}'.")
+    def _get_track_image_url(self, uri):
+        try:
+            track = self.lookup_pandora_track(uri)
+        except (TypeError, KeyError):
+            # Could not find the track as expected - exception.
+            logger.exception(f"Failed to lookup image for Pandora URI '{uri}'.")
+            return None
+        if track.is_ad is True:
+            return track.image_url
+        return track.album_art_url
 
-            result[uri] = [models.Image(uri=u) for u in image_uris]
-        return result
+    def _get_stations(self, station_ids):
+        """Retrieve the details of several stations concurrently.
+
+        :param station_ids: the IDs of the stations to retrieve.
+        :return: dict of the stations that could be retrieved, by station ID.
+        """
+        stations = {}
+        try:
+            futures = self.backend.api.get_stations(station_ids)
+        except (PandoraException, requests.exceptions.RequestException):
+            logger.warning(
+                "Failed to lookup images for Pandora stations.", exc_info=True
+            )
+            return stations
+
+        for station_id, future in futures.items():
+            try:
+                stations[station_id] = future.result()
+            except (
+                TypeError,
+                KeyError,
+                PandoraException,
+                requests.exceptions.RequestException,
+            ):
+                logger.warning(
+                    f"Failed to lookup image for Pandora station {station_id!r}.",
+                    exc_info=True,
+                )
+        return stations
+
+    def _add_image(self, result, uri, image_uri):
+        if not image_uri:
+            return
+        image_uri = image_uri.replace("http://", "https://", 1)
+        if self.image_cache is not None:
+            image_uri = self.image_cache.register(image_uri)
+        result[uri].append(models.Image(uri=image_uri))
 
     def _formatted_station_list(self, station_list):
         # Find QuickMix stations and move QuickMix to top
@@ -242,12 +305,72 @@ class PandoraLibraryProvider(backend.LibraryProvider):
         ]
 
     def lookup_pandora_track(self, uri):
-        return self.pandora_track_cache[uri].track
+        try:
+            item = self.pandora_track_cache[uri]
+        except KeyError:
+            metrics.record_cache_lookup("track", hit=False)
+            raise
+        metrics.record_cache_lookup("track", hit=True)
+        return item.track
+
+    def is_pandora_track_playable(self, uri):
+        """Check if the audio URL of a buffered track can be retrieved.
+
+        Uses the result of the validation that was done when the track was
+        prefetched, if available.
+
+        :param uri: the URI of the track to check.
+        :return: True if the track is playable, False otherwise.
+        """
+        item = self.pandora_track_cache.get(uri)
+        if item is not None and item.playable is not None:
+            return item.playable
+        return self.lookup_pandora_track(uri).get_is_playable()
+
+    def is_pandora_track_stale(self, uri, at=None):
+        """Check if the audio URL of a buffered track has expired.
+
+        :param uri: the URI of the track to check.
+        :param at: the time to check for, defaults to now.
+        :return: True if the track was retrieved longer than
+            ``audio_url_lifetime`` seconds before ``at``, False otherwise.
+        """
+        item = self.pandora_track_cache.get(uri)
+        return (
+            item is not None
+            and item.fetched_at is not None
+            and is_expired(item.fetched_at, self.audio_url_lifetime, now=at)
+        )
+
+    def validate_pandora_track(self, uri):
+        """Check if a buffered track is playable, and store the result in the
+        track cache so that it does not have to be checked again.
+
+        :param uri: the URI of the track to check.
+        :return: True if the track is playable, False otherwise.
+        """
+        item = self.pandora_track_cache[uri]
+        if item.playable is None:
+            item = item._replace(playable=bool(item.track.get_is_playable()))
+            self.pandora_track_cache[uri] = item
+        return item.playable
 
     def get_next_pandora_track(self, station_id):
         try:
-            station_iter = self.pandora_station_cache[station_id].iter
-            track = next(station_iter)
+            with tracing.tracer.span(
+                "PandoraLibraryProvider.get_next_pandora_track",
+                attributes={"pandora.station_id": station_id},
+            ):
+                station_iter = self.pandora_station_cache[station_id].iter
+                track = next(station_iter)
+        except StopIteration:
+            logger.warning(
+                f"No more tracks available for Pandora station {station_id!r}."
+            )
+            # Start over with a new iterator the next time that a track is
+            # requested for this station.
+            self.pandora_station_cache.pop(station_id, None)
+            return None
         except Exception:
             logger.exception("Error retrieving next Pandora track.")
             return None
@@ -259,7 +382,13 @@ class PandoraLibraryProvider(backend.LibraryProvider):
             track_name = track.song_name
 
         ref = models.Ref.track(name=track_name, uri=track_uri.uri)
-        self.pandora_track_cache[track_uri.uri] = TrackCacheItem(ref, track)
+        # Tracks that were validated while they were prefetched are known to
+        # be playable.
+        playable = True if getattr(station_iter, "last_validated", False) else None
+        fetched_at = getattr(station_iter, "last_fetched_at", None) or time.time()
+        self.pandora_track_cache[track_uri.uri] = TrackCacheItem(
+            ref, track, playable, fetched_at
+        )
         return ref
 
     @override
@@ -336,20 +465,194 @@ class PandoraLibraryProvider(backend.LibraryProvider):
         return " ".join(search_text)
 
 
+def is_expired(fetched_at, max_age, now=None):
+    """Check if something that was retrieved at ``fetched_at`` is older than
+    ``max_age`` seconds at time ``now``, which defaults to the current time. A
+    ``max_age`` of ``0`` means that it never expires.
+    """
+    if now is None:
+        now = time.time()
+    return bool(max_age) and now - fetched_at > max_age
+
+
 class StationCache(LRUCache):
     def __init__(self, library, maxsize, getsizeof=None):
         super().__init__(maxsize, getsizeof=getsizeof)
         self.library = library
 
+    def __getitem__(self, station_id):
+        metrics.record_cache_lookup("station", hit=station_id in self)
+        return super().__getitem__(station_id)
+
     def __missing__(self, station_id):
         if re.match("^([SRCG])", station_id):
             pandora_uri = self.library._create_station_for_token(station_id)  # noqa: SLF001
             station_id = pandora_uri.station_id
 
-        station = self.library.backend.api.get_station(station_id)
-        station_iter = iterate_forever(station.get_playlist)
+        api = self.library.backend.api
+        station = api.get_station(station_id)
+        if api.aio is not None:
+            # Check if the tracks are playable concurrently on the event loop.
+            validate, run_coroutine = api.aio.is_playable, api.aio.run
+        else:
+            validate, run_coroutine = (lambda track: track.get_is_playable()), None
+        station_iter = PlaylistPrefetcher(
+            station.get_playlist,
+            low_water_mark=self.library.prefetch_threshold,
+            validate=validate,
+            max_age=self.library.audio_url_lifetime,
+            run_coroutine=run_coroutine,
+        )
 
         item = StationCacheItem(station, station_iter)
         self[station_id] = item
 
         return item
+
+
+class PlaylistPrefetcher:
+    """Iterate over a station's playlist forever, fetching new batches of tracks
+    from Pandora as required.
+
+    Unlike :func:`pydora.utils.iterate_forever`, the next batch is requested in
+    the background as soon as the number of buffered tracks drops below
+    ``low_water_mark``, so that retrieving the next track does not have to wait
+    for the Pandora server. Setting ``low_water_mark`` to ``0`` disables
+    prefetching: new batches are then only fetched once the buffer is empty.
+
+    If ``validate`` is provided, every track in a batch is validated
+    concurrently as soon as the batch has been fetched, and tracks that fail
+    validation are skipped. Tracks that have been buffered for longer than
+    ``max_age`` seconds are discarded, as their audio URLs will have expired.
+
+    If Pandora returns an empty batch, up to ``EMPTY_BATCH_RETRIES`` more
+    batches are requested before the iterator gives up.
+
+    :param get_playlist: callable that returns the next batch of playlist items.
+    :param low_water_mark: the number of buffered tracks below which the next
+        batch should be prefetched.
+    :param validate: optional callable that checks if a track is playable.
+    :param max_age: the number of seconds that buffered tracks remain valid,
+        or ``0`` if they never expire.
+    :param run_coroutine: optional callable that schedules a coroutine on an
+        event loop and returns a :class:`concurrent.futures.Future` for its
+        result. If provided, ``validate`` must be a coroutine function, and
+        tracks are validated on the event loop instead of by the worker pool.
+    """
+
+    EMPTY_BATCH_RETRIES = 2
+
+    def __init__(
+        self,
+        get_playlist,
+        low_water_mark=1,
+        validate=None,
+        max_age=0,
+        run_coroutine=None,
+    ):
+        self._get_playlist = get_playlist
+        self.low_water_mark = low_water_mark
+        self.validate = validate
+        self.max_age = max_age
+        self.run_coroutine = run_coroutine
+
+        # The time at which the track that was returned last was retrieved,
+        # and whether it was validated.
+        self.last_fetched_at = None
+        self.last_validated = False
+
+        self._buffer = deque()
+        self._fill_lock = threading.Lock()
+        # Only guards taking tracks from the buffer, so that __next__ does not
+        # have to wait for a batch that is being fetched in the background.
+        self._buffer_lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        empty_batches = 0
+        while True:
+            try:
+                with self._buffer_lock:
+                    track, playable, fetched_at = self._buffer.popleft()
+            except IndexError:
+                # Buffer is empty: wait for any prefetch that is still in
+                # progress, or fetch the next batch ourselves.
+                if not self._fill(1):
+                    empty_batches += 1
+                    if empty_batches > self.EMPTY_BATCH_RETRIES:
+                        raise StopIteration from None
+                continue
+
+            if is_expired(fetched_at, self.max_age):
+                logger.info(
+                    "Discarding expired Pandora track: "
+                    f"{PandoraUri.factory(track).uri!r}."
+                )
+                continue
+            if playable is None or playable.result():
+                break
+            logger.warning(
+                f"Skipping unplayable Pandora track: {PandoraUri.factory(track).uri!r}."
+            )
+
+        if len(self._buffer) < self.low_water_mark:
+            self._prefetch()
+
+        self.last_fetched_at = fetched_at
+        self.last_validated = playable is not None
+        return track.prepare_playback()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def _fill(self, min_size):
+        """Fetch the next batch of tracks unless the buffer already contains at
+        least ``min_size`` tracks.
+
+        :return: False if Pandora did not return any new tracks, True otherwise.
+        """
+        with self._fill_lock:
+            self._discard_expired()
+            if len(self._buffer) >= min_size:
+                return True
+
+            fetched_at = time.time()
+            tracks = list(self._get_playlist())
+            for track in tracks:
+                playable = None
+                if self.validate is not None and self.run_coroutine is not None:
+                    playable = self.run_coroutine(self._validate_async(track))
+                elif self.validate is not None:
+                    playable = utils.executor.submit(self._validate, track)
+                self._buffer.append(BufferedTrack(track, playable, fetched_at))
+            return len(tracks) > 0
+
+    def _discard_expired(self):
+        # Tracks are buffered in the order in which they were retrieved, so
+        # the expired ones are always at the front.
+        with self._buffer_lock:
+            while self._buffer and is_expired(self._buffer[0].fetched_at, self.max_age):
+                self._buffer.popleft()
+
+    def _validate(self, track):
+        try:
+            return bool(self.validate(track))
+        except Exception:
+            logger.warning("Error validating Pandora track.", exc_info=True)
+            return False
+
+    async def _validate_async(self, track):
+        try:
+            return bool(await self.validate(track))
+        except Exception:
+            logger.warning("Error validating Pandora track.", exc_info=True)
+            return False
+
+    @run_async
+    def _prefetch(self):
+        try:
+            self._fill(self.low_water_mark)
+        except Exception:
+            logger.exception("Error prefetching Pandora playlist.")
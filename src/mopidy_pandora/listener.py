@@ -1,5 +1,36 @@
 from mopidy import backend, listener
 
+from mopidy_pandora import tracing
+
+
+def _send(cls, event, **kwargs):
+    # Pass the trace context along, so that the receiving actor can continue
+    # the trace of the operation that sent the event.
+    traceparent = tracing.tracer.current_traceparent()
+    if traceparent is not None:
+        kwargs["traceparent"] = traceparent
+    listener.send(cls, event, **kwargs)
+
+
+class TracedListener:
+    """
+    Mixin for actors that receive events from the Pandora listeners. Handles
+    events that were sent while tracing in a span that continues the sender's
+    trace.
+
+    """
+
+    def on_event(self, event, **kwargs):
+        traceparent = kwargs.pop("traceparent", None)
+        if traceparent is None:
+            super().on_event(event, **kwargs)
+            return
+
+        with tracing.tracer.span(
+            f"{type(self).__name__}.{event}", traceparent=traceparent
+        ):
+            super().on_event(event, **kwargs)
+
 
 class EventMonitorListener(listener.Listener):
     """
@@ -9,7 +40,7 @@ class EventMonitorListener(listener.Listener):
 
     @staticmethod
     def send(event, **kwargs):
-        listener.send(EventMonitorListener, event, **kwargs)
+        _send(EventMonitorListener, event, **kwargs)
 
     def event_triggered(self, track_uri, pandora_event):
         """
@@ -56,7 +87,7 @@ class PandoraFrontendListener(listener.Listener):
 
     @staticmethod
     def send(event, **kwargs):
-        listener.send(PandoraFrontendListener, event, **kwargs)
+        _send(PandoraFrontendListener, event, **kwargs)
 
     def end_of_tracklist_reached(self, station_id, auto_play=False):
         """
@@ -80,7 +111,7 @@ class PandoraBackendListener(backend.BackendListener):
 
     @staticmethod
     def send(event, **kwargs):
-        listener.send(PandoraBackendListener, event, **kwargs)
+        _send(PandoraBackendListener, event, **kwargs)
 
     def next_track_available(self, track, auto_play=False):
         """
@@ -115,7 +146,7 @@ class PandoraPlaybackListener(listener.Listener):
 
     @staticmethod
     def send(event, **kwargs):
-        listener.send(PandoraPlaybackListener, event, **kwargs)
+        _send(PandoraPlaybackListener, event, **kwargs)
 
     def track_changing(self, track):
         """
@@ -135,6 +166,16 @@ class PandoraPlaybackListener(listener.Listener):
         :type track: :class:`mopidy.models.Ref`
         """
 
+    def upcoming_track_unplayable(self, track):
+        """
+        Called when a track that has not been played yet will not be playable
+        by the time that it is played. Let's the frontend know that it should
+        replace the track before Mopidy changes to it.
+
+        :param track: the upcoming Pandora track.
+        :type track: :class:`mopidy.models.Ref`
+        """
+
     def skip_limit_exceeded(self):
         """
         Called when the playback provider has skipped over the maximum number
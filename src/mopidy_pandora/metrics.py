@@ -0,0 +1,259 @@
+import bisect
+import contextlib
+import math
+import threading
+import time
+
+from tornado import web
+
+from mopidy_pandora import utils
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """Base class for metrics that can be exposed in the Prometheus text
+    format.
+
+    :param name: the name of the metric.
+    :param documentation: a description of what is being measured.
+    :param labelnames: the names of the labels that values are recorded for.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            msg = f"Expected labels {self.labelnames!r} for metric {self.name!r}"
+            raise ValueError(msg)
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Yield the ``(name, labels, value)`` of every sample of the metric."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(
+            f"{name}{_format_labels(labels)} {_format_value(value)}"
+            for name, labels, value in self.samples()
+        )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}_total", labels, value
+
+
+class Gauge(Metric):
+    """Metric whose value is retrieved by calling ``function`` whenever the
+    metrics are collected.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, function):
+        super().__init__(name, documentation)
+        self.function = function
+
+    def samples(self):
+        yield self.name, (), self.function()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Context manager that observes how long its block takes to run."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def get_count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0))
+            return sum(counts)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((k, (list(c), t)) for k, (c, t) in self._values.items())
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bucket, count in zip(self.buckets, counts, strict=True):
+                cumulative += count
+                le = (*labels, ("le", _format_value(bucket)))
+                yield f"{self.name}_bucket", le, cumulative
+            yield f"{self.name}_count", labels, cumulative
+            yield f"{self.name}_sum", labels, total
+
+
+class Registry:
+    """Collection of metrics that are exposed together."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        return "".join(metric.render() + "\n" for metric in self._metrics)
+
+
+registry = Registry()
+
+api_request_duration = registry.register(
+    Histogram(
+        "pandora_api_request_duration_seconds",
+        "Time taken by Pandora API calls, including retries.",
+        ["method"],
+    )
+)
+api_errors = registry.register(
+    Counter(
+        "pandora_api_errors",
+        "Pandora API calls that failed.",
+        ["method", "error"],
+    )
+)
+api_retries = registry.register(
+    Counter(
+        "pandora_api_retries",
+        "Pandora API calls that were retried after they failed.",
+        ["method"],
+    )
+)
+circuit_breaker_transitions = registry.register(
+    Counter(
+        "pandora_circuit_breaker_transitions",
+        "Changes in the state of the circuit breaker for Pandora API calls.",
+        ["state"],
+    )
+)
+cache_requests = registry.register(
+    Counter(
+        "pandora_cache_requests",
+        "Lookups in the station, genre, and track caches.",
+        ["cache", "result"],
+    )
+)
+next_track_duration = registry.register(
+    Histogram(
+        "pandora_next_track_duration_seconds",
+        "Time taken to retrieve the next track of a station.",
+    )
+)
+track_skips = registry.register(
+    Counter(
+        "pandora_track_skips",
+        "Tracks that were skipped because they could not be played.",
+        ["reason"],
+    )
+)
+events_triggered = registry.register(
+    Counter(
+        "pandora_events_triggered",
+        "Pandora events that were triggered using the playback controls.",
+        ["event"],
+    )
+)
+registry.register(
+    Gauge(
+        "pandora_worker_tasks_active",
+        "Tasks that are running on the shared worker pool.",
+        lambda: utils.executor.active_count,
+    )
+)
+registry.register(
+    Gauge(
+        "pandora_worker_tasks_queued",
+        "Tasks that are waiting for a free worker in the shared worker pool.",
+        lambda: utils.executor.queued_count,
+    )
+)
+
+
+@contextlib.contextmanager
+def time_api_request(method):
+    """Context manager that records the duration and outcome of a Pandora API
+    call.
+
+    :param method: the name of the Pandora API method that is being called.
+    """
+    with api_request_duration.time(method=method):
+        try:
+            yield
+        except Exception as exc:
+            api_errors.inc(method=method, error=type(exc).__name__)
+            raise
+
+
+def record_cache_lookup(cache, hit):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class MetricsHandler(web.RequestHandler):
+    def initialize(self, registry):
+        self.registry = registry
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(self.registry.render())
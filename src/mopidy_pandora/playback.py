@@ -1,9 +1,12 @@
+import contextlib
 import logging
+import time
+from collections import deque
 
 import requests
 from mopidy import backend
 
-from mopidy_pandora import listener
+from mopidy_pandora import listener, metrics, tracing
 from mopidy_pandora.uri import PandoraUri, StationUri
 
 logger = logging.getLogger(__name__)
@@ -12,7 +15,7 @@ logger = logging.getLogger(__name__)
 class PandoraPlaybackProvider(backend.PlaybackProvider):
     SKIP_LIMIT = 5
 
-    def __init__(self, audio, backend):
+    def __init__(self, audio, backend, check_upcoming_tracks=False):
         super().__init__(audio, backend)
 
         # TODO: It shouldn't be necessary to keep track of the number of tracks
@@ -20,12 +23,69 @@ class PandoraPlaybackProvider(backend.PlaybackProvider):
         # https://github.com/mopidy/mopidy/issues/1221 has been fixed.
         self._consecutive_track_skips = 0
 
-        # TODO: add gapless playback when it is supported in Mopidy > 1.1
-        # self.audio.set_about_to_finish_callback(self.callback)  # noqa: ERA001
+        # Mopidy core calls 'change_track' for the next track in the tracklist
+        # from the audio thread when the current track is about to finish. By
+        # then it is too late to replace the next track if it turns out to be
+        # unplayable, e.g. because its audio URL expired while playback was
+        # paused. If check_upcoming_tracks is enabled, the upcoming tracks are
+        # checked whenever playback starts or resumes instead, so that they can
+        # be replaced while the current track is still playing.
+        self.check_upcoming = check_upcoming_tracks
+        # Not bounded, so that no tracks are missed however many are queued.
+        # Tracks are removed once played, replaced, or no longer buffered.
+        self._upcoming_uris = deque()
+
+    def add_upcoming_track(self, uri):
+        """Keep track of a Pandora track that has been added to the tracklist,
+        so that it can be checked before it is played.
+
+        :param uri: the URI of the track.
+        """
+        if self.check_upcoming:
+            self._upcoming_uris.append(uri)
+
+    def check_upcoming_tracks(self, track, time_position=0):
+        """Check that the upcoming tracks will still be playable by the time
+        that they are played, assuming that they are played in the order in
+        which they were added after ``track`` finishes. Tracks that will not
+        be playable are reported to the frontend so that they can be replaced.
+
+        :param track: the track that is currently playing.
+        :type track: :class:`mopidy.models.Track`
+        :param time_position: the current playback position in milliseconds.
+        """
+        if not self.check_upcoming:
+            return
+
+        library = self.backend.library
+        starts_at = time.time() + max(0, (track.length or 0) - time_position) / 1000
+        for uri in list(self._upcoming_uris):
+            item = library.pandora_track_cache.get(uri)
+            if item is None:
+                # No longer buffered, so it cannot be played anyway.
+                self._upcoming_uris.remove(uri)
+                continue
+
+            if library.is_pandora_track_stale(uri, at=starts_at):
+                logger.info(
+                    f"Audio URL for Pandora track {uri!r} expires before it is "
+                    "played, replacing it."
+                )
+            elif not self._validate_upcoming_track(uri):
+                logger.info(f"Pandora track {uri!r} is not playable, replacing it.")
+            else:
+                starts_at += getattr(item.track, "track_length", None) or 0
+                continue
+
+            self._upcoming_uris.remove(uri)
+            self._trigger_upcoming_track_unplayable(item.ref)
 
-        # def callback(self):
-        # See: https://discourse.mopidy.com/t/784/2
-        # self.audio.set_uri(self.translate_uri(self.get_next_track()))  # noqa: ERA001
+    def _validate_upcoming_track(self, uri):
+        try:
+            return self.backend.library.validate_pandora_track(uri)
+        except (KeyError, requests.exceptions.RequestException):
+            logger.warning(f"Failed to validate Pandora track {uri!r}.", exc_info=True)
+            return False
 
     def change_pandora_track(self, track):
         """Attempt to retrieve the Pandora playlist item from the buffer and
@@ -33,14 +93,23 @@ class PandoraPlaybackProvider(backend.PlaybackProvider):
 
         A track is playable if it has been stored in the buffer, has a URL, and
         the header for the Pandora URL can be retrieved and the status code
-        checked.
+        checked. Tracks are usually validated when they are prefetched, in
+        which case no request has to be made here.
 
         :param track: the track to retrieve and check the Pandora playlist item for.
         :return: True if the track is playable, False otherwise.
         """
+        if self.backend.library.is_pandora_track_stale(track.uri):
+            # The audio URL has expired, e.g. after playback was paused for a
+            # long time. This is not counted as a skip: a new track will be
+            # retrieved to replace it.
+            metrics.track_skips.inc(reason="expired")
+            self._trigger_track_unplayable(track)
+            msg = f"Audio URL for Pandora track '{track.uri}' has expired."
+            raise UnplayableError(msg)
+
         try:
-            pandora_track = self.backend.library.lookup_pandora_track(track.uri)
-            if pandora_track.get_is_playable():
+            if self.backend.library.is_pandora_track_playable(track.uri):
                 # Success, reset track skip counter.
                 self._consecutive_track_skips = 0
             else:
@@ -53,6 +122,7 @@ class PandoraPlaybackProvider(backend.PlaybackProvider):
             UnplayableError,
         ) as exc:
             # Track is not playable.
+            metrics.track_skips.inc(reason="unplayable")
             self._consecutive_track_skips += 1
             self.check_skip_limit()
             self._trigger_track_unplayable(track)
@@ -77,20 +147,26 @@ class PandoraPlaybackProvider(backend.PlaybackProvider):
                 station_id=pandora_uri.station_id, auto_play=True
             )
             return False
-        try:
-            self._trigger_track_changing(track)
-            self.check_skip_limit()
-            self.change_pandora_track(track)
-            return super().change_track(track)
-
-        except KeyError:
-            logger.exception(
-                f"Error changing Pandora track: failed to lookup {track.uri!r}"
-            )
-            return False
-        except (MaxSkipLimitExceededError, UnplayableError) as e:
-            logger.warning(e)
-            return False
+        with contextlib.suppress(ValueError):
+            self._upcoming_uris.remove(track.uri)
+        with tracing.tracer.span(
+            "PandoraPlaybackProvider.change_track",
+            attributes={"pandora.uri": track.uri},
+        ):
+            try:
+                self._trigger_track_changing(track)
+                self.check_skip_limit()
+                self.change_pandora_track(track)
+                return super().change_track(track)
+
+            except KeyError:
+                logger.exception(
+                    f"Error changing Pandora track: failed to lookup {track.uri!r}"
+                )
+                return False
+            except (MaxSkipLimitExceededError, UnplayableError) as e:
+                logger.warning(e)
+                return False
 
     def check_skip_limit(self):
         if self._consecutive_track_skips >= self.SKIP_LIMIT:
@@ -110,6 +186,9 @@ class PandoraPlaybackProvider(backend.PlaybackProvider):
     def _trigger_track_unplayable(self, track):
         listener.PandoraPlaybackListener.send("track_unplayable", track=track)
 
+    def _trigger_upcoming_track_unplayable(self, track):
+        listener.PandoraPlaybackListener.send("upcoming_track_unplayable", track=track)
+
     def _trigger_skip_limit_exceeded(self):
         listener.PandoraPlaybackListener.send("skip_limit_exceeded")
 
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import requests
+from pandora import errors
+
+from mopidy_pandora import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling the Pandora API while the circuit breaker is
+    open.
+
+    It is a :class:`requests.exceptions.ConnectionError`, so callers that
+    already handle Pandora being unreachable, e.g. by serving cached data,
+    treat it the same way.
+    """
+
+
+class CircuitBreaker:
+    """Stops calling the Pandora API after repeated failures.
+
+    The breaker opens once ``failure_threshold`` consecutive calls have
+    failed, after which calls fail immediately with :class:`CircuitOpenError`.
+    After ``reset_timeout`` seconds a single trial call is let through: if it
+    succeeds the breaker closes again, otherwise it stays open for another
+    ``reset_timeout`` seconds.
+
+    :param failure_threshold: the number of consecutive failures after which
+        the breaker opens, or ``0`` to never open.
+    :param reset_timeout: the number of seconds to wait before letting a trial
+        call through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Check if a call may be made.
+
+        :raises CircuitOpenError: if the breaker is open.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if (
+                self.state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                self._set_state(self.HALF_OPEN)
+                return
+            retry_in = max(0, self._opened_at + self.reset_timeout - time.monotonic())
+        msg = f"Pandora API is unavailable, retrying in {retry_in:.0f} seconds."
+        raise CircuitOpenError(msg)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                logger.info("Pandora API is available again.")
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED
+                and 0 < self.failure_threshold <= self._failures
+            ):
+                logger.warning(
+                    f"Pandora API calls are failing, pausing them for "
+                    f"{self.reset_timeout} seconds."
+                )
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.circuit_breaker_transitions.inc(state=state)
+
+
+class ResiliencePolicy:
+    """Retry and circuit breaker policy for Pandora API calls.
+
+    Calls that fail because Pandora could not be reached, or because of an
+    error on the Pandora server, are retried up to the method's retry budget
+    with jittered exponential backoff. All calls share a
+    :class:`CircuitBreaker`, so that no more requests are sent while Pandora
+    is unavailable. A call only counts as a single failure towards opening the
+    breaker, no matter how many times it was retried.
+
+    :param retries: the number of times that failed calls are retried.
+    :param budgets: the number of retries for specific Pandora API methods, to
+        override ``retries`` with.
+    :param base_delay: the maximum number of seconds to wait before the first
+        retry. The maximum doubles for every following retry.
+    :param max_delay: the maximum number of seconds to wait between retries.
+    :param failure_threshold: the number of consecutive failed calls after
+        which the circuit breaker opens, or ``0`` to disable it.
+    :param reset_timeout: the number of seconds that the circuit breaker stays
+        open for.
+    """
+
+    # Calls that change data on the Pandora server may have succeeded even
+    # though the response was lost, so they are not retried. Feedback is
+    # retried separately by the FeedbackQueue.
+    NO_RETRY = frozenset(
+        [
+            "bookmark.addArtistBookmark",
+            "bookmark.addSongBookmark",
+            "station.addFeedback",
+            "station.createStation",
+            "station.deleteStation",
+            "user.sleepSong",
+        ]
+    )
+    FAILURES = (
+        requests.exceptions.RequestException,
+        errors.InternalServerError,
+        errors.MaintenanceMode,
+    )
+    RETRY_ERRORS = (requests.exceptions.RequestException, errors.InternalServerError)
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        retries=2,
+        budgets=None,
+        base_delay=0.5,
+        max_delay=8.0,
+        failure_threshold=5,
+        reset_timeout=30.0,
+    ):
+        self.retries = retries
+        self.budgets = dict.fromkeys(self.NO_RETRY, 0)
+        self.budgets.update(budgets or {})
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def retry_budget(self, method):
+        """Return the number of times that failed calls to ``method`` may be
+        retried.
+        """
+        return self.budgets.get(method, self.retries)
+
+    def backoff(self, attempt):
+        """Return the number of seconds to wait before retry ``attempt``,
+        using full jitter so that clients do not retry in lockstep.
+        """
+        return random.uniform(  # noqa: S311
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+    def _retry_delay(self, method, attempt, exc):
+        """Handle a failed attempt to make a call.
+
+        The call is only retried while the circuit breaker is closed. A trial
+        call that is let through by a half-open breaker is never retried, so
+        that its outcome always decides the state of the breaker.
+
+        :return: the number of seconds to wait before retrying the call, or
+            None if the call has failed, which is recorded with the breaker.
+        """
+        if (
+            not isinstance(exc, self.RETRY_ERRORS)
+            or attempt > self.retry_budget(method)
+            or self.breaker.state != CircuitBreaker.CLOSED
+        ):
+            self.breaker.record_failure()
+            return None
+
+        delay = self.backoff(attempt)
+        logger.warning(
+            f"Pandora API call {method!r} failed ({exc}), "
+            f"retrying in {delay:.1f} seconds."
+        )
+        metrics.api_retries.inc(method=method)
+        return delay
+
+    def call(self, method, func, *args, **kwargs):
+        """Call ``func`` with ``args`` and ``kwargs``, applying the policy for
+        the Pandora API ``method``.
+
+        :raises CircuitOpenError: if the circuit breaker is open.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_call()
+            try:
+                result = func(*args, **kwargs)
+            except CircuitOpenError:
+                raise
+            except self.FAILURES as exc:
+                delay = self._retry_delay(method, attempt, exc)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+            except errors.PandoraException:
+                # Pandora responded, so it is available.
+                self.breaker.record_success()
+                raise
+            except Exception:
+                # Count unexpected errors as failures too, so that a failed
+                # trial call does not leave the breaker half-open.
+                self.breaker.record_failure()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def call_async(self, method, func, *args, **kwargs):
+        """Coroutine version of :meth:`call` for coroutine functions."""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_call()
+            try:
+                result = await func(*args, **kwargs)
+            except CircuitOpenError:
+                raise
+            except self.FAILURES as exc:
+                delay = self._retry_delay(method, attempt, exc)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            except errors.PandoraException:
+                self.breaker.record_success()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """Persists the partner and user auth tokens of a Pandora login so that
+    logging in can be skipped after Mopidy is restarted.
+
+    A stored session is only restored for the same API host, partner, and user
+    that it was created for, and only until it expires.
+
+    :param path: the file to store the session in.
+    """
+
+    FIELDS = (
+        "partner_auth_token",
+        "partner_id",
+        "user_auth_token",
+        "user_id",
+        "server_sync_time",
+        "start_time",
+    )
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+
+    @staticmethod
+    def session_key(api_host, partner_user, username):
+        """Identify the Pandora account that a session belongs to, without
+        storing the username on disk.
+        """
+        key = "\0".join(str(value) for value in (api_host, partner_user, username))
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def load(self, transport, key):
+        """Restore the stored session for ``key`` into ``transport``.
+
+        :param transport: the :class:`~pandora.transport.APITransport` to
+            restore the auth tokens into.
+        :param key: the session key of the account to restore the session for.
+        :return: the time at which the restored session expires, ``0`` if it
+            does not expire, or None if no valid session was available.
+        """
+        try:
+            with self.path.open(encoding="utf-8") as f:
+                session = json.load(f)
+            if session["key"] != key:
+                return None
+            expires_at = session["expires_at"]
+            if expires_at and expires_at <= time.time():
+                return None
+            fields = {name: session[name] for name in self.FIELDS}
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception("Error reading Pandora session from disk.")
+            return None
+
+        for name, value in fields.items():
+            setattr(transport, name, value)
+        return expires_at
+
+    def save(self, transport, key, expires_at):
+        """Store the session of ``transport``, replacing any previous session.
+
+        :param transport: the :class:`~pandora.transport.APITransport` that
+            holds the auth tokens to store.
+        :param key: the session key of the account that is logged in.
+        :param expires_at: the time at which the session expires, or ``0`` if
+            it does not expire.
+        """
+        session = {name: getattr(transport, name) for name in self.FIELDS}
+        session.update({"key": key, "expires_at": expires_at})
+
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            # The auth tokens grant access to the user's Pandora account.
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(session, f)
+            tmp_path.replace(self.path)
+        except Exception:
+            logger.exception("Error writing Pandora session to disk.")
+            tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,328 @@
+import contextlib
+import contextvars
+import json
+import logging
+import pathlib
+import re
+import secrets
+import threading
+import time
+from typing import NamedTuple
+
+import requests
+
+from mopidy_pandora import utils
+
+logger = logging.getLogger(__name__)
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span = contextvars.ContextVar("pandora_current_span", default=None)
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+
+    @property
+    def traceparent(self):
+        """The context in the W3C Trace Context ``traceparent`` format."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @classmethod
+    def from_traceparent(cls, traceparent):
+        """Parse a W3C Trace Context ``traceparent`` header.
+
+        :return: the :class:`SpanContext`, or None if ``traceparent`` is not
+            valid.
+        """
+        match = _TRACEPARENT_RE.match(traceparent or "")
+        if match is None:
+            return None
+        return cls(*match.groups())
+
+
+class Span:
+    """A timed operation that is part of a trace.
+
+    :param name: the name of the operation.
+    :param context: the :class:`SpanContext` that identifies the span.
+    :param parent_id: the span ID of the parent span, if any.
+    :param kind: the OpenTelemetry span kind.
+    :param attributes: dict of attributes that describe the operation.
+    """
+
+    def __init__(
+        self, name, context, parent_id=None, kind=SPAN_KIND_INTERNAL, attributes=None
+    ):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time_ns()
+        self.end_time = None
+        self.status_code = STATUS_CODE_OK
+        self.status_message = ""
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, exc):
+        self.status_code = STATUS_CODE_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self):
+        self.end_time = time.time_ns()
+
+    def to_json(self):
+        """Encode the span in the OTLP/JSON format."""
+        return {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": _encode_attributes(self.attributes),
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _encode_attributes(attributes):
+    return [
+        {"key": key, "value": _encode_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+def encode_spans(spans):
+    """Encode spans as an OTLP/JSON ``ExportTraceServiceRequest``."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": _encode_attributes({"service.name": "mopidy"})
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __package__},
+                        "spans": [span.to_json() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class FileSpanExporter:
+    """Appends every span to a file, as one OTLP/JSON request per line.
+
+    :param path: the file to write the spans to.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(encode_spans([span]), separators=(",", ":"))
+        with self._lock:
+            try:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError:
+                logger.exception(f"Error writing Pandora trace to {self.path!r}.")
+
+    def shutdown(self):
+        pass
+
+
+class OTLPSpanExporter:
+    """Sends spans to an OpenTelemetry collector using OTLP/HTTP with JSON
+    encoding.
+
+    Spans are collected for ``delay`` seconds and then sent in a single
+    request from the shared worker pool, so that exporting never blocks the
+    operations that are being traced.
+
+    :param endpoint: the base URL of the collector, e.g.
+        ``http://localhost:4318``.
+    :param proxy: the proxy server to send spans through, if any.
+    :param delay: the number of seconds to collect spans for before sending
+        them.
+    """
+
+    TIMEOUT = 10
+    MAX_BATCH_SIZE = 512
+
+    def __init__(self, endpoint, proxy=None, delay=1.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.delay = delay
+
+        self.session = requests.Session()
+        if proxy:
+            self.session.proxies = {"http": proxy, "https": proxy}
+
+        self.scheduler = utils.Scheduler(name="PandoraTraceExporter")
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def export(self, span):
+        with self._lock:
+            self._pending.append(span)
+            if len(self._pending) == 1:
+                self.scheduler.call_later(self.delay, self._flush)
+
+    def _flush(self):
+        with self._lock:
+            spans, self._pending = self._pending, []
+        for i in range(0, len(spans), self.MAX_BATCH_SIZE):
+            utils.executor.submit(self._send, spans[i : i + self.MAX_BATCH_SIZE])
+
+    def _send(self, spans):
+        try:
+            response = self.session.post(
+                self.url, json=encode_spans(spans), timeout=self.TIMEOUT
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            logger.warning(
+                f"Error sending {len(spans)} Pandora trace spans to {self.url!r}.",
+                exc_info=True,
+            )
+
+    def shutdown(self):
+        self.scheduler.stop()
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if spans:
+            self._send(spans)
+
+
+class Tracer:
+    """Creates spans and passes them to the ``exporter`` once they end.
+
+    Tracing is disabled, and :meth:`span` does nothing, until an exporter is
+    set. The current span is tracked using :mod:`contextvars`, so spans that
+    are started while another span is active become its children, including
+    in coroutines and in tasks that run on the shared worker pool.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def current_traceparent(self):
+        """The ``traceparent`` of the current span, or None if there is no
+        active span.
+        """
+        span = _current_span.get()
+        if span is None:
+            return None
+        return span.context.traceparent
+
+    @contextlib.contextmanager
+    def span(self, name, attributes=None, traceparent=None, kind=SPAN_KIND_INTERNAL):
+        """Context manager that traces its block as a span.
+
+        :param name: the name of the span.
+        :param attributes: dict of attributes to add to the span.
+        :param traceparent: the W3C ``traceparent`` of the parent span, for
+            spans that continue a trace from another actor. Defaults to the
+            current span.
+        :param kind: the OpenTelemetry span kind.
+        :return: the :class:`Span`, or None if tracing is disabled.
+        """
+        exporter = self.exporter
+        if exporter is None:
+            yield None
+            return
+
+        parent = SpanContext.from_traceparent(traceparent)
+        if parent is None and (current := _current_span.get()) is not None:
+            parent = current.context
+        context = SpanContext(
+            parent.trace_id if parent is not None else secrets.token_hex(16),
+            secrets.token_hex(8),
+        )
+        span = Span(
+            name,
+            context,
+            parent_id=parent.span_id if parent is not None else None,
+            kind=kind,
+            attributes=attributes,
+        )
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as exc:
+            span.set_error(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            exporter.export(span)
+
+    def trace_api_request(self, method):
+        """Context manager that traces a Pandora API call.
+
+        :param method: the name of the Pandora API method that is being called.
+        """
+        return self.span(
+            method,
+            attributes={"rpc.system": "pandora", "rpc.method": method},
+            kind=SPAN_KIND_CLIENT,
+        )
+
+    def shutdown(self):
+        """Export any pending spans and disable tracing."""
+        exporter, self.exporter = self.exporter, None
+        if exporter is not None:
+            exporter.shutdown()
+
+
+tracer = Tracer()
+
+
+def get_exporter(config):
+    """Create the span exporter that is configured in ``config``.
+
+    :return: the exporter, or None if tracing is disabled.
+    """
+    if config["pandora"].get("tracing_otlp_endpoint"):
+        return OTLPSpanExporter(
+            config["pandora"]["tracing_otlp_endpoint"],
+            proxy=utils.format_proxy(config["proxy"]),
+        )
+    if config["pandora"].get("tracing_file"):
+        return FileSpanExporter(config["pandora"]["tracing_file"])
+    return None
+
+
+def setup(config):
+    """Enable tracing if an exporter is configured in ``config``."""
+    tracer.shutdown()
+    tracer.exporter = get_exporter(config)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import contextlib
+import functools
 import logging
 import re
 from typing import ClassVar
@@ -15,37 +17,74 @@ logger = logging.getLogger(__name__)
 
 
 def with_metaclass(meta, *bases):
-    return meta("NewBase", bases, {})
+    return meta("NewBase", bases, {"__slots__": ()})
 
 
 class _PandoraUriMeta(type):
     def __init__(cls, name, bases, clsdict):
         super().__init__(name, bases, clsdict)
-        if hasattr(cls, "uri_type"):
+        if isinstance(getattr(cls, "uri_type", None), str):
             cls.TYPES[cls.uri_type] = cls
 
 
 class PandoraUri(with_metaclass(_PandoraUriMeta, object)):
+    """Base class for all Pandora URIs.
+
+    The URI string is computed once and cached until one of the URI's
+    attributes is changed. Instances returned by :meth:`factory` for URI
+    strings are shared, and cannot be changed.
+    """
+
     TYPES: ClassVar[dict[str, type[PandoraUri]]] = {}
     SCHEME = "pandora"
 
+    uri_type: ClassVar[str | None] = None
+
+    # The attributes that make up the URI, in order.
+    _fields: ClassVar[tuple[str, ...]] = ()
+
+    __slots__ = ("_frozen", "_instance_type", "_uri")
+
     def __init__(self, uri_type: str | None = None) -> None:
-        self.uri_type = uri_type
+        # Only used by instances of this class, which have no type of their own.
+        self._instance_type = uri_type
+
+    @property
+    def _type_name(self):
+        if self.uri_type is not None:
+            return self.uri_type
+        return getattr(self, "_instance_type", None)
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            msg = f"Cannot modify shared Pandora URI '{self.uri}'"
+            raise AttributeError(msg)
+        super().__setattr__(name, value)
+        with contextlib.suppress(AttributeError):
+            super().__delattr__("_uri")
 
     def __repr__(self):
-        return "{}:{uri_type}".format(self.SCHEME, **self.__dict__)
+        return ":".join(
+            [self.SCHEME, f"{self._type_name}", *self.encoded_attributes.values()]
+        )
 
     @property
     def encoded_attributes(self):
-        encoded_dict = {}
-        for k, v in list(self.__dict__.items()):
-            encoded_dict[k] = quote(PandoraUri.encode(v))
-
-        return encoded_dict
+        return {k: quote(PandoraUri.encode(getattr(self, k))) for k in self._fields}
 
     @property
     def uri(self) -> Uri:
-        return Uri(repr(self))
+        try:
+            return self._uri
+        except AttributeError:
+            uri = Uri(repr(self))
+            object.__setattr__(self, "_uri", uri)
+            return uri
+
+    def _freeze(self):
+        self.uri  # noqa: B018 - cache the URI string before freezing.
+        object.__setattr__(self, "_frozen", True)
+        return self
 
     @classmethod
     def encode(cls, value):
@@ -61,11 +100,11 @@ class PandoraUri(with_metaclass(_PandoraUriMeta, object)):
     def factory(cls, obj):
         if isinstance(obj, str):
             # A string
-            return PandoraUri._from_uri(obj)
+            return _intern_uri(obj)
 
         if isinstance(obj, (models.Ref, models.Track)):
             # A mopidy track or track reference
-            return PandoraUri._from_uri(obj.uri)
+            return _intern_uri(obj.uri)
 
         if isinstance(obj, (Station, GenreStation)):
             # One of the station types
@@ -123,43 +162,41 @@ class PandoraUri(with_metaclass(_PandoraUriMeta, object)):
             return False
 
 
+@functools.lru_cache(maxsize=1024)
+def _intern_uri(uri):
+    # URI strings are parsed once, after which the same read-only instance is
+    # returned for every lookup.
+    return PandoraUri._from_uri(uri)._freeze()  # noqa: SLF001
+
+
 class GenreUri(PandoraUri):
     uri_type = "genre"
+    _fields = ("category_name",)
+    __slots__ = _fields
 
     def __init__(self, category_name):
-        super().__init__(self.uri_type)
         self.category_name = category_name
 
-    def __repr__(self):
-        return "{}:{category_name}".format(
-            super().__repr__(), **self.encoded_attributes
-        )
-
 
 class GenresUri(PandoraUri):
     uri_type = "genres"
-
-    def __init__(self):
-        super().__init__(self.uri_type)
+    __slots__ = ()
 
 
 class StationUri(PandoraUri):
     uri_type = "station"
+    _fields = ("station_id", "token")
+    __slots__ = _fields
 
     def __init__(self, station_id, token):
-        super().__init__(self.uri_type)
         self.station_id = station_id
         self.token = token
 
-    def __repr__(self):
-        return "{}:{station_id}:{token}".format(
-            super().__repr__(), **self.encoded_attributes
-        )
-
 
 class GenreStationUri(StationUri):
     uri_type = "genre_station"
     pattern = re.compile(r"^([G])(\d*)$")
+    __slots__ = ()
 
     def __init__(self, station_id, token):
         # Check that this really is a Genre station as opposed to a regular station.
@@ -172,49 +209,40 @@ class GenreStationUri(StationUri):
 
 class TrackUri(PandoraUri):
     uri_type = "track"
+    __slots__ = ()
 
 
 class PlaylistItemUri(TrackUri):
+    _fields = ("station_id", "token")
+    __slots__ = _fields
+
     def __init__(self, station_id, token):
-        super().__init__(self.uri_type)
         self.station_id = station_id
         self.token = token
 
-    def __repr__(self):
-        return "{}:{station_id}:{token}".format(
-            super().__repr__(), **self.encoded_attributes
-        )
-
 
 class AdItemUri(TrackUri):
     uri_type = "ad"
+    _fields = ("station_id", "ad_token")
+    __slots__ = _fields
 
     def __init__(self, station_id, ad_token):
-        super().__init__(self.uri_type)
         self.station_id = station_id
         self.ad_token = ad_token
 
-    def __repr__(self):
-        return "{}:{station_id}:{ad_token}".format(
-            super().__repr__(), **self.encoded_attributes
-        )
-
 
 class SearchUri(PandoraUri):
     uri_type = "search"
+    _fields = ("token",)
+    __slots__ = _fields
 
     def __init__(self, token):
-        super().__init__(self.uri_type)
-
         # Check that this really is a search result URI as opposed to a regular URI.
         # Search result tokens always start with 'S' (song), 'R' (artist),
         # 'C' (composer), or 'G' (genre station).
         assert re.match("^([SRCG])", token)
         self.token = token
 
-    def __repr__(self):
-        return "{}:{token}".format(super().__repr__(), **self.encoded_attributes)
-
     @property
     def is_track_search(self):
         return self.token.startswith("S")
@@ -1,16 +1,221 @@
+import contextvars
+import heapq
+import itertools
 import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import wraps
-from threading import Thread
 
 import requests
 
+logger = logging.getLogger(__name__)
+
+
+class BoundedExecutor(ThreadPoolExecutor):
+    """Thread pool with a bounded work queue.
+
+    Submitting a task while ``max_workers`` tasks are running and
+    ``max_queue_size`` tasks are waiting blocks the caller until a slot
+    becomes available. Tasks that are submitted by one of the workers
+    themselves are run immediately in that worker instead, as waiting for a
+    slot could deadlock the pool. Tasks run in a copy of the submitter's
+    :mod:`contextvars` context.
+
+    :param max_workers: the maximum number of worker threads.
+    :param max_queue_size: the maximum number of tasks that may be waiting
+        for a free worker.
+    :param thread_name_prefix: the prefix used to name the worker threads.
+    """
+
+    def __init__(
+        self, max_workers=8, max_queue_size=64, thread_name_prefix="PandoraWorker"
+    ):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.max_queue_size = max_queue_size
+        self.thread_name_prefix = thread_name_prefix
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue_size)
+        self._idle = threading.Condition()
+        self._active = 0
+        self._queued = 0
+
+    @property
+    def active_count(self):
+        """The number of tasks that are currently running."""
+        return self._active
+
+    @property
+    def queued_count(self):
+        """The number of tasks that are waiting for a free worker."""
+        return self._queued
+
+    def owns(self, thread):
+        """Check if ``thread`` is one of this executor's workers."""
+        return thread.name.startswith(self.thread_name_prefix)
+
+    def submit(self, fn, /, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            if self.owns(threading.current_thread()):
+                return self._run_inline(fn, *args, **kwargs)
+            logger.warning("Pandora worker queue is full, waiting for a free slot.")
+            self._slots.acquire()
+
+        with self._idle:
+            self._queued += 1
+        try:
+            future = super().submit(
+                contextvars.copy_context().run, self._run, fn, *args, **kwargs
+            )
+        except BaseException:
+            self._task_done(cancelled=True)
+            raise
+
+        future.add_done_callback(lambda f: self._task_done(cancelled=f.cancelled()))
+        return future
+
+    @staticmethod
+    def _run_inline(fn, /, *args, **kwargs):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:  # noqa: BLE001 - passed on to the caller
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+        return future
+
+    def _run(self, fn, /, *args, **kwargs):
+        with self._idle:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._idle:
+                self._active -= 1
+
+    def _task_done(self, cancelled):
+        with self._idle:
+            if cancelled:
+                self._queued -= 1
+            if not (self._active or self._queued):
+                self._idle.notify_all()
+        self._slots.release()
+
+    def wait_idle(self, timeout=None):
+        """Block until all submitted tasks have completed.
+
+        :param timeout: the maximum number of seconds to wait.
+        :return: True if the executor is idle, False if the timeout expired.
+        """
+        with self._idle:
+            return self._idle.wait_for(
+                lambda: not (self._active or self._queued), timeout
+            )
+
+
+executor = BoundedExecutor()
+
+
+class ScheduledCall:
+    """A callback that has been scheduled with :meth:`Scheduler.call_later`."""
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Prevent the callback from being run if it has not started yet."""
+        self.cancelled = True
+
+
+class Scheduler:
+    """Runs callbacks at their deadlines on a single, shared thread.
+
+    Pending calls are kept in a heap ordered by deadline, so a burst of calls
+    is handled by one thread instead of one thread per call. The thread is
+    started when a call is scheduled and exits once no calls are pending.
+    Callbacks should return quickly, as they delay any other calls that are
+    due.
+
+    :param name: the name of the scheduler thread.
+    """
+
+    def __init__(self, name="PandoraScheduler"):
+        self.name = name
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def call_later(self, delay, callback, *args):
+        """Schedule ``callback`` to be called with ``args`` after ``delay``
+        seconds.
+
+        :param delay: the number of seconds to wait before calling ``callback``.
+        :param callback: the function to call.
+        :param args: the positional arguments to pass to ``callback``.
+        :return: the :class:`ScheduledCall`, which can be used to cancel it.
+        """
+        call = ScheduledCall(time.monotonic() + delay, callback, args)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._thread.start()
+            heapq.heappush(self._heap, (call.deadline, next(self._counter), call))
+            self._cond.notify()
+        return call
+
+    def _is_stopped(self):
+        return self._thread is not threading.current_thread()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._is_stopped():
+                    if not self._heap:
+                        self._thread = None
+                        return
+                    timeout = self._heap[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._is_stopped():
+                    return
+                _, _, call = heapq.heappop(self._heap)
+            if call.cancelled:
+                continue
+            try:
+                call.callback(*call.args)
+            except Exception:
+                logger.exception("Error in scheduled Pandora task.")
+
+    def stop(self, timeout=None):
+        """Stop the scheduler thread, discarding any pending calls.
+
+        :param timeout: the maximum number of seconds to wait for the thread
+            to finish.
+        """
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._heap.clear()
+            self._cond.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
 
 def run_async(func):
-    """Function decorator intended to make "func" run in a separate thread
-    (asynchronously).
+    """Function decorator intended to make "func" run on the shared worker
+    pool (asynchronously).
 
     :param func: the function to run asynchronously
-    :return: the created Thread object that the function is running in.
+    :return: a Future for the result of the function.
     """
 
     @wraps(func)
@@ -19,23 +224,95 @@ def run_async(func):
 
         :param args: all arguments will be passed to the target function
         :param kwargs: pass a Queue.Queue() object with the optional 'queue'
-            keyword if you would like to retrieve the results after the thread
+            keyword if you would like to retrieve the results after the task
             has run. All other keyword arguments will be passed to the target
             function.
-        :return: the created Thread object that the function is running in.
+        :return: a Future for the result of the function.
         """
-        t = Thread(target=func, args=args, kwargs=kwargs)
+        future = executor.submit(_log_errors, func, *args, **kwargs)
 
         queue = kwargs.get("queue")
         if queue is not None:
-            t.result_queue = queue
+            future.result_queue = queue
 
-        t.start()
-        return t
+        return future
 
     return async_func
 
 
+def _log_errors(func, /, *args, **kwargs):
+    # Nobody may be waiting for the result of a task that was started with
+    # run_async, so make sure that its errors are not lost.
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Error in asynchronous Pandora task.")
+        raise
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share the same key, so that only one
+    of them is performed at a time.
+
+    Callers that arrive while a call with the same key is in progress wait
+    for it to complete and receive its result or exception, instead of
+    performing the call themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """Call ``func``, or wait for the call with the same key that is
+        already in progress.
+
+        :param key: hashable key that identifies identical calls.
+        :param func: the function to call.
+        :return: the result of the call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                in_flight = True
+            else:
+                in_flight = False
+                future = self._calls[key] = Future()
+
+        if in_flight:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def single_flight(func):
+    """Method decorator that coalesces concurrent calls with the same
+    arguments on the same instance into a single call. See
+    :class:`SingleFlight`.
+
+    :param func: the method to coalesce calls to. Its arguments must be
+        hashable.
+    """
+    flights = SingleFlight()
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        key = (self, args, tuple(sorted(kwargs.items())))
+        return flights.do(key, func, self, *args, **kwargs)
+
+    return wrapper
+
+
 def format_proxy(proxy_config):
     if not proxy_config.get("hostname"):
         return None
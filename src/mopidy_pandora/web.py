@@ -0,0 +1,16 @@
+from mopidy_pandora import images, metrics
+
+
+def factory(config, core):  # noqa: ARG001
+    routes = [(r"/metrics", metrics.MetricsHandler, {"registry": metrics.registry})]
+
+    image_cache = images.get_image_cache(config)
+    if image_cache is not None:
+        routes.append(
+            (
+                rf"/images/([0-9a-f]{{{images.ImageCache.KEY_LENGTH}}})",
+                images.ImageHandler,
+                {"image_cache": image_cache},
+            )
+        )
+    return routes
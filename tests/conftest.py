@@ -7,7 +7,6 @@ import pykka
 import pytest
 import requests
 from mopidy import models
-from pandora.client import APIClient
 from pandora.models.ad import AdItem
 from pandora.models.playlist import PlaylistItem
 from pandora.models.search import SearchResult, SearchResultItem
@@ -18,8 +17,8 @@ from pandora.models.station import (
     StationList,
 )
 
-from mopidy_pandora import backend, frontend, listener
-from mopidy_pandora.frontend import EventSequence
+from mopidy_pandora import backend, frontend, listener, utils
+from mopidy_pandora.frontend import EventSequence, SequenceMonitor
 from tests.dummy_mopidy import DummyMopidyInstance
 
 MOCK_STATION_TYPE = "station"
@@ -52,9 +51,13 @@ MOCK_AD_TYPE = "ad"
 
 
 @pytest.fixture
-def config():
+def config(tmp_path):
     return {
-        "http": {"hostname": "127.0.0.1", "port": 6680},
+        "core": {
+            "cache_dir": str(tmp_path / "cache"),
+            "data_dir": str(tmp_path / "data"),
+        },
+        "http": {"enabled": True, "hostname": "127.0.0.1", "port": 6680},
         "proxy": {"hostname": "host_mock", "port": 8080},
         "pandora": {
             "enabled": True,
@@ -70,6 +73,24 @@ def config():
             "sort_order": "a-z",
             "auto_setup": True,
             "cache_time_to_live": 86400,
+            "cache_max_stale": 86400,
+            "persistent_cache": True,
+            "auth_token_lifetime": 21600,
+            "playlist_prefetch_threshold": 1,
+            "audio_url_lifetime": 3600,
+            "http_pool_connections": 10,
+            "http_pool_maxsize": 10,
+            "http_keep_alive": True,
+            "http_tcp_nodelay": True,
+            "api_retries": 0,
+            "circuit_breaker_threshold": 5,
+            "circuit_breaker_reset_timeout": 30,
+            "asyncio_api_enabled": False,
+            "check_upcoming_tracks": True,
+            "lookahead_tracks": 1,
+            "image_cache_size": 0,
+            "tracing_file": "",
+            "tracing_otlp_endpoint": "",
             "event_support_enabled": True,
             "double_click_interval": "0.5",
             "on_pause_resume_click": "thumbs_up",
@@ -123,42 +144,45 @@ def rq():
 
 
 @pytest.fixture
-def event_sequence(rq):
-    return EventSequence(
-        "match_mock",
-        ["e1", "e2", "e3"],
-        rq,
-        interval=0.1,
-        strict=False,
-    )
+def scheduler():
+    scheduler = utils.Scheduler()
+    yield scheduler
+    scheduler.stop(timeout=1.0)
 
 
 @pytest.fixture
-def event_sequence_strict(rq):
-    return EventSequence(
-        "match_mock",
-        ["e1", "e2", "e3"],
-        rq,
-        interval=0.1,
-        strict=True,
-    )
+def event_sequence():
+    return EventSequence("match_mock", ["e1", "e2", "e3"])
 
 
 @pytest.fixture
-def event_sequence_wait(rq):
-    return EventSequence(
-        "match_mock",
-        ["e1", "e2", "e3"],
-        rq,
-        interval=0.1,
-        strict=False,
-        wait_for="w1",
-    )
+def event_sequence_strict():
+    return EventSequence("match_mock", ["e1", "e2", "e3"], strict=True)
+
+
+@pytest.fixture
+def event_sequence_wait():
+    return EventSequence("match_mock", ["e1", "e2", "e3"], wait_for="w1")
+
+
+@pytest.fixture
+def sequence_monitor(event_sequence, rq, scheduler):
+    return SequenceMonitor([event_sequence], scheduler, rq.put, interval=0.1)
 
 
 @pytest.fixture
-def event_sequences(event_sequence, event_sequence_strict, event_sequence_wait):
-    return [event_sequence, event_sequence_strict, event_sequence_wait]
+def sequence_monitor_strict(event_sequence_strict, rq, scheduler):
+    return SequenceMonitor([event_sequence_strict], scheduler, rq.put, interval=0.1)
+
+
+@pytest.fixture
+def sequence_monitor_wait(event_sequence_wait, rq, scheduler):
+    return SequenceMonitor([event_sequence_wait], scheduler, rq.put, interval=0.1)
+
+
+@pytest.fixture
+def sequence_monitors(sequence_monitor, sequence_monitor_strict, sequence_monitor_wait):
+    return [sequence_monitor, sequence_monitor_strict, sequence_monitor_wait]
 
 
 @pytest.fixture
@@ -288,11 +312,10 @@ def ad_metadata_result_mock():
 
 @pytest.fixture
 def playlist_mock(config, playlist_result_mock, simulate_request_exceptions=False):
-    with mock.patch.object(APIClient, "__call__", mock.Mock()) as call_mock:
+    api = get_backend(config, simulate_request_exceptions).api
+    with mock.patch.object(type(api.transport), "__call__", mock.Mock()) as call_mock:
         call_mock.return_value = playlist_result_mock["result"]
-        return get_backend(config, simulate_request_exceptions).api.get_playlist(
-            MOCK_STATION_TOKEN
-        )
+        return api.get_playlist(MOCK_STATION_TOKEN)
 
 
 @pytest.fixture
@@ -501,6 +524,9 @@ class ThreadJoiner:
     not be joined within the time-out period. The latter is obviously only
     useful if ``check_alive`` is set to a false value.
 
+    Worker threads of the shared :data:`mopidy_pandora.utils.executor` are
+    never joined; the manager waits for the executor to become idle instead.
+
     """
 
     def __init__(self, timeout, check_alive=True):
@@ -511,16 +537,25 @@ class ThreadJoiner:
         self.before = set(threading.enumerate())
         return self
 
+    def _new_threads(self):
+        return {
+            thread
+            for thread in set(threading.enumerate()) - self.before
+            if not utils.executor.owns(thread)
+        }
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        for thread in set(threading.enumerate()) - self.before:
+        for thread in self._new_threads():
             thread.join(self.timeout)
             if self.check_alive and thread.is_alive():
                 msg = f"Timeout joining thread {thread}"
                 raise RuntimeError(msg)
-        self.left_behind = sorted(
-            set(threading.enumerate()) - self.before, key=lambda t: t.name
-        )
+        if not utils.executor.wait_idle(self.timeout) and self.check_alive:
+            msg = "Timeout waiting for worker tasks to complete"
+            raise RuntimeError(msg)
+        self.left_behind = sorted(self._new_threads(), key=lambda t: t.name)
 
     def wait(self, timeout):
-        for thread in set(threading.enumerate()) - self.before:
+        for thread in self._new_threads():
             thread.join(timeout)
+        utils.executor.wait_idle(timeout)
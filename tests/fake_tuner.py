@@ -0,0 +1,641 @@
+"""A fake Pandora tuner for end-to-end and load tests.
+
+The server implements enough of the Pandora JSON API for the real pydora
+transport, including its Blowfish encryption and TLS requirements, to be
+used against it: partner and user login, station lists, stations,
+playlists, genre stations, search, and feedback. The audio URLs in the
+playlists point back at the server, which serves a small fake audio file.
+
+Latency and errors can be injected to see how the client stack behaves when
+the Pandora servers are slow or unreliable.
+
+The server can also be run on its own and used as the ``api_host`` of a
+Mopidy instance::
+
+    python -m tests.fake_tuner --port 8080 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import base64
+import collections
+import hashlib
+import itertools
+import json
+import logging
+import pathlib
+import random
+import re
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import blowfish
+from pandora.clientbuilder import Encryptor
+from pandora.transport import APITransport
+
+from mopidy_pandora.client import MopidyAPIClient, MopidySettingsDictBuilder
+
+logger = logging.getLogger(__name__)
+
+PARTNER_USER = "android"
+PARTNER_PASSWORD = "fake_partner_password"
+PARTNER_DEVICE = "android-generic"
+ENCRYPTION_KEY = "fake_encryption_key"
+DECRYPTION_KEY = "fake_decryption_key"
+USERNAME = "john"
+PASSWORD = "smith"
+
+PLAYLIST_LENGTH = 4
+AUDIO_DATA = b"\x00" * 1024
+
+
+def _handler_name(method):
+    """Return the name of the handler for an API method, e.g.
+    ``_api_station_get_playlist`` for ``station.getPlaylist``.
+    """
+    name = re.sub(r"(?<=[a-z])(?=[A-Z])", "_", method).lower()
+    return "_api_" + name.replace(".", "_")
+
+
+class APIError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class FakeTuner:
+    """Local stand-in for the Pandora JSON API.
+
+    :param host: the address to listen on.
+    :param port: the port to listen on, or 0 to pick a free port.
+    :param latency: the number of seconds to wait before answering each
+        request.
+    :param jitter: a random number of seconds, up to this value, that is
+        added to ``latency`` for each request.
+    :param error_rate: the fraction of API calls that fail with
+        ``error_code``.
+    :param error_code: the Pandora API error code to use for random errors,
+        or None to fail with an HTTP 503 response instead.
+    :param station_count: the number of stations in the user's station list.
+    :param tls: serve the API methods that require TLS over HTTPS, using a
+        self-signed certificate. Requires the ``openssl`` command.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host="127.0.0.1",
+        port=0,
+        *,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_code=0,
+        station_count=10,
+        tls=True,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+
+        self.calls = collections.Counter()
+        self._lock = threading.Lock()
+        self._errors = collections.defaultdict(collections.deque)
+        self._tokens = itertools.count(1)
+        self._partner_tokens = set()
+        self._user_tokens = set()
+        self._feedback = []
+
+        # Requests are encrypted with the partner's encryption key, while the
+        # sync time is encrypted with the partner's decryption key.
+        self.encryptor = Encryptor(DECRYPTION_KEY, ENCRYPTION_KEY)
+        self._sync_time_cipher = blowfish.Cipher(DECRYPTION_KEY.encode("ascii"))
+
+        self.stations = [self._station_json(i) for i in range(1, station_count + 1)]
+        self.genre_categories = {
+            f"Genre {c}": [
+                {
+                    "stationId": f"G{c}{i:02d}",
+                    "stationToken": f"G{c}{i:02d}",
+                    "stationName": f"Genre {c} Station {i}",
+                }
+                for i in range(1, 6)
+            ]
+            for c in range(1, 4)
+        }
+
+        self._tmp_dir = None
+        ssl_context = None
+        if tls:
+            self._tmp_dir = tempfile.TemporaryDirectory(prefix="fake-tuner-")
+            self.certfile = self._create_certificate(pathlib.Path(self._tmp_dir.name))
+            ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ssl_context.load_cert_chain(self.certfile)
+        else:
+            self.certfile = None
+
+        self.server = _Server((host, port), _Handler, self, ssl_context)
+        self._thread = None
+
+    @staticmethod
+    def _create_certificate(path):
+        if shutil.which("openssl") is None:
+            msg = "The 'openssl' command is required to serve the fake tuner over TLS."
+            raise RuntimeError(msg)
+
+        certfile = path / "cert.pem"
+        subprocess.run(  # noqa: S603
+            [  # noqa: S607
+                "openssl",
+                "req",
+                "-x509",
+                "-newkey",
+                "ec",
+                "-pkeyopt",
+                "ec_paramgen_curve:prime256v1",
+                "-nodes",
+                "-days",
+                "1",
+                "-subj",
+                "/CN=localhost",
+                "-addext",
+                "subjectAltName=IP:127.0.0.1,DNS:localhost",
+                "-keyout",
+                str(certfile),
+                "-out",
+                str(certfile),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        return certfile
+
+    @property
+    def api_host(self):
+        """The value to use for the ``api_host`` setting."""
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}/services/json/"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="FakeTuner", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def settings(self, **overrides):
+        """The settings for :class:`MopidySettingsDictBuilder` to use the
+        fake tuner.
+        """
+        settings = {
+            "CACHE_TTL": 0,
+            "API_HOST": self.api_host,
+            "DECRYPTION_KEY": DECRYPTION_KEY,
+            "ENCRYPTION_KEY": ENCRYPTION_KEY,
+            "PARTNER_USER": PARTNER_USER,
+            "PARTNER_PASSWORD": PARTNER_PASSWORD,
+            "DEVICE": PARTNER_DEVICE,
+        }
+        settings.update(overrides)
+        return settings
+
+    def build_client(self, **overrides):
+        """Build a :class:`MopidyAPIClient` that trusts the fake tuner's
+        certificate, and log in.
+        """
+        client = MopidySettingsDictBuilder(
+            self.settings(**overrides), client_class=MopidyAPIClient
+        ).build()
+        self.trust(client.transport._http)
+        client.login(USERNAME, PASSWORD)
+        return client
+
+    def trust(self, session):
+        """Configure a :class:`requests.Session` to trust the fake tuner's
+        certificate.
+        """
+        if self.certfile is not None:
+            session.verify = str(self.certfile)
+        # Otherwise REQUESTS_CA_BUNDLE, if set, takes precedence over 'verify',
+        # and proxies that cannot reach the fake tuner may be used.
+        session.trust_env = False
+
+    def inject_error(self, method, code=0, count=1):
+        """Fail the next ``count`` calls of an API method.
+
+        :param method: the name of the API method, e.g.
+            ``station.getPlaylist``.
+        :param code: the Pandora API error code to fail with, or None to fail
+            with an HTTP 503 response instead.
+        :param count: the number of calls to fail.
+        """
+        with self._lock:
+            self._errors[method].extend([code] * count)
+
+    def expire_auth_tokens(self):
+        """Invalidate all partner and user auth tokens, as if they have
+        expired.
+        """
+        with self._lock:
+            self._partner_tokens.clear()
+            self._user_tokens.clear()
+
+    @property
+    def feedback(self):
+        """List of the ``(method, track_token)`` feedback that was received."""
+        with self._lock:
+            return list(self._feedback)
+
+    def _station_json(self, i):
+        station_id = f"{i:019d}"
+        return {
+            "stationId": station_id,
+            "stationToken": station_id,
+            "stationName": f"Fake Station {i}",
+            "stationDetailUrl": f"https://fake.pandora.invalid/station/{station_id}",
+            "artUrl": f"https://fake.pandora.invalid/art/{station_id}.jpg",
+            "genre": ["Fake Genre"],
+            "dateCreated": {"time": 1_500_000_000_000 + i * 1000},
+            "allowDelete": True,
+            "allowRename": True,
+            "allowAddMusic": True,
+            "isQuickMix": False,
+        }
+
+    def _new_token(self, prefix):
+        return f"{prefix}{next(self._tokens):08d}"
+
+    def _checksum(self, data):
+        return hashlib.md5(  # noqa: S324
+            json.dumps(data, sort_keys=True).encode()
+        ).hexdigest()
+
+    def _sync_time(self):
+        # The client decrypts the sync time with its decryption key, and
+        # ignores the first four and the last two bytes.
+        plain = b"fake" + str(int(time.time())).encode("ascii") + b"\r\n"
+        encrypted = b"".join(self._sync_time_cipher.encrypt_ecb(plain))
+        return base64.b16encode(encrypted).decode().lower()
+
+    def _audio_url(self, track_token, quality):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/audio/{track_token}-{quality}.mp4"
+
+    def _playlist_item(self, station_id):
+        track_token = self._new_token("T")
+        return {
+            "trackToken": track_token,
+            "songName": f"Fake Song {track_token}",
+            "artistName": "Fake Artist",
+            "albumName": "Fake Album",
+            "albumArtUrl": f"https://fake.pandora.invalid/art/{track_token}.jpg",
+            "songDetailUrl": f"https://fake.pandora.invalid/song/{track_token}",
+            "audioUrlMap": {
+                quality: {
+                    "bitrate": bitrate,
+                    "encoding": "aacplus",
+                    "audioUrl": self._audio_url(track_token, quality),
+                    "protocol": "http",
+                }
+                for quality, bitrate in [
+                    ("highQuality", "64"),
+                    ("mediumQuality", "64"),
+                    ("lowQuality", "32"),
+                ]
+            },
+            "trackLength": 180,
+            "trackGain": "0.0",
+            "stationId": station_id,
+            "songRating": 0,
+            "allowFeedback": True,
+            "adToken": None,
+        }
+
+    def _find_station(self, token):
+        for station in self.stations:
+            if token in (station["stationId"], station["stationToken"]):
+                return station
+        raise APIError(1006, "Station does not exist.")
+
+    def call(self, method, params, data, *, secure):
+        """Handle an API call.
+
+        :return: the result of the call.
+        :raises APIError: if the call failed.
+        """
+        with self._lock:
+            self.calls[method] += 1
+
+        if method in APITransport.REQUIRE_TLS and not secure and self.certfile:
+            raise APIError(6, "Secure protocol required.")
+        self._check_auth(method, params.get("auth_token"))
+
+        handler = getattr(self, _handler_name(method), None)
+        if handler is None:
+            raise APIError(14, f"Unknown method name {method!r}.")
+        with self._lock:
+            return handler(data)
+
+    def _check_auth(self, method, auth_token):
+        if method == "auth.partnerLogin":
+            return
+        with self._lock:
+            if method == "auth.userLogin":
+                valid = auth_token in self._partner_tokens
+            else:
+                valid = auth_token in self._user_tokens
+        if not valid:
+            raise APIError(1001, "Invalid auth token.")
+
+    def _api_auth_partner_login(self, data):
+        if (data.get("username"), data.get("password")) != (
+            PARTNER_USER,
+            PARTNER_PASSWORD,
+        ):
+            raise APIError(1002, "Invalid partner login.")
+        token = self._new_token("P")
+        self._partner_tokens.add(token)
+        return {
+            "syncTime": self._sync_time(),
+            "partnerAuthToken": token,
+            "partnerId": "42",
+        }
+
+    def _api_auth_user_login(self, data):
+        if (data.get("username"), data.get("password")) != (USERNAME, PASSWORD):
+            raise APIError(1002, "Invalid login.")
+        token = self._new_token("U")
+        self._user_tokens.add(token)
+        return {
+            "userId": "1000",
+            "userAuthToken": token,
+            "canListen": True,
+            "hasAudioAds": False,
+            "isCapped": False,
+        }
+
+    def _api_user_get_station_list(self, _data):
+        return {"stations": self.stations, "checksum": self._checksum(self.stations)}
+
+    def _api_user_get_station_list_checksum(self, _data):
+        return {"checksum": self._checksum(self.stations)}
+
+    def _api_station_get_station(self, data):
+        return self._find_station(data.get("stationToken"))
+
+    def _api_station_get_playlist(self, data):
+        station = self._find_station(data.get("stationToken"))
+        return {
+            "items": [
+                self._playlist_item(station["stationId"])
+                for _ in range(PLAYLIST_LENGTH)
+            ]
+        }
+
+    def _api_station_create_station(self, data):
+        station = self._station_json(len(self.stations) + 1)
+        station["stationName"] = f"Station for {data.get('musicToken')}"
+        self.stations.append(station)
+        return station
+
+    def _api_station_delete_station(self, data):
+        station = self._find_station(data.get("stationToken"))
+        self.stations.remove(station)
+
+    def _api_station_get_genre_stations(self, _data):
+        return {
+            "categories": [
+                {"categoryName": name, "stations": stations}
+                for name, stations in self.genre_categories.items()
+            ],
+            "checksum": self._checksum(self.genre_categories),
+        }
+
+    def _api_station_get_genre_stations_checksum(self, _data):
+        return {"checksum": self._checksum(self.genre_categories)}
+
+    def _api_music_search(self, data):
+        text = data.get("searchText", "")
+        return {
+            "nearMatchesAvailable": False,
+            "explanation": "",
+            "songs": [
+                {
+                    "musicToken": f"S{i}",
+                    "songName": f"{text} Song {i}",
+                    "artistName": "Fake Artist",
+                    "score": 100 - i,
+                }
+                for i in range(3)
+            ],
+            "artists": [
+                {
+                    "musicToken": f"R{i}",
+                    "artistName": f"{text} Artist {i}",
+                    "likelyMatch": i == 0,
+                    "score": 100 - i,
+                }
+                for i in range(3)
+            ],
+            "genreStations": [],
+        }
+
+    def _add_feedback(self, method, data):
+        self._feedback.append((method, data.get("trackToken")))
+
+    def _api_station_add_feedback(self, data):
+        self._add_feedback("station.addFeedback", data)
+        return {
+            "feedbackId": self._new_token("F"),
+            "isPositive": data.get("isPositive"),
+        }
+
+    def _api_user_sleep_song(self, data):
+        self._add_feedback("user.sleepSong", data)
+
+    def _api_bookmark_add_artist_bookmark(self, data):
+        self._add_feedback("bookmark.addArtistBookmark", data)
+        return {"bookmarkToken": self._new_token("B")}
+
+    def _api_bookmark_add_song_bookmark(self, data):
+        self._add_feedback("bookmark.addSongBookmark", data)
+        return {"bookmarkToken": self._new_token("B")}
+
+    def delay(self):
+        """Wait for the configured latency."""
+        delay = self.latency + random.uniform(0, self.jitter)  # noqa: S311
+        if delay > 0:
+            time.sleep(delay)
+
+    def next_error(self, method):
+        """The error code that the next call of ``method`` should fail with.
+
+        :return: a tuple of whether the call should fail, and the error code,
+            which is None for HTTP errors.
+        """
+        with self._lock:
+            if self._errors[method]:
+                return True, self._errors[method].popleft()
+        if method != "auth.partnerLogin" and random.random() < self.error_rate:  # noqa: S311
+            return True, self.error_code
+        return False, None
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler_class, tuner, ssl_context):
+        super().__init__(address, handler_class)
+        self.tuner = tuner
+        self.ssl_context = ssl_context
+
+    def finish_request(self, request, client_address):
+        # HTTP and HTTPS requests are served on the same port, as the Pandora
+        # transport only switches the scheme for the methods that require TLS.
+        if self.ssl_context is not None:
+            try:
+                if request.recv(1, socket.MSG_PEEK) == b"\x16":
+                    request = self.ssl_context.wrap_socket(request, server_side=True)
+            except (OSError, ssl.SSLError):
+                return
+        try:
+            super().finish_request(request, client_address)
+        finally:
+            if isinstance(request, ssl.SSLSocket):
+                request.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002
+        logger.debug(format, *args)
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, data):
+        self._send(HTTPStatus.OK, json.dumps(data).encode("utf-8"))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        if urlsplit(self.path).path.startswith("/audio/"):
+            self._send(HTTPStatus.OK, AUDIO_DATA, content_type="audio/mp4")
+        else:
+            self._send(HTTPStatus.NOT_FOUND, b"")
+
+    def do_POST(self):
+        tuner = self.server.tuner
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        method = params.get("method", "")
+
+        tuner.delay()
+        fail, code = tuner.next_error(method)
+        if fail and code is None:
+            self._send(HTTPStatus.SERVICE_UNAVAILABLE, b"")
+            return
+
+        try:
+            if fail:
+                raise APIError(code, f"Injected error for {method!r}.")  # noqa: TRY301
+            data = self._decode_body(method, body)
+            result = tuner.call(
+                method,
+                params,
+                data,
+                secure=isinstance(self.connection, ssl.SSLSocket),
+            )
+        except APIError as exc:
+            self._send_json({"stat": "fail", "code": exc.code, "message": exc.message})
+            return
+
+        response = {"stat": "ok"}
+        if result is not None:
+            response["result"] = result
+        self._send_json(response)
+
+    def _decode_body(self, method, body):
+        try:
+            if method in APITransport.NO_ENCRYPT:
+                return json.loads(body)
+            data = self.server.tuner.encryptor.decrypt(body.decode())
+        except ValueError as exc:
+            raise APIError(8, "Unable to decode request body.") from exc
+        if "syncTime" not in data:
+            raise APIError(13, "Bad sync time.")
+        return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stations", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    tuner = FakeTuner(
+        args.host,
+        args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        station_count=args.stations,
+    )
+    sys.stdout.write(
+        "Add the following to your Mopidy configuration:\n\n"
+        "[pandora]\n"
+        f"api_host = {tuner.api_host}\n"
+        f"partner_encryption_key = {ENCRYPTION_KEY}\n"
+        f"partner_decryption_key = {DECRYPTION_KEY}\n"
+        f"partner_username = {PARTNER_USER}\n"
+        f"partner_password = {PARTNER_PASSWORD}\n"
+        f"partner_device = {PARTNER_DEVICE}\n"
+        f"username = {USERNAME}\n"
+        f"password = {PASSWORD}\n\n"
+        f"and start Mopidy with REQUESTS_CA_BUNDLE={tuner.certfile}\n"
+    )
+    tuner.start()
+    try:
+        tuner._thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tuner.stop()
+
+
+if __name__ == "__main__":
+    main()
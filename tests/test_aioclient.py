@@ -0,0 +1,283 @@
+import json
+import threading
+from unittest import mock
+
+import httpx
+import pytest
+import requests
+from pandora.errors import InvalidAuthToken, PandoraException
+from pandora.models.ad import AdItem
+from pandora.models.station import GenreStationList, StationList
+
+from mopidy_pandora.aioclient import AsyncAPIClient, AsyncAPITransport
+from mopidy_pandora.client import PooledHTTPAdapter
+
+from . import conftest
+
+
+@pytest.fixture
+def responses():
+    return {}
+
+
+@pytest.fixture
+def requested_methods():
+    return []
+
+
+@pytest.fixture
+def backend(config, responses, requested_methods):
+    config["pandora"]["asyncio_api_enabled"] = True
+    backend = conftest.get_backend(config)
+
+    def handler(request):
+        method = request.url.params["method"]
+        requested_methods.append(method)
+        response = responses[method]
+        if isinstance(response, httpx.Response):
+            return response
+        return httpx.Response(200, json=response)
+
+    backend.api.transport._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+
+    yield backend
+
+    backend.on_stop()
+
+
+def ok(result):
+    return {"stat": "ok", "result": result}
+
+
+def run(backend, coro):
+    return backend.api.aio.run(coro).result(timeout=5)
+
+
+def test_asyncio_api_disabled_by_default(config):
+    backend = conftest.get_backend(config)
+
+    assert not isinstance(backend.api.transport, AsyncAPITransport)
+    assert backend.api.aio is None
+
+
+def test_asyncio_api_enabled(backend):
+    assert isinstance(backend.api.transport, AsyncAPITransport)
+    assert isinstance(backend.api.aio, AsyncAPIClient)
+    assert backend.api.transport.loop_thread.is_alive()
+
+
+def test_transport_does_not_set_up_requests_pool(backend):
+    adapter = backend.api.transport._http.get_adapter("https://")
+
+    assert not isinstance(adapter, PooledHTTPAdapter)
+
+
+def test_on_stop_closes_event_loop(config):
+    config["pandora"]["asyncio_api_enabled"] = True
+    backend = conftest.get_backend(config)
+
+    backend.on_stop()
+
+    assert not backend.api.transport.loop_thread.is_alive()
+    assert backend.api.transport._client.is_closed
+
+
+def test_call_returns_result(backend, responses):
+    responses["test.method"] = ok({"key": "value"})
+
+    assert run(backend, backend.api.transport.call("test.method")) == {"key": "value"}
+
+
+def test_call_raises_pandora_exceptions_without_retrying(
+    backend, responses, requested_methods
+):
+    responses["test.method"] = {"stat": "fail", "code": 0, "message": "error_mock"}
+
+    with pytest.raises(PandoraException):
+        run(backend, backend.api.transport.call("test.method"))
+
+    assert requested_methods == ["test.method"]
+
+
+def test_call_does_not_retry_http_errors(backend, responses, requested_methods):
+    responses["test.method"] = httpx.Response(500)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        run(backend, backend.api.transport.call("test.method"))
+
+    assert requested_methods == ["test.method"]
+
+
+def test_client_retries_http_errors(backend, responses, requested_methods):
+    responses["test.method"] = httpx.Response(500)
+    backend.api.policy.retries = 2
+
+    with (
+        mock.patch.object(backend.api.policy, "backoff", return_value=0),
+        pytest.raises(requests.exceptions.HTTPError),
+    ):
+        run(backend, backend.api.aio("test.method"))
+
+    assert requested_methods == ["test.method"] * 3
+
+
+def test_blocking_call_runs_on_event_loop(backend, responses):
+    responses["test.method"] = ok({"key": "value"})
+    threads = []
+
+    async def call():
+        threads.append(threading.current_thread())
+        return await backend.api.transport.call("test.method")
+
+    assert backend.api.transport._run_blocking(call()) == {"key": "value"}
+    assert threads == [backend.api.transport.loop_thread]
+
+
+def test_test_url(backend, responses):
+    responses["test.method"] = ok({})
+
+    assert run(
+        backend, backend.api.aio.test_url("http://mockup.com/?method=test.method")
+    )
+
+
+def test_is_playable(backend, responses, requested_methods):
+    responses["test.method"] = ok({})
+    track = mock.Mock(audio_url="http://mockup.com/?method=test.method")
+
+    assert run(backend, backend.api.aio.is_playable(track))
+    assert not run(backend, backend.api.aio.is_playable(mock.Mock(audio_url=None)))
+    assert requested_methods == ["test.method"]
+
+
+def test_client_reauthenticates_on_invalid_auth_token(backend):
+    backend.api._authenticate = mock.Mock()
+    backend.api.transport.call = mock.AsyncMock(
+        side_effect=[InvalidAuthToken("error_mock"), {"key": "value"}]
+    )
+
+    assert run(backend, backend.api.aio("test.method")) == {"key": "value"}
+    assert backend.api._authenticate.called
+
+
+def test_get_station_list(backend, responses, station_list_result_mock):
+    responses["user.getStationList"] = ok(station_list_result_mock)
+
+    station_list = run(backend, backend.api.aio.get_station_list())
+
+    assert isinstance(station_list, StationList)
+    assert len(station_list) == len(station_list_result_mock["stations"])
+    assert station_list._api_client is backend.api
+
+
+def test_get_genre_stations(backend, responses, genre_stations_result_mock):
+    responses["station.getGenreStations"] = ok(genre_stations_result_mock)
+    responses["station.getGenreStationsChecksum"] = ok({"checksum": "checksum_mock"})
+
+    genre_stations = run(backend, backend.api.aio.get_genre_stations())
+
+    assert isinstance(genre_stations, GenreStationList)
+    assert "Category mock" in genre_stations
+    assert genre_stations.checksum == "checksum_mock"
+
+
+def test_fetch_genre_stations_retrieves_checksum_concurrently(
+    backend, responses, requested_methods, genre_stations_result_mock
+):
+    responses["station.getGenreStations"] = ok(genre_stations_result_mock)
+    responses["station.getGenreStationsChecksum"] = ok({"checksum": "checksum_mock"})
+
+    genre_stations = backend.api._fetch_genre_stations()
+
+    assert "Category mock" in genre_stations
+    assert genre_stations.checksum == "checksum_mock"
+    assert sorted(requested_methods) == [
+        "station.getGenreStations",
+        "station.getGenreStationsChecksum",
+    ]
+
+
+def test_get_stations_retrieves_unknown_stations_on_event_loop(
+    backend, responses, requested_methods, station_list_result_mock, station_result_mock
+):
+    backend.api.get_station_list = mock.Mock(
+        return_value=StationList.from_json(backend.api, station_list_result_mock)
+    )
+    responses["station.getStation"] = ok(station_result_mock["result"])
+
+    futures = backend.api.get_stations([conftest.MOCK_STATION_ID, "unknown_token"])
+
+    assert futures[conftest.MOCK_STATION_ID].result(timeout=5).name == (
+        conftest.MOCK_STATION_NAME + " 1"
+    )
+    assert futures["unknown_token"].result(timeout=5).name == conftest.MOCK_STATION_NAME
+    assert requested_methods == ["station.getStation"]
+    assert backend.api.get_station("unknown_token").name == conftest.MOCK_STATION_NAME
+
+
+def test_get_playlist_resolves_advertisements(
+    backend, responses, playlist_result_mock, ad_metadata_result_mock
+):
+    result = json.loads(json.dumps(playlist_result_mock["result"]))
+    result["items"].append({"adToken": conftest.MOCK_TRACK_AD_TOKEN})
+    responses["station.getPlaylist"] = ok(result)
+    ad_metadata = dict(ad_metadata_result_mock["result"])
+    ad_metadata["adTrackingTokens"] = list(ad_metadata["adTrackingTokens"])
+    responses["ad.getAdMetadata"] = ok(ad_metadata)
+
+    playlist = backend.api.get_playlist(conftest.MOCK_STATION_TOKEN)
+
+    assert playlist[0].song_name == conftest.MOCK_TRACK_NAME
+    assert isinstance(playlist[1], AdItem)
+    assert isinstance(playlist[2], AdItem)
+    assert playlist[1].station_id == conftest.MOCK_STATION_TOKEN
+    assert playlist[1].ad_token == conftest.MOCK_TRACK_AD_TOKEN
+
+
+def test_feedback_methods(backend, responses, requested_methods):
+    for method in [
+        "station.addFeedback",
+        "user.sleepSong",
+        "bookmark.addArtistBookmark",
+        "bookmark.addSongBookmark",
+        "station.deleteStation",
+    ]:
+        responses[method] = ok(None)
+
+    run(backend, backend.api.aio.add_feedback("token_mock", True))
+    run(backend, backend.api.aio.sleep_song("token_mock"))
+    run(backend, backend.api.aio.add_artist_bookmark("token_mock"))
+    run(backend, backend.api.aio.add_song_bookmark("token_mock"))
+    run(backend, backend.api.aio.delete_station("token_mock"))
+
+    assert requested_methods == [
+        "station.addFeedback",
+        "user.sleepSong",
+        "bookmark.addArtistBookmark",
+        "bookmark.addSongBookmark",
+        "station.deleteStation",
+    ]
+
+
+def test_search(backend, responses, search_result_mock):
+    responses["music.search"] = ok(search_result_mock)
+
+    result = run(backend, backend.api.aio.search("search_mock"))
+
+    assert result.songs[0].token == "S1234567"
+
+
+def test_create_station(backend, responses, station_result_mock):
+    responses["station.createStation"] = ok(station_result_mock["result"])
+
+    station = run(backend, backend.api.aio.create_station("S1234567"))
+
+    assert station.id == conftest.MOCK_STATION_ID
+    assert station._api_client is backend.api
+
+
+def test_create_station_requires_token(backend):
+    with pytest.raises(KeyError):
+        run(backend, backend.api.aio.create_station())
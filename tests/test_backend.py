@@ -3,10 +3,10 @@ from unittest import mock
 
 from mopidy import backend as backend_api
 from mopidy import models
-from pandora.client import APIClient, BaseAPIClient
+from pandora.client import BaseAPIClient
 from pandora.errors import PandoraException
 
-from mopidy_pandora import client, library, playback
+from mopidy_pandora import client, library, playback, utils
 from mopidy_pandora.backend import PandoraBackend
 from mopidy_pandora.library import PandoraLibraryProvider
 from tests.conftest import get_backend
@@ -55,14 +55,76 @@ def test_init_sets_preferred_audio_quality(config):
     assert backend.api.default_audio_quality == BaseAPIClient.LOW_AUDIO_QUALITY
 
 
-def test_on_start_logs_in(config):
+def test_on_start_logs_in_in_background(config):
     backend = get_backend(config)
 
-    login_mock = mock.Mock()
-    backend.api.login = login_mock
-    backend.on_start()
+    with (
+        mock.patch.object(backend.api, "set_credentials") as set_credentials_mock,
+        mock.patch.object(
+            backend.api, "ensure_authenticated"
+        ) as ensure_authenticated_mock,
+        mock.patch.object(utils.executor, "submit") as submit_mock,
+    ):
+        backend.on_start()
+        submit_mock.call_args.args[0]()
+
+    set_credentials_mock.assert_called_once_with("john", "smith")
+    ensure_authenticated_mock.assert_called_once_with()
+
+
+def test_background_login_handles_errors(config, caplog):
+    backend = get_backend(config, True)
+    backend.api.set_credentials("john", "smith")
+
+    backend._login()
+
+    assert "Error logging in to Pandora, retrying when needed." in caplog.text
+    assert backend.api.needs_authentication
+
+
+def test_prepare_next_track_adds_upcoming_track(config):
+    track = models.Ref.track(
+        name="name_mock", uri="pandora:track:id_token_mock:id_token_mock"
+    )
+    with mock.patch.object(
+        PandoraLibraryProvider, "get_next_pandora_track", return_value=track
+    ):
+        backend = get_backend(config)
+        backend._trigger_next_track_available = mock.Mock()
+
+        backend.prepare_next_track("id_token_mock")
+
+        assert list(backend.playback._upcoming_uris) == [track.uri]
+        backend._trigger_next_track_available.assert_called_once_with(track, False)
+
+
+def test_prepare_next_track_does_not_add_upcoming_track_if_not_checked(config):
+    config["pandora"]["check_upcoming_tracks"] = False
+    with mock.patch.object(PandoraLibraryProvider, "get_next_pandora_track"):
+        backend = get_backend(config)
+        backend._trigger_next_track_available = mock.Mock()
+
+        backend.prepare_next_track("id_token_mock")
+
+        assert not backend.playback._upcoming_uris
+
+
+def test_playback_checks_upcoming_tracks(config, tl_track_mock):
+    backend = get_backend(config)
+
+    with mock.patch.object(
+        backend.playback, "check_upcoming_tracks"
+    ) as check_upcoming_tracks_mock:
+        backend.track_playback_started(tl_track_mock)
+        backend.track_playback_resumed(tl_track_mock, 1000)
+        backend.track_playback_started(
+            models.TlTrack(tlid=1, track=models.Track(uri="file:///mock.mp3"))
+        )
 
-    backend.api.login.assert_called_once_with("john", "smith")
+    assert check_upcoming_tracks_mock.call_args_list == [
+        mock.call(tl_track_mock.track, 0),
+        mock.call(tl_track_mock.track, 1000),
+    ]
 
 
 def test_prepare_next_track_triggers_event(config):
@@ -84,11 +146,13 @@ def test_prepare_next_track_triggers_event(config):
 
 def test_process_event_calls_method(config, caplog):
     caplog.set_level(logging.INFO)
+    backend = get_backend(config)
     with (
         mock.patch.object(PandoraLibraryProvider, "lookup_pandora_track", mock.Mock()),
-        mock.patch.object(APIClient, "__call__", mock.Mock()) as mock_call,
+        mock.patch.object(
+            type(backend.api.transport), "__call__", mock.Mock()
+        ) as mock_call,
     ):
-        backend = get_backend(config)
         uri_mock = "pandora:track:id_token_mock:id_token_mock"
         backend._trigger_event_processed = mock.Mock()
 
@@ -105,6 +169,7 @@ def test_process_event_calls_method(config, caplog):
                 backend.library.browse = mock.Mock()
 
             backend.process_event(uri_mock, event)
+            assert backend.feedback.wait(timeout=1.0)
 
             assert mock_call.called
             mock_call.reset_mock()
@@ -115,6 +180,49 @@ def test_process_event_calls_method(config, caplog):
 
 
 def test_process_event_handles_pandora_exception(config, caplog):
+    with (
+        mock.patch.object(PandoraBackend, "delete_station", mock.Mock()) as mock_call,
+    ):
+        backend = get_backend(config)
+        uri_mock = "pandora:track:id_token_mock:id_token_mock"
+        backend._trigger_event_processed = mock.Mock()
+        mock_call.side_effect = PandoraException("exception_mock")
+
+        assert not backend.process_event(uri_mock, "delete_station")
+        mock_call.assert_called_with(uri_mock)
+        assert not backend._trigger_event_processed.called
+
+        assert "Error calling Pandora event: delete_station." in caplog.text
+
+
+def test_process_event_handles_circuit_open_error(config, caplog):
+    backend = get_backend(config)
+    uri_mock = "pandora:track:id_token_mock:id_token_mock"
+    backend._trigger_event_processed = mock.Mock()
+    backend.api.policy.breaker.failure_threshold = 1
+    backend.api.policy.breaker.record_failure()
+
+    assert not backend.process_event(uri_mock, "delete_station")
+    assert not backend._trigger_event_processed.called
+
+    assert "Error calling Pandora event: delete_station." in caplog.text
+
+
+def test_process_event_queues_feedback(config):
+    with (
+        mock.patch.object(PandoraLibraryProvider, "lookup_pandora_track", mock.Mock()),
+        mock.patch.object(PandoraBackend, "thumbs_up", mock.Mock()) as mock_call,
+    ):
+        backend = get_backend(config)
+        uri_mock = "pandora:track:id_token_mock:id_token_mock"
+        backend.feedback.stop()
+
+        assert backend.process_event(uri_mock, "thumbs_up")
+        assert not mock_call.called
+        assert len(backend.feedback) == 1
+
+
+def test_process_event_handles_feedback_pandora_exception(config, caplog):
     with (
         mock.patch.object(PandoraLibraryProvider, "lookup_pandora_track", mock.Mock()),
         mock.patch.object(PandoraBackend, "thumbs_up", mock.Mock()) as mock_call,
@@ -124,7 +232,8 @@ def test_process_event_handles_pandora_exception(config, caplog):
         backend._trigger_event_processed = mock.Mock()
         mock_call.side_effect = PandoraException("exception_mock")
 
-        assert not backend.process_event(uri_mock, "thumbs_up")
+        assert backend.process_event(uri_mock, "thumbs_up")
+        assert backend.feedback.wait(timeout=1.0)
         mock_call.assert_called_with(uri_mock)
         assert not backend._trigger_event_processed.called
 
@@ -0,0 +1,165 @@
+"""Benchmarks for the hot paths of the library provider, Pandora URIs, and the
+event monitor.
+
+The benchmarks run against a mocked transport, so they never contact the
+Pandora server. Run them with ``tox -e benchmark``, which stores the results
+so that they can be compared between releases.
+"""
+
+import copy
+from unittest import mock
+
+import pytest
+from mopidy import models
+from pandora.models.playlist import PlaylistItem
+from pandora.models.station import StationList
+
+from mopidy_pandora import frontend
+from mopidy_pandora.library import TrackCacheItem
+from mopidy_pandora.uri import GenreUri, PandoraUri
+
+from . import conftest
+
+pytest.importorskip("pytest_benchmark")
+
+STATION_COUNT = 500
+LOOKUP_COUNT = 500
+EVENT_COUNT = 1000
+
+
+def station_json(i):
+    station_id = f"{i:019d}"
+    return {
+        "stationId": station_id,
+        "stationToken": station_id,
+        "stationName": f"{conftest.MOCK_STATION_NAME} {i}",
+        "artUrl": f"{conftest.MOCK_STATION_ART_URL}{i}",
+        "genre": [conftest.MOCK_STATION_GENRE],
+    }
+
+
+@pytest.fixture(scope="module")
+def station_list_result():
+    stations = [station_json(i) for i in range(1, STATION_COUNT + 1)]
+    # Add a QuickMix station that contains every other station.
+    quickmix = station_json(STATION_COUNT + 1)
+    quickmix.update(
+        {
+            "stationName": "QuickMix",
+            "isQuickMix": True,
+            "quickMixStationIds": [s["stationId"] for s in stations[::2]],
+        }
+    )
+    stations.append(quickmix)
+    return {"stations": stations, "checksum": conftest.MOCK_STATION_LIST_CHECKSUM}
+
+
+@pytest.fixture
+def backend(config, station_list_result):
+    backend = conftest.get_backend(config)
+
+    def transport_call(method, **data):
+        if method == "user.getStationList":
+            return copy.deepcopy(station_list_result)
+        if method == "user.getStationListChecksum":
+            return {"checksum": conftest.MOCK_STATION_LIST_CHECKSUM}
+        raise NotImplementedError(method)
+
+    with mock.patch.object(
+        type(backend.api.transport), "__call__", side_effect=transport_call
+    ):
+        yield backend
+
+
+@pytest.fixture
+def track_uris(backend, playlist_result_mock):
+    """URIs of tracks in the track cache, repeated ``LOOKUP_COUNT`` times in
+    total, as only the most recent tracks are kept in the cache.
+    """
+    track_json = playlist_result_mock["result"]["items"][0]
+    uris = []
+    for i in range(backend.library.pandora_track_cache.maxsize):
+        track = PlaylistItem.from_json(
+            backend.api, {**track_json, "trackToken": f"{i:096d}"}
+        )
+        uri = PandoraUri.factory(track).uri
+        backend.library.pandora_track_cache[uri] = TrackCacheItem(
+            models.Ref.track(name=track.song_name, uri=uri), track
+        )
+        uris.append(uri)
+    return (uris * LOOKUP_COUNT)[:LOOKUP_COUNT]
+
+
+def test_uri_factory_round_trip(benchmark, backend, track_uris, station_list_result):
+    stations = StationList.from_json(backend.api, station_list_result)
+    objects = [
+        *stations,
+        *(backend.library.lookup_pandora_track(uri) for uri in set(track_uris)),
+        *(GenreUri(f"Category {i}").uri for i in range(100)),
+    ]
+
+    def round_trip():
+        for obj in objects:
+            PandoraUri.factory(PandoraUri.factory(obj).uri)
+
+    benchmark(round_trip)
+
+
+def test_browse_stations(benchmark, backend):
+    result = benchmark(backend.library.browse, backend.library.root_directory.uri)
+
+    assert len(result) == STATION_COUNT + 2
+
+
+def test_formatted_station_list(benchmark, backend, station_list_result):
+    def setup():
+        stations = StationList.from_json(backend.api, station_list_result)
+        return (stations,), {}
+
+    result = benchmark.pedantic(
+        backend.library._formatted_station_list, setup=setup, rounds=100
+    )
+
+    assert result[0].is_quickmix
+
+
+def test_lookup_tracks(benchmark, backend, track_uris):
+    def lookup():
+        return [backend.library.lookup(uri) for uri in track_uris]
+
+    assert len(benchmark(lookup)) == LOOKUP_COUNT
+
+
+def test_lookup_stations(benchmark, backend):
+    uris = [PandoraUri.factory(s).uri for s in backend.api.get_station_list()]
+
+    def lookup():
+        return [backend.library.lookup(uri) for uri in uris]
+
+    assert len(benchmark(lookup)) == STATION_COUNT + 1
+
+
+def test_get_images(benchmark, backend, track_uris):
+    station_uris = [PandoraUri.factory(s).uri for s in backend.api.get_station_list()]
+
+    result = benchmark(backend.library.get_images, track_uris + station_uris)
+
+    assert len(result) == len(set(track_uris)) + STATION_COUNT + 1
+
+
+def test_event_monitor_throughput(benchmark, config, tl_track_mock):
+    core = mock.Mock()
+    monitor = frontend.EventMonitorFrontend(config, core)
+    monitor.on_start()
+    events = ["track_playback_paused", "track_playback_resumed", "volume_changed"]
+
+    def notify():
+        for i in range(EVENT_COUNT):
+            monitor.on_event(
+                events[i % len(events)], tl_track=tl_track_mock, time_position=1000
+            )
+
+    try:
+        benchmark(notify)
+    finally:
+        monitor.on_stop()
@@ -0,0 +1,52 @@
+import json
+
+from mopidy_pandora.cache import DiskCache
+
+from . import conftest
+
+
+def test_load_returns_saved_response(tmp_path, station_list_result_mock):
+    disk_cache = DiskCache(tmp_path)
+
+    disk_cache.save(
+        "station_list", station_list_result_mock, conftest.MOCK_STATION_LIST_CHECKSUM
+    )
+
+    assert disk_cache.load("station_list") == (
+        station_list_result_mock,
+        conftest.MOCK_STATION_LIST_CHECKSUM,
+    )
+
+
+def test_save_stores_json(tmp_path, station_list_result_mock):
+    DiskCache(tmp_path).save(
+        "station_list", station_list_result_mock, conftest.MOCK_STATION_LIST_CHECKSUM
+    )
+
+    with (tmp_path / "station_list.json").open(encoding="utf-8") as f:
+        assert json.load(f) == {
+            "response": station_list_result_mock,
+            "checksum": conftest.MOCK_STATION_LIST_CHECKSUM,
+        }
+
+
+def test_load_missing_returns_none(tmp_path):
+    disk_cache = DiskCache(tmp_path)
+
+    assert disk_cache.load("station_list") is None
+
+
+def test_load_corrupt_file_returns_none(tmp_path, caplog):
+    disk_cache = DiskCache(tmp_path)
+    (tmp_path / "station_list.json").write_text("corrupt")
+
+    assert disk_cache.load("station_list") is None
+    assert "Error reading Pandora station_list cache from disk." in caplog.text
+
+
+def test_save_handles_errors(tmp_path, caplog):
+    disk_cache = DiskCache(tmp_path / "missing_dir")
+
+    disk_cache.save("station_list", {}, None)
+
+    assert "Error writing Pandora station_list cache to disk." in caplog.text
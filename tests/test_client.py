@@ -1,11 +1,20 @@
+import socket
+import threading
 import time
 from unittest import mock
 
 import pytest
-from pandora.client import APIClient
+import requests
+from pandora import errors
+from pandora.client import APIClient, BaseAPIClient
 from pandora.models.station import GenreStationList, Station, StationList
 
-from mopidy_pandora.client import MopidyAPIClient
+from mopidy_pandora import Extension, utils
+from mopidy_pandora.client import (
+    MopidyAPIClient,
+    MopidyAPITransport,
+    PooledHTTPAdapter,
+)
 
 from . import conftest
 
@@ -14,8 +23,8 @@ def test_get_genre_stations(
     config, get_genre_stations_return_value_mock, genre_stations_result_mock
 ):
     with mock.patch.object(
-        APIClient,
-        "get_genre_stations",
+        MopidyAPIClient,
+        "_fetch_genre_stations",
         return_value=get_genre_stations_return_value_mock,
     ):
         backend = conftest.get_backend(config)
@@ -39,8 +48,8 @@ def test_get_genre_stations_populates_cache(
     config, get_genre_stations_return_value_mock
 ):
     with mock.patch.object(
-        APIClient,
-        "get_genre_stations",
+        MopidyAPIClient,
+        "_fetch_genre_stations",
         return_value=get_genre_stations_return_value_mock,
     ):
         backend = conftest.get_backend(config)
@@ -55,8 +64,8 @@ def test_get_genre_stations_changed_cached(
     config, get_genre_stations_return_value_mock
 ):
     with mock.patch.object(
-        APIClient,
-        "get_genre_stations",
+        MopidyAPIClient,
+        "_fetch_genre_stations",
         return_value=get_genre_stations_return_value_mock,
     ):
         # Ensure that the cache is re-used between calls
@@ -95,8 +104,8 @@ def test_get_genre_stations_changed_cached(
 
 def test_getgenre_stations_cache_disabled(config, get_genre_stations_return_value_mock):
     with mock.patch.object(
-        APIClient,
-        "get_genre_stations",
+        MopidyAPIClient,
+        "_fetch_genre_stations",
         return_value=get_genre_stations_return_value_mock,
     ):
         cache_config = config
@@ -113,8 +122,8 @@ def test_get_station_list(
     config, get_station_list_return_value_mock, station_list_result_mock
 ):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         backend = conftest.get_backend(config)
@@ -129,8 +138,8 @@ def test_get_station_list(
 
 def test_get_station_list_populates_cache(config, get_station_list_return_value_mock):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         backend = conftest.get_backend(config)
@@ -143,8 +152,8 @@ def test_get_station_list_populates_cache(config, get_station_list_return_value_
 
 def test_get_station_list_changed_cached(config, get_station_list_return_value_mock):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         # Ensure that the cache is re-used between calls
@@ -177,8 +186,8 @@ def test_get_station_list_changed_cached(config, get_station_list_return_value_m
 
 def test_getstation_list_cache_disabled(config, get_station_list_return_value_mock):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         cache_config = config
@@ -197,8 +206,8 @@ def test_get_station_list_changed_refreshed(
     # Ensure that the cache is invalidated if 'force_refresh' is True
     with (
         mock.patch.object(
-            APIClient,
-            "get_station_list",
+            MopidyAPIClient,
+            "_fetch_station_list",
             return_value=get_station_list_return_value_mock,
         ),
         mock.patch.object(StationList, "has_changed", return_value=True),
@@ -246,8 +255,8 @@ def test_get_station_list_handles_request_exception(config, caplog):
 
 def test_get_station(config, get_station_list_return_value_mock):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         backend = conftest.get_backend(config)
@@ -271,8 +280,8 @@ def test_get_station(config, get_station_list_return_value_mock):
 
 def test_get_invalid_station(config, get_station_list_return_value_mock):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         backend = conftest.get_backend(config)
@@ -283,6 +292,208 @@ def test_get_invalid_station(config, get_station_list_return_value_mock):
             backend.api.get_station("9999999999999999999")
 
 
+def test_get_station_caches_stations_missing_from_list(
+    config, get_station_list_return_value_mock, station_result_mock
+):
+    backend = conftest.get_backend(config)
+    with (
+        mock.patch.object(
+            MopidyAPIClient,
+            "_fetch_station_list",
+            return_value=get_station_list_return_value_mock,
+        ),
+        mock.patch.object(
+            MopidyAPITransport, "__call__", return_value=station_result_mock["result"]
+        ) as call_mock,
+    ):
+        station = backend.api.get_station("9999999999999999999")
+
+        assert backend.api.get_station("9999999999999999999") is station
+        assert call_mock.call_count == 1
+
+
+def test_get_station_rebuilds_index_when_list_is_refreshed(
+    config, get_station_list_return_value_mock, station_list_result_mock
+):
+    with mock.patch.object(
+        MopidyAPIClient,
+        "_fetch_station_list",
+        return_value=get_station_list_return_value_mock,
+    ):
+        backend = conftest.get_backend(config)
+        station = backend.api.get_station(conftest.MOCK_STATION_TOKEN)
+
+        refreshed_list = StationList.from_json(backend.api, station_list_result_mock)
+        backend.api.station_list_cache.clear()
+        backend.api.station_list_cache[time.time()] = refreshed_list
+
+        refreshed_station = backend.api.get_station(conftest.MOCK_STATION_TOKEN)
+        assert refreshed_station is not station
+        assert refreshed_station in refreshed_list
+
+
+def test_get_station_list_coalesces_concurrent_requests(
+    config, get_station_list_return_value_mock
+):
+    backend = conftest.get_backend(config)
+    started, release = threading.Event(), threading.Event()
+
+    def get_station_list(_self):
+        started.set()
+        release.wait(timeout=1.0)
+        return get_station_list_return_value_mock
+
+    with mock.patch.object(
+        MopidyAPIClient,
+        "_fetch_station_list",
+        autospec=True,
+        side_effect=get_station_list,
+    ) as get_station_list_mock:
+        futures = [utils.executor.submit(backend.api.get_station_list)]
+        started.wait(timeout=1.0)
+        futures += [utils.executor.submit(backend.api.get_station_list)]
+        # Give the other callers time to join the call in progress.
+        time.sleep(0.1)
+        release.set()
+
+        for future in futures:
+            assert future.result(timeout=1.0) is get_station_list_return_value_mock
+        assert get_station_list_mock.call_count == 1
+
+
+def test_get_station_list_coalesces_forced_refresh_with_other_requests(
+    config, station_list_result_mock
+):
+    backend = conftest.get_backend(config)
+    started, release = threading.Event(), threading.Event()
+
+    def get_station_list(self, method, **data):
+        started.set()
+        release.wait(timeout=1.0)
+        return station_list_result_mock
+
+    with mock.patch.object(
+        MopidyAPITransport, "__call__", autospec=True, side_effect=get_station_list
+    ) as transport_mock:
+        futures = [utils.executor.submit(backend.api.get_station_list, True)]
+        started.wait(timeout=1.0)
+        futures += [utils.executor.submit(backend.api.get_station_list)]
+        # Give the other callers time to join the call in progress.
+        time.sleep(0.1)
+        release.set()
+
+        results = [future.result(timeout=1.0) for future in futures]
+
+    assert results[0] is results[1]
+    assert transport_mock.call_count == 1
+
+
+def test_get_station_list_returns_stale_list_while_refreshing(
+    config, get_station_list_return_value_mock, station_list_result_mock
+):
+    backend = conftest.get_backend(config)
+    stale_list = StationList.from_json(backend.api, station_list_result_mock)
+    stale_at = time.time() - config["pandora"]["cache_time_to_live"] - 1
+    backend.api.station_list_cache[stale_at] = stale_list
+
+    with (
+        mock.patch.object(StationList, "has_changed", return_value=True),
+        mock.patch.object(
+            MopidyAPIClient,
+            "_fetch_station_list",
+            return_value=get_station_list_return_value_mock,
+        ) as get_station_list_mock,
+    ):
+        assert backend.api.get_station_list() is stale_list
+        utils.executor.wait_idle(timeout=1.0)
+
+        assert get_station_list_mock.call_count == 1
+        assert backend.api.get_station_list() is get_station_list_return_value_mock
+
+
+def test_get_station_list_revalidates_unchanged_stale_list(
+    config, station_list_result_mock
+):
+    backend = conftest.get_backend(config)
+    stale_list = StationList.from_json(backend.api, station_list_result_mock)
+    stale_at = time.time() - config["pandora"]["cache_time_to_live"] - 1
+    backend.api.station_list_cache[stale_at] = stale_list
+
+    with (
+        mock.patch.object(StationList, "has_changed", return_value=False),
+        mock.patch.object(
+            MopidyAPIClient, "_fetch_station_list"
+        ) as get_station_list_mock,
+    ):
+        assert backend.api.get_station_list() is stale_list
+        utils.executor.wait_idle(timeout=1.0)
+
+        assert not get_station_list_mock.called
+        assert next(iter(backend.api.station_list_cache)) > stale_at
+        assert backend.api.station_list_cache.currsize == 1
+
+
+@pytest.mark.parametrize(
+    "exception",
+    [
+        errors.InternalServerError("error_mock"),
+        requests.exceptions.ConnectionError("error_mock"),
+    ],
+)
+def test_get_station_list_logs_errors_while_refreshing(
+    config, station_list_result_mock, caplog, exception
+):
+    backend = conftest.get_backend(config)
+    stale_list = StationList.from_json(backend.api, station_list_result_mock)
+    stale_at = time.time() - config["pandora"]["cache_time_to_live"] - 1
+    backend.api.station_list_cache[stale_at] = stale_list
+
+    with mock.patch.object(StationList, "has_changed", side_effect=exception):
+        assert backend.api.get_station_list() is stale_list
+        utils.executor.wait_idle(timeout=1.0)
+
+    assert "Error refreshing Pandora station_list, using cached version." in (
+        caplog.text
+    )
+    assert type(exception).__name__ in caplog.text
+    assert not backend.api._revalidating
+
+
+@pytest.mark.parametrize(
+    ("genre_checksum", "call_count"), [("checksum_mock", 0), ("changed_mock", 1)]
+)
+def test_get_genre_stations_force_refresh_checks_genre_checksum(
+    config, get_genre_stations_return_value_mock, genre_checksum, call_count
+):
+    backend = conftest.get_backend(config)
+    get_genre_stations_return_value_mock.checksum = "checksum_mock"
+    backend.api.genre_stations_cache[time.time()] = get_genre_stations_return_value_mock
+
+    with (
+        mock.patch.object(
+            APIClient, "get_genre_stations_checksum", return_value=genre_checksum
+        ),
+        mock.patch.object(
+            APIClient, "get_station_list_checksum", return_value="station_mock"
+        ),
+        mock.patch.object(
+            MopidyAPIClient,
+            "_fetch_genre_stations",
+            return_value=get_genre_stations_return_value_mock,
+        ) as get_genre_stations_mock,
+    ):
+        backend.api.get_genre_stations(force_refresh=True)
+
+    assert get_genre_stations_mock.call_count == call_count
+
+
+def test_get_station_list_stale_disabled(config):
+    config["pandora"]["cache_max_stale"] = 0
+    backend = conftest.get_backend(config)
+
+    assert backend.api.station_list_cache.ttl == config["pandora"]["cache_time_to_live"]
+
+
 def test_create_genre_station_invalidates_cache(
     config,
     get_station_list_return_value_mock,
@@ -291,8 +502,8 @@ def test_create_genre_station_invalidates_cache(
 ):
     with (
         mock.patch.object(
-            APIClient,
-            "get_station_list",
+            MopidyAPIClient,
+            "_fetch_station_list",
             return_value=get_station_list_return_value_mock,
         ),
         mock.patch.object(
@@ -316,3 +527,307 @@ def test_create_genre_station_invalidates_cache(
         backend.library._create_station_for_token("test_token")
         assert t not in list(backend.api.station_list_cache)
         assert backend.api.station_list_cache.currsize == 1
+
+
+def pandora_responses(**responses):
+    """Patch the transport to return ``responses`` by API method, with the
+    dots in method names replaced by underscores.
+    """
+    return mock.patch.object(
+        MopidyAPITransport,
+        "__call__",
+        autospec=True,
+        side_effect=lambda self, method, **data: responses[method.replace(".", "_")],
+    )
+
+
+def method_calls(transport_mock, method):
+    return [c for c in transport_mock.call_args_list if c.args[1] == method]
+
+
+def test_get_station_list_persists_cache_to_disk(config, station_list_result_mock):
+    api = conftest.get_backend(config).api
+    # Simulate a restart
+    backend = conftest.get_backend(config)
+    with pandora_responses(
+        user_getStationList=station_list_result_mock,
+        user_getStationListChecksum={"checksum": conftest.MOCK_STATION_LIST_CHECKSUM},
+    ) as transport_mock:
+        api.get_station_list()
+        station_list = backend.api.get_station_list()
+
+    assert len(method_calls(transport_mock, "user.getStationList")) == 1
+    assert len(station_list) == len(station_list_result_mock["stations"])
+    assert station_list.checksum == conftest.MOCK_STATION_LIST_CHECKSUM
+    assert station_list._api_client is backend.api
+    assert all(station._api_client is backend.api for station in station_list)
+    assert backend.api.station_list_cache.currsize == 1
+
+
+def test_get_station_list_ignores_disk_cache_if_changed(
+    config, station_list_result_mock
+):
+    apis = [conftest.get_backend(config).api for _ in range(2)]
+    with pandora_responses(
+        user_getStationList=station_list_result_mock,
+        user_getStationListChecksum={"checksum": "changed_checksum"},
+    ) as transport_mock:
+        for api in apis:
+            api.get_station_list()
+
+    assert len(method_calls(transport_mock, "user.getStationList")) == 2
+
+
+def test_get_station_list_uses_disk_cache_if_checksum_unavailable(
+    config, station_list_result_mock
+):
+    api = conftest.get_backend(config).api
+    backend = conftest.get_backend(config)
+    with pandora_responses(
+        user_getStationList=station_list_result_mock
+    ) as transport_mock:
+        api.get_station_list()
+
+        with mock.patch.object(
+            APIClient,
+            "get_station_list_checksum",
+            side_effect=requests.exceptions.RequestException,
+        ):
+            assert len(backend.api.get_station_list()) == 3
+
+    assert len(method_calls(transport_mock, "user.getStationList")) == 1
+
+
+def test_get_genre_stations_persists_cache_to_disk(config, genre_stations_result_mock):
+    apis = [conftest.get_backend(config).api for _ in range(2)]
+    with pandora_responses(
+        station_getGenreStations=genre_stations_result_mock,
+        station_getGenreStationsChecksum={"checksum": "checksum_mock"},
+    ) as transport_mock:
+        for api in apis:
+            genre_stations = api.get_genre_stations()
+
+    assert len(method_calls(transport_mock, "station.getGenreStations")) == 1
+    assert "Category mock" in list(genre_stations)
+    assert genre_stations.checksum == "checksum_mock"
+    assert genre_stations._api_client is apis[1]
+
+
+def test_get_genre_stations_ignores_disk_cache_if_changed(
+    config, genre_stations_result_mock
+):
+    apis = [conftest.get_backend(config).api for _ in range(2)]
+    checksums = iter(["checksum_mock", "changed_checksum", "changed_checksum"])
+    with (
+        mock.patch.object(
+            APIClient,
+            "get_genre_stations_checksum",
+            side_effect=lambda: next(checksums),
+        ),
+        pandora_responses(
+            station_getGenreStations=genre_stations_result_mock,
+        ) as transport_mock,
+    ):
+        for api in apis:
+            genre_stations = api.get_genre_stations()
+
+    assert len(method_calls(transport_mock, "station.getGenreStations")) == 2
+    assert genre_stations.checksum == "changed_checksum"
+
+
+def test_persistent_cache_disabled(config, get_station_list_return_value_mock):
+    config["pandora"]["persistent_cache"] = False
+    with mock.patch.object(
+        MopidyAPIClient,
+        "_fetch_station_list",
+        return_value=get_station_list_return_value_mock,
+    ) as get_station_list_mock:
+        conftest.get_backend(config).api.get_station_list()
+
+        backend = conftest.get_backend(config)
+        assert backend.api.disk_cache is None
+        backend.api.get_station_list()
+
+        assert get_station_list_mock.call_count == 2
+
+
+def test_transport_uses_pooled_connections(config):
+    config["pandora"]["http_pool_connections"] = 5
+    config["pandora"]["http_pool_maxsize"] = 20
+    backend = conftest.get_backend(config)
+
+    assert isinstance(backend.api.transport, MopidyAPITransport)
+    for prefix in ["http://", "https://"]:
+        adapter = backend.api.transport._http.get_adapter(prefix)
+        assert isinstance(adapter, PooledHTTPAdapter)
+        assert adapter._pool_connections == 5
+        assert adapter._pool_maxsize == 20
+        # Failed requests are only retried by the ResiliencePolicy.
+        assert adapter.max_retries.total == 0
+
+
+def test_transport_requests_time_out(config):
+    transport = conftest.get_backend(config).api.transport
+    transport._http = mock.Mock()
+    transport._http.post.return_value.content = b"content_mock"
+
+    assert transport._make_http_request("url_mock", "data_mock", {}) == b"content_mock"
+    transport.test_url("url_mock")
+
+    assert transport._http.post.call_args.kwargs["data"] == b"data_mock"
+    assert transport._http.post.call_args.kwargs["timeout"] == transport.TIMEOUT
+    transport._http.head.assert_called_once_with("url_mock", timeout=transport.TIMEOUT)
+
+
+def test_transport_sets_socket_options(config):
+    backend = conftest.get_backend(config)
+
+    adapter = backend.api.transport._http.get_adapter("https://")
+    assert (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) in adapter.socket_options
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in adapter.socket_options
+    assert (
+        adapter.poolmanager.connection_pool_kw["socket_options"]
+        == adapter.socket_options
+    )
+    assert backend.api.transport._http.headers["Connection"] == "keep-alive"
+
+
+def test_transport_keep_alive_and_tcp_nodelay_disabled(config):
+    config["pandora"]["http_keep_alive"] = False
+    config["pandora"]["http_tcp_nodelay"] = False
+    backend = conftest.get_backend(config)
+
+    adapter = backend.api.transport._http.get_adapter("https://")
+    assert adapter.socket_options == []
+    assert backend.api.transport._http.headers["Connection"] == "close"
+
+
+def test_transport_applies_socket_options_to_proxies(config):
+    backend = conftest.get_backend(config)
+
+    adapter = backend.api.transport._http.get_adapter("https://")
+    proxy_manager = adapter.proxy_manager_for("http://host_mock:8080")
+    assert proxy_manager.connection_pool_kw["socket_options"] == adapter.socket_options
+
+
+def fake_authenticate(api):
+    def authenticate(_api):
+        api.transport.partner_auth_token = "partner_token_mock"
+        api.transport.user_auth_token = f"user_token_mock_{time.monotonic_ns()}"
+
+    return mock.patch.object(
+        BaseAPIClient, "_authenticate", autospec=True, side_effect=authenticate
+    )
+
+
+def test_set_credentials_does_not_log_in(config):
+    api = conftest.get_backend(config).api
+
+    with fake_authenticate(api) as authenticate_mock:
+        api.set_credentials("john", "smith")
+
+    authenticate_mock.assert_not_called()
+    assert api.needs_authentication
+
+
+def test_logs_in_on_first_api_call(config):
+    api = conftest.get_backend(config).api
+    api.set_credentials("john", "smith")
+
+    with (
+        fake_authenticate(api) as authenticate_mock,
+        mock.patch.object(MopidyAPITransport, "__call__", return_value={}),
+    ):
+        api("method.mock")
+        api("method.mock")
+
+    authenticate_mock.assert_called_once_with(api)
+    assert not api.needs_authentication
+
+
+def test_logs_in_again_once_auth_token_lifetime_expires(config):
+    config["pandora"]["auth_token_lifetime"] = 60
+    api = conftest.get_backend(config).api
+    api.set_credentials("john", "smith")
+
+    with fake_authenticate(api) as authenticate_mock:
+        api.ensure_authenticated()
+        with mock.patch.object(time, "time", return_value=time.time() + 61):
+            assert api.needs_authentication
+            api.ensure_authenticated()
+
+    assert authenticate_mock.call_count == 2
+
+
+def test_auth_token_lifetime_disabled(config):
+    config["pandora"]["auth_token_lifetime"] = 0
+    api = conftest.get_backend(config).api
+    api.set_credentials("john", "smith")
+
+    with fake_authenticate(api):
+        api.ensure_authenticated()
+
+    with mock.patch.object(time, "time", return_value=time.time() + 10**9):
+        assert not api.needs_authentication
+
+
+def test_restores_session_after_restart(config):
+    api = conftest.get_backend(config).api
+    api.set_credentials("john", "smith")
+    with fake_authenticate(api):
+        auth_token = api.ensure_authenticated()
+
+    other_api = conftest.get_backend(config).api
+    with fake_authenticate(other_api) as authenticate_mock:
+        other_api.set_credentials("john", "smith")
+
+        assert other_api.ensure_authenticated() == auth_token
+    authenticate_mock.assert_not_called()
+
+
+def test_does_not_restore_session_of_other_user(config):
+    api = conftest.get_backend(config).api
+    api.set_credentials("john", "smith")
+    with fake_authenticate(api):
+        api.ensure_authenticated()
+
+    other_api = conftest.get_backend(config).api
+    other_api.set_credentials("jane", "doe")
+
+    assert other_api.needs_authentication
+
+
+def test_session_not_stored_if_persistent_cache_disabled(config):
+    config["pandora"]["persistent_cache"] = False
+    api = conftest.get_backend(config).api
+    api.set_credentials("john", "smith")
+    with fake_authenticate(api):
+        api.ensure_authenticated()
+
+    assert api.session_store is None
+    assert not list(Extension.get_cache_dir(config).glob("session.*"))
+
+
+def test_expired_auth_token_is_renewed_once(config):
+    api = conftest.get_backend(config).api
+    api.set_credentials("john", "smith")
+    with fake_authenticate(api):
+        api.ensure_authenticated()
+
+    expired_token = api.transport.user_auth_token
+    barrier = threading.Barrier(4)
+
+    def transport_call(method, **data):
+        if api.transport.user_auth_token != expired_token:
+            return {}
+        barrier.wait(timeout=1.0)
+        raise errors.InvalidAuthToken(method)
+
+    with (
+        fake_authenticate(api) as authenticate_mock,
+        mock.patch.object(MopidyAPITransport, "__call__", side_effect=transport_call),
+    ):
+        results = list(utils.executor.map(lambda _: api("method.mock"), range(4)))
+
+    assert results == [{}] * 4
+    authenticate_mock.assert_called_once_with(api)
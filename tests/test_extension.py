@@ -3,6 +3,7 @@ from unittest import mock
 from mopidy_pandora import Extension
 from mopidy_pandora import backend as backend_lib
 from mopidy_pandora import frontend as frontend_lib
+from mopidy_pandora import web as web_lib
 
 
 class TestExtension:
@@ -25,6 +26,24 @@ class TestExtension:
         assert "sort_order = a-z" in config
         assert "auto_setup = true" in config
         assert "cache_time_to_live = 86400" in config
+        assert "cache_max_stale = 86400" in config
+        assert "persistent_cache = true" in config
+        assert "auth_token_lifetime = 21600" in config
+        assert "playlist_prefetch_threshold = 1" in config
+        assert "audio_url_lifetime = 3600" in config
+        assert "http_pool_connections = 10" in config
+        assert "http_pool_maxsize = 10" in config
+        assert "http_keep_alive = true" in config
+        assert "http_tcp_nodelay = true" in config
+        assert "api_retries = 2" in config
+        assert "circuit_breaker_threshold = 5" in config
+        assert "circuit_breaker_reset_timeout = 30" in config
+        assert "asyncio_api_enabled = false" in config
+        assert "check_upcoming_tracks = true" in config
+        assert "lookahead_tracks = 1" in config
+        assert "image_cache_size = 0" in config
+        assert "tracing_file =" in config
+        assert "tracing_otlp_endpoint =" in config
         assert "event_support_enabled = false" in config
         assert "double_click_interval = 2.50" in config
         assert "on_pause_resume_click = thumbs_up" in config
@@ -50,6 +69,24 @@ class TestExtension:
         assert "sort_order" in schema
         assert "auto_setup" in schema
         assert "cache_time_to_live" in schema
+        assert "cache_max_stale" in schema
+        assert "persistent_cache" in schema
+        assert "auth_token_lifetime" in schema
+        assert "playlist_prefetch_threshold" in schema
+        assert "audio_url_lifetime" in schema
+        assert "http_pool_connections" in schema
+        assert "http_pool_maxsize" in schema
+        assert "http_keep_alive" in schema
+        assert "http_tcp_nodelay" in schema
+        assert "api_retries" in schema
+        assert "circuit_breaker_threshold" in schema
+        assert "circuit_breaker_reset_timeout" in schema
+        assert "asyncio_api_enabled" in schema
+        assert "check_upcoming_tracks" in schema
+        assert "lookahead_tracks" in schema
+        assert "image_cache_size" in schema
+        assert "tracing_file" in schema
+        assert "tracing_otlp_endpoint" in schema
         assert "event_support_enabled" in schema
         assert "double_click_interval" in schema
         assert "on_pause_resume_click" in schema
@@ -65,5 +102,6 @@ class TestExtension:
         calls = [
             mock.call("frontend", frontend_lib.PandoraFrontend),
             mock.call("backend", backend_lib.PandoraBackend),
+            mock.call("http:app", {"name": "pandora", "factory": web_lib.factory}),
         ]
         registry.add.assert_has_calls(calls, any_order=True)
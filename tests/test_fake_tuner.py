@@ -0,0 +1,156 @@
+import shutil
+import time
+from unittest import mock
+
+import pytest
+from pandora import errors
+
+from mopidy_pandora import backend as backend_lib
+from mopidy_pandora.client import MopidyAPITransport
+
+from . import fake_tuner
+from .fake_tuner import FakeTuner
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("openssl") is None, reason="requires the openssl command"
+)
+
+# Other tests replace the transport to make sure that they never contact
+# Pandora, so keep a reference to the real one to talk to the fake tuner.
+transport_call = MopidyAPITransport.__call__
+
+
+@pytest.fixture
+def tuner():
+    with (
+        mock.patch.object(MopidyAPITransport, "__call__", transport_call),
+        FakeTuner(station_count=5) as tuner,
+    ):
+        yield tuner
+
+
+@pytest.fixture
+def client(tuner):
+    return tuner.build_client()
+
+
+def test_login(tuner, client):
+    assert client.transport.user_auth_token is not None
+    assert client.transport.sync_time == pytest.approx(time.time(), abs=2)
+    assert tuner.calls["auth.partnerLogin"] == 1
+    assert tuner.calls["auth.userLogin"] == 1
+
+
+def test_invalid_login(tuner, client):
+    with pytest.raises(errors.InvalidUserLogin):
+        client.login(fake_tuner.USERNAME, "wrong_password")
+
+
+def test_get_station_list(client):
+    station_list = client.get_station_list()
+
+    assert len(station_list) == 5
+    assert client.get_station(station_list[0].id).name == "Fake Station 1"
+    assert not station_list.has_changed()
+
+
+def test_get_playlist(client):
+    station = client.get_station_list()[0]
+
+    playlist = list(station.get_playlist())
+
+    assert len(playlist) == fake_tuner.PLAYLIST_LENGTH
+    assert all(track.get_is_playable() for track in playlist)
+
+
+def test_search(client):
+    result = client.search("Mock")
+
+    assert result.songs[0].song_name == "Mock Song 0"
+    assert result.artists[0].likely_match
+
+
+def test_feedback(tuner, client):
+    track = next(client.get_station_list()[0].get_playlist())
+
+    track.thumbs_up()
+    track.sleep()
+
+    assert tuner.feedback == [
+        ("station.addFeedback", track.track_token),
+        ("user.sleepSong", track.track_token),
+    ]
+
+
+def test_expired_auth_token_is_renewed(tuner, client):
+    tuner.expire_auth_tokens()
+
+    assert len(client.get_station_list()) == 5
+    assert tuner.calls["auth.userLogin"] == 2
+
+
+def test_inject_error(tuner, client):
+    tuner.inject_error("station.getPlaylist", code=1039)
+    station = client.get_station_list()[0]
+
+    with pytest.raises(errors.TooManyRequestsForANewPlaylist):
+        station.get_playlist()
+    assert len(list(station.get_playlist())) == fake_tuner.PLAYLIST_LENGTH
+
+
+def test_latency(tuner, client):
+    tuner.latency = 0.05
+
+    start = time.monotonic()
+    client.get_station_list_checksum()
+
+    assert time.monotonic() - start >= 0.05
+
+
+@pytest.fixture
+def backend_config(config, tuner):
+    config["proxy"] = {}
+    config["pandora"].update(
+        {
+            "api_host": tuner.api_host,
+            "partner_encryption_key": fake_tuner.ENCRYPTION_KEY,
+            "partner_decryption_key": fake_tuner.DECRYPTION_KEY,
+            "partner_username": fake_tuner.PARTNER_USER,
+            "partner_password": fake_tuner.PARTNER_PASSWORD,
+            "partner_device": fake_tuner.PARTNER_DEVICE,
+            "username": fake_tuner.USERNAME,
+            "password": fake_tuner.PASSWORD,
+        }
+    )
+    return config
+
+
+def start_backend(config, tuner):
+    backend = backend_lib.PandoraBackend(config=config, audio=mock.Mock())
+    tuner.trust(backend.api.transport._http)
+    backend.api.set_credentials(fake_tuner.USERNAME, fake_tuner.PASSWORD)
+    return backend
+
+
+def test_backend_plays_stations(backend_config, tuner):
+    backend = start_backend(backend_config, tuner)
+
+    stations = backend.library.browse(backend.library.root_directory.uri)
+    station_uri = stations[1].uri
+    track = backend.library.browse(station_uri)[0]
+
+    assert backend.library.is_pandora_track_playable(track.uri)
+    assert backend.library.lookup(track.uri)[0].name == track.name
+
+
+def test_backend_reuses_session_after_restart(backend_config, tuner):
+    start_backend(backend_config, tuner).library.browse("pandora:directory")
+
+    tuner.calls.clear()
+
+    backend = start_backend(backend_config, tuner)
+    backend.library.refresh()
+
+    assert backend.library.browse("pandora:directory")
+    assert tuner.calls["user.getStationListChecksum"] > 0
+    assert tuner.calls["auth.userLogin"] == 0
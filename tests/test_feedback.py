@@ -0,0 +1,158 @@
+import json
+from unittest import mock
+
+import pytest
+import requests
+from pandora.errors import MaintenanceMode, ParameterMissing
+
+from mopidy_pandora.feedback import FeedbackQueue
+
+TRACK_URI = "pandora:track:id_mock:token_mock"
+OTHER_TRACK_URI = "pandora:track:id_mock:other_token_mock"
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return tmp_path / "feedback.jsonl"
+
+
+def read_journal(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_put_sends_actions_in_background(journal):
+    handler = mock.Mock()
+    queue = FeedbackQueue(journal, handler)
+
+    assert queue.put("thumbs_up", TRACK_URI)
+    assert queue.put("sleep", OTHER_TRACK_URI)
+    assert queue.wait(timeout=1.0)
+
+    handler.assert_has_calls(
+        [mock.call("thumbs_up", TRACK_URI), mock.call("sleep", OTHER_TRACK_URI)]
+    )
+    assert read_journal(journal) == []
+
+
+def test_put_persists_actions(journal):
+    queue = FeedbackQueue(journal, mock.Mock())
+    queue.stop()
+    queue.put("thumbs_up", TRACK_URI)
+
+    assert read_journal(journal) == [
+        {"id": 1, "action": "thumbs_up", "track_uri": TRACK_URI}
+    ]
+
+
+def test_pending_actions_are_restored(journal):
+    queue = FeedbackQueue(journal, mock.Mock())
+    queue.stop()
+    queue.put("thumbs_up", TRACK_URI)
+    queue.put("add_song_bookmark", OTHER_TRACK_URI)
+
+    handler = mock.Mock()
+    queue = FeedbackQueue(journal, handler)
+    assert len(queue) == 2
+    assert not handler.called
+
+    queue.start()
+    assert queue.wait(timeout=1.0)
+    assert handler.call_count == 2
+    assert queue.put("thumbs_down", TRACK_URI)
+    assert queue.wait(timeout=1.0)
+    assert read_journal(journal) == []
+
+
+def test_restore_ignores_partially_written_lines(journal):
+    journal.write_text(
+        json.dumps({"id": 1, "action": "sleep", "track_uri": TRACK_URI})
+        + '\n{"id": 2, "act'
+    )
+
+    assert len(FeedbackQueue(journal, mock.Mock())) == 1
+
+
+def test_put_ignores_duplicate_actions(journal):
+    queue = FeedbackQueue(journal, mock.Mock())
+    queue.stop()
+
+    assert queue.put("thumbs_up", TRACK_URI)
+    assert not queue.put("thumbs_up", TRACK_URI)
+    assert queue.put("thumbs_up", OTHER_TRACK_URI)
+    assert len(queue) == 2
+
+
+def test_put_replaces_opposite_feedback(journal):
+    handler = mock.Mock()
+    queue = FeedbackQueue(journal, handler)
+    queue.stop()
+
+    queue.put("thumbs_up", TRACK_URI)
+    queue.put("thumbs_down", TRACK_URI)
+    assert len(queue) == 1
+
+    queue.start()
+    assert queue.wait(timeout=1.0)
+    handler.assert_called_once_with("thumbs_down", TRACK_URI)
+
+
+def test_put_rejects_unsupported_actions(journal):
+    queue = FeedbackQueue(journal, mock.Mock())
+
+    with pytest.raises(ValueError, match="delete_station"):
+        queue.put("delete_station", TRACK_URI)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [requests.exceptions.ConnectionError(), MaintenanceMode("maintenance_mock")],
+)
+def test_retries_until_action_is_sent(journal, caplog, error):
+    handler = mock.Mock(side_effect=[error, error, None])
+    queue = FeedbackQueue(journal, handler, max_delay=0.01)
+
+    queue.put("thumbs_up", TRACK_URI)
+    assert queue.wait(timeout=1.0)
+
+    assert handler.call_count == 3
+    assert "Error sending Pandora feedback, retrying" in caplog.text
+    assert read_journal(journal) == []
+
+
+def test_retry_resumes_with_failed_action(journal):
+    handler = mock.Mock(side_effect=[None, requests.exceptions.Timeout(), None])
+    queue = FeedbackQueue(journal, handler, max_delay=0.01)
+    queue.stop()
+    queue.put("thumbs_up", TRACK_URI)
+    queue.put("sleep", OTHER_TRACK_URI)
+
+    queue.start()
+    assert queue.wait(timeout=1.0)
+
+    assert handler.call_args_list == [
+        mock.call("thumbs_up", TRACK_URI),
+        mock.call("sleep", OTHER_TRACK_URI),
+        mock.call("sleep", OTHER_TRACK_URI),
+    ]
+
+
+def test_drops_actions_that_cannot_be_sent(journal, caplog):
+    handler = mock.Mock(side_effect=ParameterMissing("error_mock"))
+    queue = FeedbackQueue(journal, handler)
+
+    queue.put("sleep", TRACK_URI)
+    assert queue.wait(timeout=1.0)
+
+    handler.assert_called_once_with("sleep", TRACK_URI)
+    assert "Error calling Pandora event: sleep." in caplog.text
+    assert read_journal(journal) == []
+
+
+def test_stop_keeps_pending_actions_on_disk(journal):
+    handler = mock.Mock(side_effect=requests.exceptions.ConnectionError())
+    queue = FeedbackQueue(journal, handler, max_delay=10)
+
+    queue.put("thumbs_up", TRACK_URI)
+    queue.stop(timeout=1.0)
+
+    assert len(FeedbackQueue(journal, mock.Mock())) == 1
@@ -6,7 +6,11 @@ from mopidy.core import CoreListener
 from mopidy.types import PlaybackState
 
 from mopidy_pandora import frontend
-from mopidy_pandora.frontend import EventMarker, MatchResult, PandoraFrontend
+from mopidy_pandora.frontend import (
+    EventSequence,
+    PandoraFrontend,
+    SequenceAutomaton,
+)
 from mopidy_pandora.listener import (
     EventMonitorListener,
     PandoraBackendListener,
@@ -38,6 +42,36 @@ class TestPandoraFrontend:
         assert len(tl_tracks) == 2
         assert tl_tracks[-1].track == mopidy.tl_tracks[0].track
 
+    def test_add_track_keeps_lookahead_tracks(self, mopidy):
+        mopidy.frontend.lookahead_tracks = 3
+
+        mopidy.frontend.add_track(mopidy.tl_tracks[0].track).get()
+        tl_tracks = mopidy.core.tracklist.get_tl_tracks().get()
+        assert len(tl_tracks) == 4
+        assert tl_tracks[-1].track == mopidy.tl_tracks[0].track
+
+    def test_update_tracklist_requests_lookahead_tracks(self, mopidy):
+        mopidy.frontend.lookahead_tracks = 5
+        track = mopidy.tl_tracks[2].track
+        call = mock.call(
+            PandoraFrontendListener,
+            "end_of_tracklist_reached",
+            station_id="id_mock",
+            auto_play=False,
+        )
+
+        # Three tracks follow the third track, so two more are needed.
+        mopidy.frontend.update_tracklist(track).get()
+        assert mopidy.send_mock.mock_calls.count(call) == 2
+
+        # Tracks that have already been requested are not requested again.
+        mopidy.frontend.update_tracklist(track).get()
+        assert mopidy.send_mock.mock_calls.count(call) == 2
+
+        mopidy.frontend.next_track_available(mopidy.tl_tracks[1].track).get()
+        mopidy.frontend.update_tracklist(track).get()
+        assert mopidy.send_mock.mock_calls.count(call) == 2
+
     def test_next_track_available_adds_track_to_playlist(self, mopidy):
         mopidy.core.tracklist.clear()
         mopidy.core.tracklist.add(uris=[mopidy.tl_tracks[0].track.uri])
@@ -342,6 +376,73 @@ class TestPandoraFrontend:
 
         assert mopidy.core.playback.get_state().get() == PlaybackState.STOPPED
 
+    def test_upcoming_track_unplayable_replaces_track(self, mopidy):
+        mopidy.frontend.lookahead_tracks = len(mopidy.tl_tracks) - 1
+        mopidy.core.playback.play(tlid=mopidy.tl_tracks[0].tlid)
+        mopidy.replay_events()
+        mopidy.send_mock.reset_mock()
+
+        mopidy.frontend.upcoming_track_unplayable(mopidy.tl_tracks[-1].track).get()
+
+        call = mock.call(
+            PandoraFrontendListener,
+            "end_of_tracklist_reached",
+            station_id="id_mock",
+            auto_play=False,
+        )
+        assert mopidy.send_mock.mock_calls.count(call) == 1
+        assert mopidy.tl_tracks[-1] not in mopidy.core.tracklist.get_tl_tracks().get()
+        assert mopidy.core.playback.get_state().get() == PlaybackState.PLAYING
+
+
+class TestTracklistMirror:
+    def test_tl_tracks_are_retrieved_once(self, mopidy):
+        core_mock = mock.Mock()
+        get_tl_tracks = core_mock.tracklist.get_tl_tracks
+        get_tl_tracks.return_value.get.return_value = mopidy.tl_tracks
+        mirror = frontend.TracklistMirror(core_mock)
+
+        assert mirror.tl_tracks == mopidy.tl_tracks
+        assert mirror.index(mopidy.tl_tracks[2].track.uri) == 2
+        assert get_tl_tracks.call_count == 1
+
+        mirror.on_event("tracklist_changed")
+        get_tl_tracks.return_value.get.return_value = []
+        assert mirror.tl_tracks == []
+        assert get_tl_tracks.call_count == 2
+
+    def test_changes_are_applied_locally(self, mopidy):
+        mirror = frontend.TracklistMirror(mopidy.core)
+        assert len(mirror.tl_tracks) == len(mopidy.tl_tracks)
+
+        mirror.remove(tlids=[mopidy.tl_tracks[0].tlid])
+        mirror.remove(uris=[mopidy.tl_tracks[1].track.uri])
+        added = mirror.add(uris=[mopidy.tl_tracks[0].track.uri])
+
+        assert mirror.tl_tracks == [*mopidy.tl_tracks[2:], *added]
+        assert mirror.tl_tracks == mopidy.core.tracklist.get_tl_tracks().get()
+
+    def test_index_of_current_track(self, mopidy):
+        mirror = frontend.TracklistMirror(mopidy.core)
+
+        mirror.on_event("track_playback_started", tl_track=mopidy.tl_tracks[3])
+
+        assert mirror.index() == 3
+
+    def test_options_are_retrieved_once(self, mopidy):
+        mirror = frontend.TracklistMirror(mopidy.core)
+        mopidy.core.tracklist.set_consume(False).get()
+
+        assert mirror.options["consume"] is False
+        mirror.set_option("consume", True)
+        assert mirror.options["consume"] is True
+        assert mopidy.core.tracklist.get_consume().get() is True
+
+        mopidy.core.tracklist.set_repeat(True).get()
+        assert mirror.options["repeat"] is False
+        mirror.on_event("options_changed")
+        assert mirror.options["repeat"] is True
+
 
 class TestEventMonitorFrontend:
     def test_delete_station_clears_tracklist_on_finish(self, mopidy_with_monitor):
@@ -613,111 +714,190 @@ class TestEventMonitorFrontend:
             )
 
 
-class TestEventSequence:
+class TestSequenceMonitor:
     def test_events_ignored_if_time_position_is_zero(
-        self, event_sequences, tl_track_mock
+        self, sequence_monitors, tl_track_mock
     ):
-        for es in event_sequences:
-            es.notify("e1", tl_track=tl_track_mock)
-        for es in event_sequences:
-            assert not es.is_monitoring()
-
-    def test_start_monitor_on_event(self, event_sequences, tl_track_mock):
-        for es in event_sequences:
-            es.notify("e1", tl_track=tl_track_mock, time_position=100)
-        for es in event_sequences:
-            assert es.is_monitoring()
-
-    def test_start_monitor_handles_no_tl_track(self, event_sequences, tl_track_mock):
-        for es in event_sequences:
-            es.notify("e1", tl_track=tl_track_mock, time_position=100)
-        for es in event_sequences:
-            assert es.is_monitoring()
+        for sm in sequence_monitors:
+            sm.notify("e1", tl_track=tl_track_mock)
+        for sm in sequence_monitors:
+            assert not sm.is_monitoring()
+
+    def test_start_monitor_on_event(self, sequence_monitors, tl_track_mock):
+        for sm in sequence_monitors:
+            sm.notify("e1", tl_track=tl_track_mock, time_position=100)
+        for sm in sequence_monitors:
+            assert sm.is_monitoring()
+
+    def test_start_monitor_handles_no_tl_track(self, sequence_monitors):
+        for sm in sequence_monitors:
+            sm.notify("e1", time_position=100)
+        for sm in sequence_monitors:
+            assert sm.is_monitoring()
 
     def test_stop_monitor_adds_result_to_queue(
-        self, event_sequences, tl_track_mock, rq
+        self, sequence_monitors, tl_track_mock, rq
     ):
-        for es in event_sequences[0:2]:
-            es.notify("e1", tl_track=tl_track_mock, time_position=100)
-            es.notify("e2", time_position=100)
-            es.notify("e3", time_position=100)
+        for sm in sequence_monitors[0:2]:
+            sm.notify("e1", tl_track=tl_track_mock, time_position=100)
+            sm.notify("e2", time_position=100)
+            sm.notify("e3", time_position=100)
 
-        for es in event_sequences[0:2]:
-            es.wait(1.0)
-            assert not es.is_monitoring()
+        for sm in sequence_monitors[0:2]:
+            sm.wait(1.0)
+            assert not sm.is_monitoring()
 
         assert rq.qsize() == 2
 
-    def test_stop_monitor_only_waits_for_matched_events(self, event_sequence_wait, rq):
-        event_sequence_wait.notify("e1", time_position=100)
-        event_sequence_wait.notify("e_not_in_monitored_sequence", time_position=100)
+    def test_stop_monitor_only_waits_for_matched_events(
+        self, sequence_monitor_wait, rq
+    ):
+        sequence_monitor_wait.notify("e1", time_position=100)
+        sequence_monitor_wait.notify("e_not_in_monitored_sequence", time_position=100)
 
         time.sleep(0.1 * 1.1)
-        assert not event_sequence_wait.is_monitoring()
+        assert not sequence_monitor_wait.is_monitoring()
         assert rq.qsize() == 0
 
-    def test_stop_monitor_waits_for_event(self, event_sequence_wait, rq):
-        event_sequence_wait.notify("e1", time_position=100)
-        event_sequence_wait.notify("e2", time_position=100)
-        event_sequence_wait.notify("e3", time_position=100)
+    def test_stop_monitor_waits_for_event(self, sequence_monitor_wait, rq):
+        sequence_monitor_wait.notify("e1", time_position=100)
+        sequence_monitor_wait.notify("e2", time_position=100)
+        sequence_monitor_wait.notify("e3", time_position=100)
 
-        assert event_sequence_wait.is_monitoring()
+        assert sequence_monitor_wait.is_monitoring()
         assert rq.qsize() == 0
 
-        event_sequence_wait.notify("w1", time_position=100)
-        event_sequence_wait.wait(timeout=1.0)
+        sequence_monitor_wait.notify("w1", time_position=100)
+        sequence_monitor_wait.wait(timeout=1.0)
+
+        assert not sequence_monitor_wait.is_monitoring()
+        assert rq.qsize() == 1
+
+    def test_stop_monitor_does_not_block_while_waiting_for_event(
+        self, sequence_monitor_wait, rq
+    ):
+        sequence_monitor_wait.notify("e1", time_position=100)
+        sequence_monitor_wait.notify("e2", time_position=100)
+        sequence_monitor_wait.notify("e3", time_position=100)
+
+        start = time.monotonic()
+        sequence_monitor_wait.stop_monitor()
+        assert time.monotonic() - start < 0.05
+        assert sequence_monitor_wait.is_monitoring()
 
-        assert not event_sequence_wait.is_monitoring()
+        sequence_monitor_wait.notify("w1", time_position=100)
+        assert not sequence_monitor_wait.is_monitoring()
         assert rq.qsize() == 1
 
-    def test_get_stop_monitor_ensures_that_all_events_occurred(
-        self, event_sequence, rq, tl_track_mock
+    def test_stop_monitor_ignores_deadlines_of_previous_sessions(
+        self, sequence_monitor, tl_track_mock
     ):
-        event_sequence.notify("e1", tl_track=tl_track_mock, time_position=100)
-        event_sequence.notify("e2", time_position=100)
-        event_sequence.notify("e3", time_position=100)
+        sequence_monitor.notify("e1", tl_track=tl_track_mock, time_position=100)
+        generation = sequence_monitor._generation
+        sequence_monitor.stop_monitor(generation)
+        assert not sequence_monitor.is_monitoring()
+
+        sequence_monitor.notify("e1", tl_track=tl_track_mock, time_position=100)
+        sequence_monitor.stop_monitor(generation)
+        assert sequence_monitor.is_monitoring()
+
+    def test_stop_monitor_ensures_that_all_events_occurred(
+        self, sequence_monitor, rq, tl_track_mock
+    ):
+        sequence_monitor.notify("e1", tl_track=tl_track_mock, time_position=100)
+        sequence_monitor.notify("e2", time_position=100)
+        sequence_monitor.wait(timeout=1.0)
         assert rq.qsize() == 0
 
-        event_sequence.wait(timeout=1.0)
-        event_sequence.events_seen = ["e1", "e2", "e3"]
+        sequence_monitor.notify("e1", tl_track=tl_track_mock, time_position=100)
+        sequence_monitor.notify("e2", time_position=100)
+        sequence_monitor.notify("e3", time_position=100)
+        sequence_monitor.wait(timeout=1.0)
         assert rq.qsize() > 0
 
-    def test_get_stop_monitor_strict_ensures_that_events_were_seen_in_order(
-        self, event_sequence_strict, tl_track_mock, rq
+    def test_stop_monitor_strict_ensures_that_events_were_seen_in_order(
+        self, sequence_monitor_strict, tl_track_mock, rq
     ):
-        event_sequence_strict.notify("e1", tl_track=tl_track_mock, time_position=100)
-        event_sequence_strict.notify("e3", time_position=100)
-        event_sequence_strict.notify("e2", time_position=100)
-        event_sequence_strict.wait(timeout=1.0)
+        sequence_monitor_strict.notify("e1", tl_track=tl_track_mock, time_position=100)
+        sequence_monitor_strict.notify("e3", time_position=100)
+        sequence_monitor_strict.notify("e2", time_position=100)
+        sequence_monitor_strict.wait(timeout=1.0)
         assert rq.qsize() == 0
 
-        event_sequence_strict.notify("e1", tl_track=tl_track_mock, time_position=100)
-        event_sequence_strict.notify("e2", time_position=100)
-        event_sequence_strict.notify("e3", time_position=100)
-        event_sequence_strict.wait(timeout=1.0)
+        sequence_monitor_strict.notify("e1", tl_track=tl_track_mock, time_position=100)
+        sequence_monitor_strict.notify("e2", time_position=100)
+        sequence_monitor_strict.notify("e3", time_position=100)
+        sequence_monitor_strict.wait(timeout=1.0)
         assert rq.qsize() > 0
 
-    def test_get_ratio_handles_repeating_events(self, event_sequence):
+    def test_match_result_contains_uri_and_event(self, sequence_monitor, rq):
+        sequence_monitor.notify("e1", uri="uri_mock", time_position=100)
+        sequence_monitor.notify("e2", time_position=100)
+        sequence_monitor.notify("e3", time_position=100)
+        sequence_monitor.wait(timeout=1.0)
+
+        match = rq.get_nowait()
+        assert match.marker.event == "match_mock"
+        assert match.marker.uri == "uri_mock"
+        assert match.ratio == 1.0
+
+
+class TestSequenceAutomaton:
+    def feed(self, automaton, events):
+        automaton.reset()
+        for event in events:
+            automaton.feed(event)
+        return automaton.best_match()
+
+    def test_best_match_handles_repeating_events(self, event_sequence):
         event_sequence.target_sequence = ["e1", "e2", "e3", "e1"]
-        event_sequence.events_seen = ["e1", "e2", "e3", "e1"]
-        assert event_sequence.get_ratio() > 0
+        automaton = SequenceAutomaton([event_sequence])
+
+        assert self.feed(automaton, ["e1", "e2", "e3", "e1"]) == (event_sequence, 1.0)
+        assert self.feed(automaton, ["e1", "e2", "e3"]) == (event_sequence, 0.75)
+
+    def test_best_match_ignores_unrelated_events(self, event_sequence):
+        automaton = SequenceAutomaton([event_sequence])
+
+        assert self.feed(automaton, ["e1", "e4", "e2", "e3"]) == (event_sequence, 1.0)
+
+    def test_best_match_enforces_order(self, event_sequence):
+        automaton = SequenceAutomaton([event_sequence])
+
+        assert self.feed(automaton, ["e1", "e3", "e2"]) == (None, 0.0)
+
+    def test_best_match_enforces_strict_matching(self, event_sequence_strict):
+        automaton = SequenceAutomaton([event_sequence_strict])
+
+        assert self.feed(automaton, ["e1", "e2", "e3", "e4"]) == (None, 0.0)
+        assert self.feed(automaton, ["e1", "e2", "e3"]) == (
+            event_sequence_strict,
+            1.0,
+        )
 
-    def test_get_ratio_enforces_strict_matching(self, event_sequence_strict):
-        event_sequence_strict.events_seen = ["e1", "e2", "e3", "e4"]
-        assert event_sequence_strict.get_ratio() == 0
+    def test_best_match_requires_wait_for_event(self, event_sequence_wait):
+        automaton = SequenceAutomaton([event_sequence_wait])
 
-        event_sequence_strict.events_seen = ["e1", "e2", "e3"]
-        assert event_sequence_strict.get_ratio() == 1
+        assert self.feed(automaton, ["e1", "e2", "e3"]) == (event_sequence_wait, 0.75)
+        assert automaton.is_awaiting_wait_for()
+        automaton.feed("w1")
+        assert automaton.best_match() == (event_sequence_wait, 1.0)
+        assert not automaton.is_awaiting_wait_for()
 
+    def test_best_match_selects_sequence_that_matches_completely(self):
+        short = EventSequence("short", ["e1", "e2"])
+        long = EventSequence("long", ["e1", "e2", "e1"])
+        automaton = SequenceAutomaton([short, long])
 
-class TestMatchResult:
-    def test_match_result_comparison(self):
-        mr1 = MatchResult(EventMarker("e1", "u1", 0), 1)
-        mr2 = MatchResult(EventMarker("e1", "u1", 0), 2)
+        assert self.feed(automaton, ["e1", "e2"]) == (short, 1.0)
+        assert self.feed(automaton, ["e1", "e2", "e1"]) == (long, 1.0)
 
-        assert mr1 < mr2
-        assert mr2 > mr1
-        assert mr1 != mr2
+    def test_transitions_are_cached(self, event_sequence):
+        automaton = SequenceAutomaton([event_sequence])
+        self.feed(automaton, ["e1", "e2", "e3"])
+        transitions = dict(automaton._transitions)
 
-        mr2.ratio = 1
-        assert mr1 == mr2
+        with mock.patch.object(automaton, "_transition") as transition_mock:
+            self.feed(automaton, ["e1", "e2", "e3"])
+            assert not transition_mock.called
+        assert automaton._transitions == transitions
@@ -0,0 +1,250 @@
+import os
+import pathlib
+import threading
+import time
+from unittest import mock
+
+import pytest
+import requests
+from tornado import testing, web
+
+from mopidy_pandora import images, utils
+from mopidy_pandora import web as web_lib
+from mopidy_pandora.images import ImageCache
+
+from . import conftest
+
+IMAGE_URL = "https://cont-2.p-cdn.com/images/public/amz/mock_image.jpg"
+OTHER_IMAGE_URL = "https://cont-2.p-cdn.com/images/public/amz/other_image.jpg"
+
+
+def response_mock(content=b"image_mock", content_type="image/jpeg"):
+    response = mock.Mock(spec=requests.Response)
+    response.content = content
+    response.headers = {"Content-Type": content_type}
+    return response
+
+
+@pytest.fixture
+def image_cache(tmp_path):
+    image_cache = ImageCache(tmp_path, max_size=1024)
+    image_cache.session = mock.Mock(spec=requests.Session)
+    image_cache.session.get.return_value = response_mock()
+    return image_cache
+
+
+def test_register_returns_local_url(image_cache):
+    url = image_cache.register(IMAGE_URL)
+
+    assert url == f"/pandora/images/{ImageCache.key(IMAGE_URL)}"
+    assert image_cache.register(IMAGE_URL) == url
+    assert not image_cache.session.get.called
+
+
+def test_get_unregistered_image_returns_none(image_cache):
+    assert image_cache.get(ImageCache.key(IMAGE_URL)) is None
+    assert not image_cache.session.get.called
+
+
+def test_get_downloads_image_once(image_cache):
+    image_cache.register(IMAGE_URL)
+    key = ImageCache.key(IMAGE_URL)
+
+    assert image_cache.get(key) == (b"image_mock", "image/jpeg")
+    assert image_cache.get(key) == (b"image_mock", "image/jpeg")
+    image_cache.session.get.assert_called_once_with(
+        IMAGE_URL, timeout=ImageCache.TIMEOUT
+    )
+
+    # Downloaded images are re-used after a restart.
+    other_cache = ImageCache(image_cache.cache_dir, max_size=1024)
+    other_cache.session = mock.Mock(spec=requests.Session)
+    assert other_cache.get(key) == (b"image_mock", "image/jpeg")
+    assert not other_cache.session.get.called
+
+
+def test_get_evicts_least_recently_used_images(image_cache):
+    image_cache.session.get.return_value = response_mock(b"x" * 600)
+    image_cache.register(IMAGE_URL)
+    image_cache.register(OTHER_IMAGE_URL)
+    key, other_key = ImageCache.key(IMAGE_URL), ImageCache.key(OTHER_IMAGE_URL)
+
+    image_cache.get(key)
+    os.utime(image_cache.cache_dir / f"{key}.img", (0, 0))
+    image_cache.get(other_key)
+
+    assert not (image_cache.cache_dir / f"{key}.img").exists()
+    assert (image_cache.cache_dir / f"{other_key}.img").exists()
+
+    # Evicted images are downloaded again when they are requested.
+    assert image_cache.get(key) == (b"x" * 600, "image/jpeg")
+    assert image_cache.session.get.call_count == 3
+
+
+def test_get_evicts_images_stored_before_restart(image_cache):
+    image_cache.session.get.return_value = response_mock(b"x" * 600)
+    image_cache.register(IMAGE_URL)
+    key, other_key = ImageCache.key(IMAGE_URL), ImageCache.key(OTHER_IMAGE_URL)
+    image_cache.get(key)
+
+    other_cache = ImageCache(image_cache.cache_dir, max_size=1024)
+    other_cache.session = image_cache.session
+    other_cache.register(OTHER_IMAGE_URL)
+    other_cache.get(other_key)
+
+    assert not (image_cache.cache_dir / f"{key}.img").exists()
+    assert other_cache._size == 600
+
+
+def test_register_marks_index_as_recently_used(image_cache):
+    image_cache.register(IMAGE_URL)
+    index_path = image_cache.cache_dir / f"{ImageCache.key(IMAGE_URL)}.json"
+    os.utime(index_path, (0, 0))
+
+    image_cache.register(IMAGE_URL)
+
+    assert index_path.stat().st_mtime > 0
+
+
+def test_get_prunes_expired_index_files(image_cache):
+    for url in [IMAGE_URL, OTHER_IMAGE_URL, "https://mockup.com/fresh.jpg"]:
+        image_cache.register(url)
+    key, other_key = ImageCache.key(IMAGE_URL), ImageCache.key(OTHER_IMAGE_URL)
+    os.utime(image_cache.cache_dir / f"{key}.json", (0, 0))
+    os.utime(image_cache.cache_dir / f"{other_key}.json", (0, 0))
+
+    image_cache.get(other_key)
+
+    assert not (image_cache.cache_dir / f"{key}.json").exists()
+    assert len(list(image_cache.cache_dir.glob("*.json"))) == 2
+    assert image_cache.get(other_key) == (b"image_mock", "image/jpeg")
+
+
+def test_get_keeps_track_of_cache_size(image_cache):
+    image_cache.register(IMAGE_URL)
+    image_cache.register(OTHER_IMAGE_URL)
+    image_cache.get(ImageCache.key(IMAGE_URL))
+
+    with mock.patch.object(pathlib.Path, "glob") as glob_mock:
+        image_cache.get(ImageCache.key(OTHER_IMAGE_URL))
+
+    assert not glob_mock.called
+    assert image_cache._size == 2 * len(b"image_mock")
+
+
+def test_get_coalesces_concurrent_downloads(image_cache):
+    started, release = threading.Event(), threading.Event()
+
+    def download(url, timeout):
+        started.set()
+        release.wait(timeout=1.0)
+        return response_mock()
+
+    image_cache.session.get.side_effect = download
+    image_cache.register(IMAGE_URL)
+    key = ImageCache.key(IMAGE_URL)
+
+    futures = [utils.executor.submit(image_cache.get, key)]
+    started.wait(timeout=1.0)
+    futures += [utils.executor.submit(image_cache.get, key)]
+    # Give the other request time to join the download in progress.
+    time.sleep(0.1)
+    release.set()
+
+    for future in futures:
+        assert future.result(timeout=1.0) == (b"image_mock", "image/jpeg")
+    assert image_cache.session.get.call_count == 1
+
+
+def test_get_does_not_block_other_images_while_downloading(image_cache):
+    release = threading.Event()
+
+    def download(url, timeout):
+        if url == IMAGE_URL:
+            release.wait(timeout=1.0)
+        return response_mock()
+
+    image_cache.session.get.side_effect = download
+    image_cache.register(IMAGE_URL)
+    image_cache.register(OTHER_IMAGE_URL)
+
+    try:
+        slow = utils.executor.submit(image_cache.get, ImageCache.key(IMAGE_URL))
+        fast = utils.executor.submit(image_cache.get, ImageCache.key(OTHER_IMAGE_URL))
+        assert fast.result(timeout=0.5) == (b"image_mock", "image/jpeg")
+        assert not slow.done()
+    finally:
+        release.set()
+
+
+def test_get_image_cache_disabled(config):
+    config["pandora"]["image_cache_size"] = 0
+
+    assert images.get_image_cache(config) is None
+    assert len(web_lib.factory(config, mock.Mock())) == 1
+
+
+def test_get_image_cache_http_disabled(config):
+    config["pandora"]["image_cache_size"] = 10
+    config["http"]["enabled"] = False
+
+    assert images.get_image_cache(config) is None
+
+
+def test_get_image_cache(config):
+    config["pandora"]["image_cache_size"] = 10
+
+    image_cache = images.get_image_cache(config)
+
+    assert image_cache.max_size == 10 * 1024 * 1024
+    assert image_cache.session.proxies["https"] == "host_mock:8080"
+    assert len(web_lib.factory(config, mock.Mock())) == 2
+
+
+def test_get_images_returns_local_urls(config, playlist_item_mock):
+    config["pandora"]["image_cache_size"] = 10
+    backend = conftest.get_backend(config)
+    with mock.patch.object(
+        backend.library, "lookup_pandora_track", return_value=playlist_item_mock
+    ):
+        uri = "pandora:track:mock_id:mock_token"
+        results = backend.library.get_images([uri])
+
+    key = ImageCache.key(
+        playlist_item_mock.album_art_url.replace("http://", "https://", 1)
+    )
+    assert results[uri][0].uri == f"/pandora/images/{key}"
+
+
+class TestImageHandler(testing.AsyncHTTPTestCase):
+    def get_app(self):
+        self.image_cache = mock.Mock(spec=ImageCache)
+        return web.Application(
+            [
+                (
+                    r"/pandora/images/(\w+)",
+                    images.ImageHandler,
+                    {"image_cache": self.image_cache},
+                )
+            ]
+        )
+
+    def test_get_serves_image(self):
+        self.image_cache.get.return_value = (b"image_mock", "image/png")
+
+        response = self.fetch("/pandora/images/key_mock")
+
+        assert response.code == 200
+        assert response.body == b"image_mock"
+        assert response.headers["Content-Type"] == "image/png"
+        self.image_cache.get.assert_called_once_with("key_mock")
+
+    def test_get_unknown_image(self):
+        self.image_cache.get.return_value = None
+
+        assert self.fetch("/pandora/images/key_mock").code == 404
+
+    def test_get_download_error(self):
+        self.image_cache.get.side_effect = requests.exceptions.ConnectionError()
+
+        assert self.fetch("/pandora/images/key_mock").code == 502
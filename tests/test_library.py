@@ -1,15 +1,20 @@
+import asyncio
 import logging
+import threading
 import time
 from unittest import mock
 
 import pytest
 from mopidy import models
 from pandora.client import APIClient
+from pandora.models.playlist import PlaylistModel
 from pandora.models.station import Station, StationList
 
+from mopidy_pandora import utils
 from mopidy_pandora.client import MopidyAPIClient
 from mopidy_pandora.library import (
     PandoraLibraryProvider,
+    PlaylistPrefetcher,
     StationCacheItem,
     TrackCacheItem,
 )
@@ -109,6 +114,52 @@ def test_get_images_for_stations(config, station_result_mock):
     )
 
 
+def test_get_images_for_stations_retrieves_each_station_once(
+    config, station_result_mock
+):
+    backend = conftest.get_backend(config)
+
+    station_mock = Station.from_json(backend.api, station_result_mock["result"])
+    uris = [
+        f"pandora:station:{station_mock.id}:mock_token",
+        f"pandora:station:{station_mock.id}:other_token",
+        "pandora:station:other_id:mock_token",
+    ]
+    backend.api.get_station_list = mock.Mock()
+    backend.api.get_station = mock.Mock(
+        side_effect=lambda station_id: {station_mock.id: station_mock}[station_id]
+    )
+
+    results = backend.library.get_images(uris)
+
+    assert backend.api.get_station_list.call_count == 1
+    assert sorted(c.args[0] for c in backend.api.get_station.call_args_list) == [
+        station_mock.id,
+        "other_id",
+    ]
+    assert len(results[uris[0]]) == len(results[uris[1]]) == 1
+    assert results[uris[2]] == []
+
+
+def test_get_images_for_stations_fetches_concurrently(config, station_result_mock):
+    backend = conftest.get_backend(config)
+
+    station_mock = Station.from_json(backend.api, station_result_mock["result"])
+    uris = [f"pandora:station:id_{i}:mock_token" for i in range(4)]
+    barrier = threading.Barrier(len(uris), timeout=1.0)
+
+    def get_station(_station_id):
+        barrier.wait()
+        return station_mock
+
+    backend.api.get_station_list = mock.Mock()
+    backend.api.get_station = mock.Mock(side_effect=get_station)
+
+    results = backend.library.get_images(uris)
+
+    assert all(len(results[uri]) == 1 for uri in uris)
+
+
 def test_get_next_pandora_track_fetches_track(config, playlist_item_mock):
     backend = conftest.get_backend(config)
 
@@ -135,7 +186,8 @@ def test_get_next_pandora_track_handles_no_more_tracks_available(config, caplog)
 
     track = backend.library.get_next_pandora_track("id_token_mock")
     assert track is None
-    assert "Error retrieving next Pandora track." in caplog.text
+    assert "No more tracks available for Pandora station" in caplog.text
+    assert "id_token_mock" not in backend.library.pandora_station_cache
 
 
 def test_get_next_pandora_track_renames_advertisements(
@@ -148,6 +200,7 @@ def test_get_next_pandora_track_renames_advertisements(
             return_value=get_station_mock_return_value,
         ),
         mock.patch.object(Station, "get_playlist", mock.Mock()) as get_playlist_mock,
+        mock.patch.object(PlaylistModel, "get_is_playable", return_value=True),
     ):
         backend = conftest.get_backend(config)
 
@@ -235,8 +288,8 @@ def test_lookup_of_search_uri(
             ),
         ) as create_station_mock,
         mock.patch.object(
-            APIClient,
-            "get_station_list",
+            MopidyAPIClient,
+            "_fetch_station_list",
             return_value=get_station_list_return_value_mock,
         ),
     ):
@@ -269,8 +322,8 @@ def test_lookup_of_station_uri(
             return_value=get_station_mock_return_value,
         ),
         mock.patch.object(
-            APIClient,
-            "get_station_list",
+            MopidyAPIClient,
+            "_fetch_station_list",
             return_value=get_station_list_return_value_mock,
         ),
     ):
@@ -347,8 +400,8 @@ def test_browse_directory_uri(
     config, get_station_list_return_value_mock, station_list_result_mock
 ):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         backend = conftest.get_backend(config)
@@ -389,8 +442,8 @@ def test_browse_directory_marks_quickmix_stations(
     config, get_station_list_return_value_mock
 ):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         quickmix_station_uri = "pandora:track:{}:{}".format(
@@ -408,8 +461,8 @@ def test_browse_directory_marks_quickmix_stations(
 
 def test_browse_directory_sort_za(config, get_station_list_return_value_mock):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         config["pandora"]["sort_order"] = "A-Z"
@@ -425,8 +478,8 @@ def test_browse_directory_sort_za(config, get_station_list_return_value_mock):
 
 def test_browse_directory_sort_date(config, get_station_list_return_value_mock):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         config["pandora"]["sort_order"] = "date"
@@ -461,8 +514,8 @@ def test_browse_raises_exception_for_unsupported_uri_type(config):
 
 def test_browse_resets_skip_limits(config, get_station_list_return_value_mock):
     with mock.patch.object(
-        APIClient,
-        "get_station_list",
+        MopidyAPIClient,
+        "_fetch_station_list",
         return_value=get_station_list_return_value_mock,
     ):
         backend = conftest.get_backend(config)
@@ -505,8 +558,8 @@ def test_browse_genre_station_uri(  # noqa: PLR0913
             mock.Mock(return_value=station_result_mock["result"]),
         ) as create_station_mock,
         mock.patch.object(
-            APIClient,
-            "get_station_list",
+            MopidyAPIClient,
+            "_fetch_station_list",
             return_value=get_station_list_return_value_mock,
         ),
         mock.patch.object(
@@ -539,6 +592,7 @@ def test_browse_station_uri(
         mock.patch.object(
             Station, "get_playlist", return_value=get_station_playlist_mock
         ),
+        mock.patch.object(PlaylistModel, "get_is_playable", return_value=True),
     ):
         backend = conftest.get_backend(config)
         station_uri = StationUri._from_station(get_station_mock_return_value)
@@ -546,6 +600,7 @@ def test_browse_station_uri(
         results = backend.library.browse(station_uri.uri)
         # Station should just contain the first track to be played.
         assert len(results) == 1
+        assert results[0] is not None
 
 
 def test_formatted_search_query_concatenates_queries_into_free_text(config):
@@ -674,3 +729,239 @@ def test_search(config, search_return_value_mock):
             search_result.artists[1].name
             == "search_artist_composer_mock (Pandora composer)"
         )
+
+
+def test_playlist_prefetcher_fetches_first_batch_on_demand(playlist_item_mock):
+    get_playlist_mock = mock.Mock(return_value=iter([playlist_item_mock]))
+    prefetcher = PlaylistPrefetcher(get_playlist_mock, low_water_mark=0)
+
+    assert not get_playlist_mock.called
+    assert next(prefetcher) == playlist_item_mock
+    assert get_playlist_mock.call_count == 1
+
+
+def test_playlist_prefetcher_prefetches_next_batch_below_low_water_mark(
+    playlist_item_mock,
+):
+    get_playlist_mock = mock.Mock(
+        side_effect=lambda: iter([playlist_item_mock, playlist_item_mock])
+    )
+    prefetcher = PlaylistPrefetcher(get_playlist_mock, low_water_mark=2)
+
+    next(prefetcher)
+    # Only one track left in the buffer: next batch should be requested in
+    # the background.
+    prefetcher._prefetch().result()
+
+    assert get_playlist_mock.call_count == 2
+    assert len(prefetcher) == 3
+
+
+def test_playlist_prefetcher_does_not_prefetch_if_disabled(playlist_item_mock):
+    get_playlist_mock = mock.Mock(
+        side_effect=lambda: iter([playlist_item_mock, playlist_item_mock])
+    )
+    prefetcher = PlaylistPrefetcher(get_playlist_mock, low_water_mark=0)
+
+    next(prefetcher)
+    next(prefetcher)
+    assert get_playlist_mock.call_count == 1
+
+    next(prefetcher)
+    assert get_playlist_mock.call_count == 2
+
+
+def test_playlist_prefetcher_stops_if_no_more_tracks_available():
+    get_playlist_mock = mock.Mock(side_effect=lambda: iter([]))
+    prefetcher = PlaylistPrefetcher(get_playlist_mock)
+
+    with pytest.raises(StopIteration):
+        next(prefetcher)
+    assert get_playlist_mock.call_count == PlaylistPrefetcher.EMPTY_BATCH_RETRIES + 1
+
+
+def test_playlist_prefetcher_retries_empty_batches(playlist_item_mock):
+    get_playlist_mock = mock.Mock(
+        side_effect=[iter([]), iter([]), iter([playlist_item_mock])]
+    )
+    prefetcher = PlaylistPrefetcher(get_playlist_mock, low_water_mark=0)
+
+    assert next(prefetcher) == playlist_item_mock
+    assert get_playlist_mock.call_count == 3
+
+
+def test_playlist_prefetcher_handles_prefetch_errors(caplog):
+    get_playlist_mock = mock.Mock(side_effect=ValueError("error_mock"))
+    prefetcher = PlaylistPrefetcher(get_playlist_mock, low_water_mark=1)
+
+    prefetcher._prefetch().result()
+
+    assert get_playlist_mock.called
+    assert "Error prefetching Pandora playlist." in caplog.text
+
+
+def test_playlist_prefetcher_validates_tracks_when_fetched():
+    tracks = [mock.Mock(), mock.Mock()]
+    validate = mock.Mock(return_value=True)
+    prefetcher = PlaylistPrefetcher(
+        mock.Mock(return_value=iter(tracks)), low_water_mark=0, validate=validate
+    )
+
+    assert prefetcher._fill(1)
+    for item in prefetcher._buffer:
+        assert item.playable.result(timeout=1.0) is True
+    validate.assert_has_calls([mock.call(t) for t in tracks], any_order=True)
+
+
+def test_playlist_prefetcher_validates_tracks_on_event_loop():
+    tracks = [mock.Mock(), mock.Mock()]
+
+    def check(track):
+        if track is tracks[1]:
+            raise ValueError
+        return True
+
+    validate = mock.AsyncMock(side_effect=check)
+    prefetcher = PlaylistPrefetcher(
+        mock.Mock(return_value=iter(tracks)),
+        low_water_mark=0,
+        validate=validate,
+        run_coroutine=lambda coro: utils.executor.submit(asyncio.run, coro),
+    )
+
+    assert prefetcher._fill(1)
+    assert [item.playable.result(timeout=1.0) for item in prefetcher._buffer] == [
+        True,
+        False,
+    ]
+    validate.assert_has_awaits([mock.call(t) for t in tracks])
+
+
+def test_playlist_prefetcher_discards_expired_tracks(caplog, playlist_item_mock):
+    caplog.set_level(logging.INFO)
+    expired, fresh = [playlist_item_mock, playlist_item_mock], [mock.Mock()]
+    prefetcher = PlaylistPrefetcher(
+        mock.Mock(side_effect=[iter(expired), iter(fresh)]),
+        low_water_mark=0,
+        max_age=60,
+    )
+
+    with mock.patch.object(time, "time", return_value=1000):
+        assert prefetcher._fill(1)
+    with mock.patch.object(time, "time", return_value=1061):
+        assert next(prefetcher) is fresh[0].prepare_playback.return_value
+        assert prefetcher.last_fetched_at == 1061
+    assert "Discarding expired Pandora track" in caplog.text
+
+
+def test_playlist_prefetcher_skips_unplayable_tracks(caplog, playlist_item_mock):
+    tracks = [mock.Mock(), playlist_item_mock, mock.Mock()]
+    prefetcher = PlaylistPrefetcher(
+        mock.Mock(return_value=iter(tracks)),
+        low_water_mark=0,
+        validate=lambda track: track is not playlist_item_mock,
+    )
+
+    assert next(prefetcher) is tracks[0].prepare_playback.return_value
+    assert next(prefetcher) is tracks[2].prepare_playback.return_value
+    assert "Skipping unplayable Pandora track" in caplog.text
+
+
+def test_playlist_prefetcher_treats_validation_errors_as_unplayable(
+    playlist_item_mock,
+):
+    prefetcher = PlaylistPrefetcher(
+        mock.Mock(
+            side_effect=[iter([playlist_item_mock]), iter([]), iter([]), iter([])]
+        ),
+        low_water_mark=0,
+        validate=mock.Mock(side_effect=ValueError),
+    )
+
+    with pytest.raises(StopIteration):
+        next(prefetcher)
+
+
+def test_get_next_pandora_track_caches_validation_result(config, playlist_item_mock):
+    backend = conftest.get_backend(config)
+    prefetcher = PlaylistPrefetcher(
+        mock.Mock(return_value=iter([playlist_item_mock])),
+        low_water_mark=0,
+        validate=lambda _: True,
+    )
+    backend.library.pandora_station_cache["id_token_mock"] = StationCacheItem(
+        mock.Mock(), prefetcher
+    )
+
+    with mock.patch.object(PlaylistModel, "get_is_playable") as get_is_playable:
+        ref = backend.library.get_next_pandora_track("id_token_mock")
+
+        assert backend.library.pandora_track_cache[ref.uri].playable is True
+        assert backend.library.is_pandora_track_playable(ref.uri) is True
+        assert not get_is_playable.called
+
+
+def test_get_next_pandora_track_does_not_cache_unvalidated_tracks_as_playable(
+    config, playlist_item_mock
+):
+    backend = conftest.get_backend(config)
+    prefetcher = PlaylistPrefetcher(
+        mock.Mock(return_value=iter([playlist_item_mock])), low_water_mark=0
+    )
+    backend.library.pandora_station_cache["id_token_mock"] = StationCacheItem(
+        mock.Mock(), prefetcher
+    )
+
+    ref = backend.library.get_next_pandora_track("id_token_mock")
+
+    assert backend.library.pandora_track_cache[ref.uri].playable is None
+
+
+def test_is_pandora_track_playable_checks_unvalidated_tracks(
+    config, playlist_item_mock
+):
+    backend = conftest.get_backend(config)
+    track_uri = PandoraUri.factory(playlist_item_mock)
+    backend.library.pandora_track_cache[track_uri.uri] = TrackCacheItem(
+        mock.Mock(spec=models.Ref.track), playlist_item_mock
+    )
+
+    with mock.patch.object(
+        PlaylistModel, "get_is_playable", return_value=False
+    ) as get_is_playable:
+        assert backend.library.is_pandora_track_playable(track_uri.uri) is False
+        assert get_is_playable.called
+
+
+def test_get_next_pandora_track_records_fetch_time(config, playlist_item_mock):
+    backend = conftest.get_backend(config)
+    prefetcher = PlaylistPrefetcher(
+        mock.Mock(return_value=iter([playlist_item_mock])), low_water_mark=0
+    )
+    backend.library.pandora_station_cache["id_token_mock"] = StationCacheItem(
+        mock.Mock(), prefetcher
+    )
+
+    with mock.patch.object(time, "time", return_value=1000):
+        ref = backend.library.get_next_pandora_track("id_token_mock")
+
+    assert backend.library.pandora_track_cache[ref.uri].fetched_at == 1000
+
+
+@pytest.mark.parametrize(
+    ("lifetime", "fetched_at", "stale"),
+    [(3600, 1000, False), (3600, -3000, True), (0, -3000, False)],
+)
+def test_is_pandora_track_stale(
+    config, playlist_item_mock, lifetime, fetched_at, stale
+):
+    backend = conftest.get_backend(config)
+    backend.library.audio_url_lifetime = lifetime
+    track_uri = PandoraUri.factory(playlist_item_mock)
+    backend.library.pandora_track_cache[track_uri.uri] = TrackCacheItem(
+        mock.Mock(spec=models.Ref.track), playlist_item_mock, fetched_at=fetched_at
+    )
+
+    with mock.patch.object(time, "time", return_value=1000):
+        assert backend.library.is_pandora_track_stale(track_uri.uri) is stale
+        assert not backend.library.is_pandora_track_stale("pandora:track:unknown")
@@ -0,0 +1,131 @@
+from unittest import mock
+
+import pytest
+import requests
+from tornado import testing, web
+
+from mopidy_pandora import metrics
+from mopidy_pandora.client import MopidyAPIClient
+from mopidy_pandora.metrics import Counter, Gauge, Histogram, Registry
+
+from . import conftest
+
+
+def test_counter_render():
+    counter = Counter("requests_mock", "Requests.", ["method"])
+    counter.inc(method="get")
+    counter.inc(2, method="get")
+    counter.inc(method='say "hi"')
+
+    assert counter.get(method="get") == 3
+    assert counter.render() == (
+        "# HELP requests_mock Requests.\n"
+        "# TYPE requests_mock counter\n"
+        'requests_mock_total{method="get"} 3.0\n'
+        'requests_mock_total{method="say \\"hi\\""} 1.0'
+    )
+
+
+def test_counter_requires_labels():
+    counter = Counter("requests_mock", "Requests.", ["method"])
+
+    with pytest.raises(ValueError, match="method"):
+        counter.inc()
+
+
+def test_gauge_render():
+    gauge = Gauge("tasks_mock", "Tasks.", lambda: 5)
+
+    assert gauge.render().splitlines()[-1] == "tasks_mock 5.0"
+
+
+def test_histogram_render():
+    histogram = Histogram("duration_mock", "Duration.", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert histogram.get_count() == 3
+    assert histogram.render().splitlines()[2:] == [
+        'duration_mock_bucket{le="0.1"} 1.0',
+        'duration_mock_bucket{le="1.0"} 2.0',
+        'duration_mock_bucket{le="+Inf"} 3.0',
+        "duration_mock_count 3.0",
+        "duration_mock_sum 5.55",
+    ]
+
+
+def test_histogram_time():
+    histogram = Histogram("duration_mock", "Duration.", ["method"])
+
+    with pytest.raises(RuntimeError), histogram.time(method="get"):
+        raise RuntimeError
+
+    assert histogram.get_count(method="get") == 1
+
+
+def test_registry_render():
+    registry = Registry()
+    registry.register(Gauge("first_mock", "First.", lambda: 1))
+    registry.register(Gauge("second_mock", "Second.", lambda: 2))
+
+    rendered = registry.render()
+
+    assert rendered.endswith("second_mock 2.0\n")
+    assert rendered.index("first_mock 1.0") < rendered.index("# HELP second_mock")
+
+
+def test_api_calls_are_timed(config):
+    backend = conftest.get_backend(config)
+    count = metrics.api_request_duration.get_count(method="method.mock")
+
+    with mock.patch.object(type(backend.api.transport), "__call__", return_value={}):
+        backend.api("method.mock")
+
+    assert metrics.api_request_duration.get_count(method="method.mock") == count + 1
+
+
+def test_api_errors_are_counted(config):
+    backend = conftest.get_backend(config, simulate_request_exceptions=True)
+    labels = {"method": "method.mock", "error": "RequestException"}
+    errors = metrics.api_errors.get(**labels)
+
+    with pytest.raises(requests.exceptions.RequestException):
+        backend.api("method.mock")
+
+    assert metrics.api_errors.get(**labels) == errors + 1
+
+
+def test_station_list_cache_lookups_are_counted(
+    config, get_station_list_return_value_mock
+):
+    backend = conftest.get_backend(config)
+    hits = metrics.cache_requests.get(cache="station_list", result="hit")
+    misses = metrics.cache_requests.get(cache="station_list", result="miss")
+
+    with mock.patch.object(
+        MopidyAPIClient,
+        "_fetch_station_list",
+        return_value=get_station_list_return_value_mock,
+    ):
+        backend.api.get_station_list()
+        backend.api.get_station_list()
+
+    assert metrics.cache_requests.get(cache="station_list", result="hit") == hits + 1
+    assert metrics.cache_requests.get(cache="station_list", result="miss") == misses + 1
+
+
+class TestMetricsHandler(testing.AsyncHTTPTestCase):
+    def get_app(self):
+        self.registry = Registry()
+        self.registry.register(Gauge("tasks_mock", "Tasks.", lambda: 1))
+        return web.Application(
+            [(r"/pandora/metrics", metrics.MetricsHandler, {"registry": self.registry})]
+        )
+
+    def test_get_renders_metrics(self):
+        response = self.fetch("/pandora/metrics")
+
+        assert response.code == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert response.body.decode() == self.registry.render()
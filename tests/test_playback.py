@@ -1,6 +1,8 @@
+import time
 from unittest import mock
 
 import pytest
+import requests
 from mopidy import audio, models
 from pandora.models.playlist import PlaylistItem
 from pandora.transport import APITransport
@@ -101,7 +103,7 @@ def test_change_track_enforces_skip_limit_on_request_exceptions(
         mock.patch.object(
             APITransport,
             "__call__",
-            side_effect=conftest.request_exception_mock,
+            side_effect=requests.exceptions.RequestException,
         ),
     ):
         track = PandoraUri.factory(playlist_item_mock)
@@ -170,6 +172,26 @@ def test_change_track_skips_if_track_not_available_in_buffer(
     )
 
 
+def test_change_track_skips_stale_track_without_counting_skip(
+    provider, playlist_item_mock, caplog
+):
+    track = PandoraUri.factory(playlist_item_mock)
+    provider.backend.library.pandora_track_cache[track.uri] = TrackCacheItem(
+        mock.Mock(spec=models.Ref.track), playlist_item_mock, fetched_at=0
+    )
+    provider._trigger_track_unplayable = mock.PropertyMock()
+
+    with mock.patch.object(
+        PandoraLibraryProvider, "is_pandora_track_playable"
+    ) as is_playable:
+        assert provider.change_track(track) is False
+        assert not is_playable.called
+
+    assert provider._trigger_track_unplayable.called
+    assert provider._consecutive_track_skips == 0
+    assert f"Audio URL for Pandora track '{track.uri}' has expired." in caplog.text
+
+
 def test_change_track_resets_skips_on_success(provider, playlist_item_mock):
     with (
         mock.patch.object(
@@ -213,6 +235,155 @@ def test_translate_uri_returns_audio_url(provider, playlist_item_mock):
     assert provider.translate_uri(test_uri) == conftest.MOCK_TRACK_AUDIO_HIGH
 
 
+@pytest.fixture
+def checking_provider(audio_mock, config):
+    return playback.PandoraPlaybackProvider(
+        audio=audio_mock,
+        backend=conftest.get_backend(config),
+        check_upcoming_tracks=True,
+    )
+
+
+def current_track(length):
+    return models.Track(uri="pandora:track:id_mock:current_mock", length=length)
+
+
+def add_upcoming_track(provider, uri, track, *args):
+    ref = models.Ref.track(name="name_mock", uri=uri)
+    provider.backend.library.pandora_track_cache[uri] = TrackCacheItem(
+        ref, track, *args
+    )
+    provider.add_upcoming_track(uri)
+    return ref
+
+
+@pytest.mark.parametrize("check_upcoming_tracks", [True, False])
+def test_check_upcoming_tracks_replaces_tracks_that_will_expire(
+    audio_mock, config, playlist_item_mock, check_upcoming_tracks
+):
+    config["pandora"]["audio_url_lifetime"] = 3600
+    provider = playback.PandoraPlaybackProvider(
+        audio=audio_mock,
+        backend=conftest.get_backend(config),
+        check_upcoming_tracks=check_upcoming_tracks,
+    )
+    provider.backend.library.audio_url_lifetime = 3600
+    provider._trigger_upcoming_track_unplayable = mock.Mock()
+    now = time.time()
+    fresh = add_upcoming_track(
+        provider, "pandora:track:id_mock:fresh", playlist_item_mock, True, now
+    )
+    # Still valid now, but expires before the current track has finished.
+    expiring = add_upcoming_track(
+        provider, "pandora:track:id_mock:expiring", playlist_item_mock, True, now - 3500
+    )
+
+    provider.check_upcoming_tracks(current_track(200 * 1000))
+
+    if check_upcoming_tracks:
+        provider._trigger_upcoming_track_unplayable.assert_called_once_with(expiring)
+        assert list(provider._upcoming_uris) == [fresh.uri]
+    else:
+        assert not provider._trigger_upcoming_track_unplayable.called
+
+
+def test_check_upcoming_tracks_accounts_for_position(
+    checking_provider, playlist_item_mock
+):
+    checking_provider.backend.library.audio_url_lifetime = 3600
+    checking_provider._trigger_upcoming_track_unplayable = mock.Mock()
+    add_upcoming_track(
+        checking_provider,
+        "pandora:track:id_mock:token_mock",
+        playlist_item_mock,
+        True,
+        time.time() - 3500,
+    )
+
+    checking_provider.check_upcoming_tracks(
+        current_track(200 * 1000), time_position=150 * 1000
+    )
+
+    assert not checking_provider._trigger_upcoming_track_unplayable.called
+
+
+def test_check_upcoming_tracks_validates_tracks(checking_provider, playlist_item_mock):
+    checking_provider._trigger_upcoming_track_unplayable = mock.Mock()
+    playable = add_upcoming_track(
+        checking_provider, "pandora:track:id_mock:playable", playlist_item_mock
+    )
+    unplayable = add_upcoming_track(
+        checking_provider, "pandora:track:id_mock:unplayable", playlist_item_mock
+    )
+
+    with mock.patch.object(
+        PlaylistItem, "get_is_playable", side_effect=[True, False]
+    ) as get_is_playable:
+        checking_provider.check_upcoming_tracks(current_track(1000))
+        checking_provider.check_upcoming_tracks(current_track(1000))
+
+    assert get_is_playable.call_count == 2
+    checking_provider._trigger_upcoming_track_unplayable.assert_called_once_with(
+        unplayable
+    )
+    assert checking_provider.backend.library.is_pandora_track_playable(playable.uri)
+
+
+def test_check_upcoming_tracks_handles_request_exceptions(
+    checking_provider, playlist_item_mock, caplog
+):
+    checking_provider._trigger_upcoming_track_unplayable = mock.Mock()
+    ref = add_upcoming_track(
+        checking_provider, "pandora:track:id_mock:token_mock", playlist_item_mock
+    )
+
+    with mock.patch.object(
+        PlaylistItem,
+        "get_is_playable",
+        side_effect=requests.exceptions.RequestException,
+    ):
+        checking_provider.check_upcoming_tracks(current_track(1000))
+
+    checking_provider._trigger_upcoming_track_unplayable.assert_called_once_with(ref)
+    assert f"Failed to validate Pandora track {ref.uri!r}." in caplog.text
+
+
+def test_check_upcoming_tracks_forgets_evicted_tracks(
+    checking_provider, playlist_item_mock
+):
+    checking_provider._trigger_upcoming_track_unplayable = mock.Mock()
+    ref = add_upcoming_track(
+        checking_provider, "pandora:track:id_mock:token_mock", playlist_item_mock
+    )
+    checking_provider.backend.library.pandora_track_cache.clear()
+
+    checking_provider.check_upcoming_tracks(current_track(1000))
+
+    assert ref.uri not in checking_provider._upcoming_uris
+    assert not checking_provider._trigger_upcoming_track_unplayable.called
+
+
+def test_add_upcoming_track_keeps_all_tracks(checking_provider, playlist_item_mock):
+    uris = [f"pandora:track:id_mock:token_mock{i}" for i in range(12)]
+    for uri in uris:
+        add_upcoming_track(checking_provider, uri, playlist_item_mock)
+
+    assert list(checking_provider._upcoming_uris) == uris
+
+
+def test_change_track_removes_upcoming_track(checking_provider, playlist_item_mock):
+    ref = add_upcoming_track(
+        checking_provider, "pandora:track:id_mock:token_mock", playlist_item_mock, True
+    )
+
+    with mock.patch.object(
+        PandoraPlaybackProvider, "change_pandora_track", return_value=True
+    ):
+        checking_provider.change_track(models.Track(uri=ref.uri))
+
+    assert ref.uri not in checking_provider._upcoming_uris
+
+
 def test_resume_click_ignored_if_start_of_track(provider):
     with mock.patch.object(
         PandoraPlaybackProvider, "get_time_position", return_value=0
@@ -0,0 +1,247 @@
+import asyncio
+from unittest import mock
+
+import pytest
+import requests
+from pandora import errors
+
+from mopidy_pandora.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResiliencePolicy,
+)
+
+from . import conftest
+
+
+@pytest.fixture
+def policy():
+    policy = ResiliencePolicy(retries=2, failure_threshold=3, reset_timeout=30)
+    with mock.patch.object(policy, "backoff", return_value=0):
+        yield policy
+
+
+def test_circuit_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError, match="Pandora API is unavailable"):
+        breaker.before_call()
+
+
+def test_circuit_breaker_disabled():
+    breaker = CircuitBreaker(failure_threshold=0)
+
+    for _ in range(100):
+        breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_circuit_breaker_lets_single_trial_call_through(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    now = breaker._opened_at + 30
+    monkeypatch.setattr("time.monotonic", lambda: now)
+    breaker.before_call()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_reopens_if_trial_call_fails(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        breaker.record_failure()
+
+    now = breaker._opened_at + 30
+    monkeypatch.setattr("time.monotonic", lambda: now)
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker._opened_at == now
+
+
+def test_call_reopens_circuit_if_trial_call_raises_unexpected_error(
+    policy, monkeypatch
+):
+    for _ in range(3):
+        policy.breaker.record_failure()
+    now = policy.breaker._opened_at + 30
+    monkeypatch.setattr("time.monotonic", lambda: now)
+    func = mock.Mock(side_effect=ValueError("error_mock"))
+
+    with pytest.raises(ValueError, match="error_mock"):
+        policy.call("method.mock", func)
+
+    assert func.call_count == 1
+    assert policy.breaker.state == CircuitBreaker.OPEN
+    assert policy.breaker._opened_at == now
+
+
+def test_call_async_reopens_circuit_if_trial_call_raises_unexpected_error(
+    policy, monkeypatch
+):
+    for _ in range(3):
+        policy.breaker.record_failure()
+    now = policy.breaker._opened_at + 30
+    monkeypatch.setattr("time.monotonic", lambda: now)
+    func = mock.AsyncMock(side_effect=TypeError)
+
+    with pytest.raises(TypeError):
+        asyncio.run(policy.call_async("method.mock", func))
+
+    assert policy.breaker.state == CircuitBreaker.OPEN
+
+
+def test_circuit_open_error_is_connection_error():
+    assert issubclass(CircuitOpenError, requests.exceptions.ConnectionError)
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = ResiliencePolicy(base_delay=0.5, max_delay=4.0)
+
+    delays = [policy.backoff(attempt) for attempt in range(1, 10) for _ in range(20)]
+
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert all(0 <= policy.backoff(1) <= 0.5 for _ in range(20))
+    assert len(set(delays)) > 1
+
+
+def test_call_retries_failures(policy):
+    func = mock.Mock(
+        side_effect=[
+            requests.exceptions.Timeout,
+            errors.InternalServerError("error_mock"),
+            "result_mock",
+        ]
+    )
+
+    assert policy.call("method.mock", func, "arg_mock") == "result_mock"
+    assert func.call_count == 3
+    func.assert_called_with("arg_mock")
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_call_gives_up_once_retry_budget_is_spent(policy):
+    func = mock.Mock(side_effect=requests.exceptions.ConnectionError)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        policy.call("method.mock", func)
+
+    assert func.call_count == 3
+
+
+def test_call_does_not_retry_methods_that_change_data(policy):
+    func = mock.Mock(side_effect=requests.exceptions.Timeout)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        policy.call("station.deleteStation", func)
+
+    assert func.call_count == 1
+
+
+def test_call_uses_method_retry_budgets():
+    policy = ResiliencePolicy(retries=0, budgets={"method.mock": 1})
+    func = mock.Mock(side_effect=[requests.exceptions.Timeout, "result_mock"])
+
+    with mock.patch.object(policy, "backoff", return_value=0):
+        assert policy.call("method.mock", func) == "result_mock"
+    assert policy.retry_budget("other.method") == 0
+
+
+def test_call_does_not_retry_pandora_exceptions(policy):
+    policy.breaker.record_failure()
+    func = mock.Mock(side_effect=errors.InvalidUserLogin)
+
+    with pytest.raises(errors.InvalidUserLogin):
+        policy.call("method.mock", func)
+
+    assert func.call_count == 1
+    assert policy.breaker._failures == 0
+
+
+def test_call_counts_retried_call_as_single_failure(policy):
+    failing = mock.Mock(side_effect=requests.exceptions.Timeout)
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.Timeout):
+            policy.call("method.mock", failing)
+
+    assert failing.call_count == 6
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_call_fails_fast_while_circuit_is_open(policy):
+    failing = mock.Mock(side_effect=requests.exceptions.Timeout)
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.Timeout):
+            policy.call("method.mock", failing)
+    func = mock.Mock()
+
+    with pytest.raises(CircuitOpenError):
+        policy.call("method.mock", func)
+
+    assert failing.call_count == 9
+    func.assert_not_called()
+
+
+def test_call_does_not_retry_trial_call(policy, monkeypatch):
+    for _ in range(3):
+        policy.breaker.record_failure()
+    now = policy.breaker._opened_at + 30
+    monkeypatch.setattr("time.monotonic", lambda: now)
+    func = mock.Mock(side_effect=requests.exceptions.Timeout)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        policy.call("method.mock", func)
+
+    assert func.call_count == 1
+    assert policy.breaker.state == CircuitBreaker.OPEN
+
+
+def test_client_uses_configured_policy(config):
+    config["pandora"].update(
+        {
+            "api_retries": 4,
+            "circuit_breaker_threshold": 10,
+            "circuit_breaker_reset_timeout": 60,
+        }
+    )
+
+    policy = conftest.get_backend(config).api.policy
+
+    assert policy.retries == 4
+    assert policy.breaker.failure_threshold == 10
+    assert policy.breaker.reset_timeout == 60
+
+
+def test_cached_station_list_is_used_while_circuit_is_open(
+    config, station_list_result_mock
+):
+    api = conftest.get_backend(config).api
+    with mock.patch.object(
+        type(api.transport), "__call__", return_value=station_list_result_mock
+    ):
+        api.get_station_list()
+
+    backend = conftest.get_backend(config, simulate_request_exceptions=True)
+    for _ in range(backend.api.policy.breaker.failure_threshold):
+        with pytest.raises(requests.exceptions.RequestException):
+            backend.api("user.getStationListChecksum")
+
+    assert len(backend.api.get_station_list()) == 3
+    assert backend.api.policy.breaker.state == CircuitBreaker.OPEN
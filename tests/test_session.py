@@ -0,0 +1,89 @@
+import json
+import time
+
+from mopidy_pandora.session import SessionStore
+
+from . import conftest
+
+
+def login(transport):
+    transport.partner_auth_token = "partner_token_mock"
+    transport.partner_id = "partner_id_mock"
+    transport.user_auth_token = "user_token_mock"
+    transport.user_id = "user_id_mock"
+    transport.server_sync_time = 1000
+    transport.start_time = 2000
+
+
+def test_load_restores_saved_session(config, tmp_path):
+    store = SessionStore(tmp_path / "session.json")
+    transport = conftest.get_backend(config).api.transport
+    login(transport)
+    expires_at = time.time() + 60
+
+    store.save(transport, "key_mock", expires_at)
+    other_transport = conftest.get_backend(config).api.transport
+
+    assert store.load(other_transport, "key_mock") == expires_at
+    assert other_transport.user_auth_token == "user_token_mock"
+    assert other_transport.partner_id == "partner_id_mock"
+    assert other_transport.server_sync_time == 1000
+    assert other_transport.start_time == 2000
+
+
+def test_save_does_not_store_credentials(config, tmp_path):
+    path = tmp_path / "session.json"
+    transport = conftest.get_backend(config).api.transport
+    login(transport)
+
+    key = SessionStore.session_key("host_mock", "partner_mock", "john")
+    SessionStore(path).save(transport, key, 0)
+
+    assert "john" not in path.read_text()
+    assert path.stat().st_mode & 0o077 == 0
+
+
+def test_load_ignores_other_users(config, tmp_path):
+    store = SessionStore(tmp_path / "session.json")
+    transport = conftest.get_backend(config).api.transport
+    login(transport)
+    store.save(transport, SessionStore.session_key("host_mock", "p", "john"), 0)
+
+    other_transport = conftest.get_backend(config).api.transport
+    key = SessionStore.session_key("host_mock", "p", "jane")
+
+    assert store.load(other_transport, key) is None
+    assert other_transport.user_auth_token is None
+
+
+def test_load_ignores_expired_session(config, tmp_path):
+    store = SessionStore(tmp_path / "session.json")
+    transport = conftest.get_backend(config).api.transport
+    login(transport)
+    store.save(transport, "key_mock", time.time() - 1)
+
+    assert store.load(conftest.get_backend(config).api.transport, "key_mock") is None
+
+
+def test_save_handles_errors(config, tmp_path, caplog):
+    store = SessionStore(tmp_path / "missing_dir" / "session.json")
+
+    store.save(conftest.get_backend(config).api.transport, "key_mock", 0)
+
+    assert "Error writing Pandora session to disk." in caplog.text
+
+
+def test_load_missing_returns_none(config, tmp_path):
+    store = SessionStore(tmp_path / "session.json")
+
+    assert store.load(conftest.get_backend(config).api.transport, "key_mock") is None
+
+
+def test_load_corrupt_file_returns_none(config, tmp_path, caplog):
+    path = tmp_path / "session.json"
+    path.write_text(json.dumps({"key": "key_mock"}))
+
+    transport = conftest.get_backend(config).api.transport
+
+    assert SessionStore(path).load(transport, "key_mock") is None
+    assert "Error reading Pandora session from disk." in caplog.text
@@ -0,0 +1,178 @@
+import json
+from unittest import mock
+
+import pytest
+import requests
+
+from mopidy_pandora import listener, tracing, utils
+from mopidy_pandora.tracing import (
+    FileSpanExporter,
+    OTLPSpanExporter,
+    SpanContext,
+    Tracer,
+)
+
+from . import conftest
+
+
+@pytest.fixture
+def exporter():
+    return mock.Mock(spec=FileSpanExporter)
+
+
+@pytest.fixture
+def tracer(exporter):
+    with mock.patch.object(tracing, "tracer", Tracer(exporter)) as tracer:
+        yield tracer
+
+
+def exported_spans(exporter):
+    return [c.args[0] for c in exporter.export.call_args_list]
+
+
+def test_traceparent():
+    context = SpanContext("a" * 32, "b" * 16)
+
+    assert context.traceparent == f"00-{'a' * 32}-{'b' * 16}-01"
+    assert SpanContext.from_traceparent(context.traceparent) == context
+    assert SpanContext.from_traceparent("invalid") is None
+    assert SpanContext.from_traceparent(None) is None
+
+
+def test_span_disabled():
+    tracer = Tracer()
+
+    with tracer.span("span_mock") as span:
+        assert span is None
+        assert tracer.current_traceparent() is None
+
+
+def test_nested_spans(tracer, exporter):
+    with tracer.span("parent_mock") as parent, tracer.span("child_mock") as child:
+        assert tracer.current_traceparent() == child.context.traceparent
+
+    assert tracer.current_traceparent() is None
+    assert exported_spans(exporter) == [child, parent]
+    assert child.context.trace_id == parent.context.trace_id
+    assert child.parent_id == parent.context.span_id
+    assert parent.parent_id is None
+    assert parent.end_time >= child.end_time
+
+
+def test_span_continues_traceparent(tracer):
+    context = SpanContext("a" * 32, "b" * 16)
+
+    with tracer.span("span_mock", traceparent=context.traceparent) as span:
+        assert span.context.trace_id == context.trace_id
+        assert span.parent_id == context.span_id
+
+
+def test_span_records_errors(tracer, exporter):
+    error = ValueError("error_mock")
+
+    with pytest.raises(ValueError, match="error_mock"), tracer.span("span_mock"):
+        raise error
+
+    span = exported_spans(exporter)[0]
+    assert span.status_code == tracing.STATUS_CODE_ERROR
+    assert span.status_message == "ValueError: error_mock"
+
+
+def test_span_context_is_passed_to_worker_pool(tracer):
+    with tracer.span("span_mock") as span:
+        future = utils.executor.submit(tracer.current_traceparent)
+
+    assert future.result(timeout=1.0) == span.context.traceparent
+
+
+def test_file_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(FileSpanExporter(path))
+
+    with tracer.span("span_mock", attributes={"count": 1, "uri": "uri_mock"}):
+        pass
+
+    request = json.loads(path.read_text())
+    span = request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["name"] == "span_mock"
+    assert span["attributes"] == [
+        {"key": "count", "value": {"intValue": "1"}},
+        {"key": "uri", "value": {"stringValue": "uri_mock"}},
+    ]
+
+
+def test_otlp_exporter_sends_spans_in_batches():
+    exporter = OTLPSpanExporter("http://collector_mock:4318/", delay=0.01)
+    exporter.session = mock.Mock(spec=requests.Session)
+    tracer = Tracer(exporter)
+
+    with tracer.span("first_mock"), tracer.span("second_mock"):
+        pass
+    exporter.scheduler.stop(timeout=1.0)
+    tracer.shutdown()
+
+    exporter.session.post.assert_called_once()
+    url = exporter.session.post.call_args.args[0]
+    spans = exporter.session.post.call_args.kwargs["json"]["resourceSpans"][0][
+        "scopeSpans"
+    ][0]["spans"]
+    assert url == "http://collector_mock:4318/v1/traces"
+    assert [span["name"] for span in spans] == ["second_mock", "first_mock"]
+    assert not tracer.enabled
+
+
+def test_get_exporter(config, tmp_path):
+    assert tracing.get_exporter(config) is None
+
+    config["pandora"]["tracing_file"] = tmp_path / "traces.jsonl"
+    assert isinstance(tracing.get_exporter(config), FileSpanExporter)
+
+    config["pandora"]["tracing_otlp_endpoint"] = "http://collector_mock:4318"
+    exporter = tracing.get_exporter(config)
+    assert isinstance(exporter, OTLPSpanExporter)
+    assert exporter.session.proxies["http"] == "host_mock:8080"
+
+
+def test_send_passes_traceparent(tracer):
+    with (
+        mock.patch.object(listener.listener, "send") as send_mock,
+        tracer.span("span_mock") as span,
+    ):
+        listener.PandoraFrontendListener.send("end_of_tracklist_reached")
+
+    send_mock.assert_called_once_with(
+        listener.PandoraFrontendListener,
+        "end_of_tracklist_reached",
+        traceparent=span.context.traceparent,
+    )
+
+
+def test_traced_listener_continues_trace(config, tracer, exporter):
+    backend = conftest.get_backend(config)
+    tracer.exporter = exporter
+    context = SpanContext("a" * 32, "b" * 16)
+
+    with mock.patch.object(backend, "prepare_next_track") as prepare_mock:
+        backend.on_event(
+            "end_of_tracklist_reached",
+            station_id="id_mock",
+            traceparent=context.traceparent,
+        )
+
+    prepare_mock.assert_called_once_with("id_mock", False)
+    span = exported_spans(exporter)[0]
+    assert span.name == "PandoraBackend.end_of_tracklist_reached"
+    assert span.parent_id == context.span_id
+
+
+def test_api_calls_are_traced(config, tracer, exporter):
+    backend = conftest.get_backend(config)
+    tracer.exporter = exporter
+
+    with mock.patch.object(type(backend.api.transport), "__call__", return_value={}):
+        backend.api("method.mock")
+
+    span = exported_spans(exporter)[0]
+    assert span.name == "method.mock"
+    assert span.kind == tracing.SPAN_KIND_CLIENT
+    assert span.attributes["rpc.method"] == "method.mock"
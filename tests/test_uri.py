@@ -24,6 +24,39 @@ def test_factory_unsupported_type():
         PandoraUri.factory(0)
 
 
+def test_pandora_uri_with_instance_type():
+    obj = PandoraUri("directory")
+
+    assert obj.uri == "pandora:directory"
+    assert PandoraUri.uri_type is None
+    assert "directory" not in PandoraUri.TYPES
+
+
+def test_factory_returns_shared_instance_for_uri_string():
+    mock_uri = "pandora:station:id_mock:token_mock"
+
+    obj = PandoraUri.factory(mock_uri)
+
+    assert PandoraUri.factory(mock_uri) is obj
+    assert PandoraUri.factory(models.Ref.track(uri=mock_uri)) is obj
+    with pytest.raises(AttributeError, match="Cannot modify shared Pandora URI"):
+        obj.token = "other_token_mock"
+    assert obj.uri == mock_uri
+
+
+def test_uri_is_cached_until_attributes_change():
+    obj = StationUri("id_mock", "token_mock")
+
+    assert obj.uri is obj.uri
+    obj.token = "other_token_mock"
+    assert obj.uri == "pandora:station:id_mock:other_token_mock"
+
+
+def test_uri_classes_use_slots():
+    assert not hasattr(PlaylistItemUri("id_mock", "token_mock"), "__dict__")
+    assert not hasattr(GenresUri(), "__dict__")
+
+
 def test_ad_uri_parse():
     mock_uri = "pandora:ad:id_mock:ad_token_mock"
     obj = PandoraUri._from_uri(mock_uri)
@@ -1,6 +1,8 @@
 import json
 import logging
 import queue
+import threading
+import time
 from unittest import mock
 
 import requests
@@ -64,15 +66,13 @@ def test_do_rpc_increments_id():
     json.loads = mock.PropertyMock()
 
     current_id = utils.RPCClient.id
-    t = utils.RPCClient._do_rpc("method_mock")
-    t.join()
+    utils.RPCClient._do_rpc("method_mock").result()
     assert utils.RPCClient.id == current_id + 1
 
 
 def test_run_async(caplog):
     caplog.set_level(logging.INFO)
-    t = async_func("test_1_async")
-    t.join()
+    async_func("test_1_async").result()
     assert "test_1_async" in caplog.text
 
 
@@ -84,8 +84,217 @@ def test_run_async_queue(caplog):
     assert "test_2_async" in caplog.text
 
 
+def test_run_async_returns_future():
+    future = async_func("test_3_async")
+    assert future.result(timeout=1.0) is None
+    assert future.done()
+
+
+def test_run_async_logs_exceptions(caplog):
+    @run_async
+    def failing_func():
+        raise ValueError
+
+    assert isinstance(failing_func().exception(timeout=1.0), ValueError)
+    assert "Error in asynchronous Pandora task." in caplog.text
+
+
+def test_run_async_uses_named_workers():
+    future = run_async(lambda: threading.current_thread().name)()
+    assert future.result(timeout=1.0).startswith("PandoraWorker")
+
+
+def test_bounded_executor_limits_queue_depth(caplog):
+    executor = utils.BoundedExecutor(max_workers=1, max_queue_size=1)
+    release = threading.Event()
+    try:
+        executor.submit(release.wait)
+        executor.submit(release.wait)
+
+        submitted = threading.Event()
+
+        def submit_third():
+            executor.submit(release.wait)
+            submitted.set()
+
+        threading.Thread(target=submit_third).start()
+        assert not submitted.wait(timeout=0.1)
+        assert "Pandora worker queue is full" in caplog.text
+
+        release.set()
+        assert submitted.wait(timeout=1.0)
+        assert executor.wait_idle(timeout=1.0)
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_bounded_executor_counts_active_and_queued_tasks():
+    executor = utils.BoundedExecutor(max_workers=1, max_queue_size=2)
+    started = threading.Event()
+    release = threading.Event()
+
+    def task():
+        started.set()
+        release.wait()
+
+    try:
+        executor.submit(task)
+        started.wait(timeout=1.0)
+        executor.submit(task)
+
+        assert executor.active_count == 1
+        assert executor.queued_count == 1
+
+        release.set()
+        assert executor.wait_idle(timeout=1.0)
+        assert executor.active_count == 0
+        assert executor.queued_count == 0
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_bounded_executor_releases_slot_of_cancelled_task():
+    executor = utils.BoundedExecutor(max_workers=1, max_queue_size=1)
+    release = threading.Event()
+    try:
+        executor.submit(release.wait)
+        queued = executor.submit(release.wait)
+        assert queued.cancel()
+        assert executor.queued_count == 0
+
+        release.set()
+        assert executor.wait_idle(timeout=1.0)
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_bounded_executor_runs_tasks_submitted_by_workers_inline_when_full():
+    executor = utils.BoundedExecutor(
+        max_workers=1, max_queue_size=0, thread_name_prefix="TestWorker"
+    )
+    try:
+
+        def outer():
+            inner = executor.submit(threading.current_thread)
+            return threading.current_thread(), inner.result(timeout=1.0)
+
+        outer_thread, inner_thread = executor.submit(outer).result(timeout=1.0)
+
+        assert inner_thread is outer_thread
+        assert executor.wait_idle(timeout=1.0)
+    finally:
+        executor.shutdown()
+
+
+def test_bounded_executor_does_not_log_task_errors(caplog):
+    executor = utils.BoundedExecutor(max_workers=1)
+    try:
+        future = executor.submit(mock.Mock(side_effect=ValueError))
+
+        assert isinstance(future.exception(timeout=1.0), ValueError)
+        assert "Error in asynchronous Pandora task." not in caplog.text
+    finally:
+        executor.shutdown()
+
+
+def test_scheduler_runs_calls_in_deadline_order(scheduler):
+    results = queue.Queue()
+    scheduler.call_later(0.05, results.put, "second")
+    scheduler.call_later(0.01, results.put, "first")
+
+    assert results.get(timeout=1.0) == "first"
+    assert results.get(timeout=1.0) == "second"
+
+
+def test_scheduler_skips_cancelled_calls(scheduler):
+    results = queue.Queue()
+    scheduler.call_later(0.01, results.put, "cancelled").cancel()
+    scheduler.call_later(0.02, results.put, "run")
+
+    assert results.get(timeout=1.0) == "run"
+    assert results.empty()
+
+
+def test_scheduler_uses_single_thread(scheduler):
+    results = queue.Queue()
+    for _ in range(10):
+        scheduler.call_later(0.01, lambda: results.put(threading.current_thread()))
+
+    threads = {results.get(timeout=1.0) for _ in range(10)}
+    assert len(threads) == 1
+    assert threads.pop().name == "PandoraScheduler"
+
+
+def test_scheduler_thread_exits_when_idle(scheduler):
+    done = threading.Event()
+    scheduler.call_later(0, done.set)
+    assert done.wait(timeout=1.0)
+
+    thread = scheduler._thread
+    if thread is not None:
+        thread.join(timeout=1.0)
+    assert scheduler._thread is None
+
+    done.clear()
+    scheduler.call_later(0, done.set)
+    assert done.wait(timeout=1.0)
+
+
 @run_async
 def async_func(text, queue: queue.Queue | None = None) -> None:
     logger.info(text)
     if queue:
         queue.put("test_value")
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flights = utils.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def call():
+        started.set()
+        release.wait(timeout=1.0)
+        return object()
+
+    func = mock.Mock(side_effect=call)
+    leader = utils.executor.submit(flights.do, "key_mock", func)
+    started.wait(timeout=1.0)
+    followers = [utils.executor.submit(flights.do, "key_mock", func) for _ in range(3)]
+    # Give the other callers time to join the call in progress.
+    time.sleep(0.1)
+    release.set()
+
+    result = leader.result(timeout=1.0)
+    assert all(f.result(timeout=1.0) is result for f in followers)
+    assert func.call_count == 1
+
+
+def test_single_flight_shares_exceptions():
+    flights = utils.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def call():
+        started.set()
+        release.wait(timeout=1.0)
+        raise requests.exceptions.ConnectionError
+
+    leader = utils.executor.submit(flights.do, "key_mock", call)
+    started.wait(timeout=1.0)
+    follower = utils.executor.submit(flights.do, "key_mock", call)
+    # Give the other callers time to join the call in progress.
+    time.sleep(0.1)
+    release.set()
+
+    for future in (leader, follower):
+        assert isinstance(future.exception(timeout=1.0), requests.ConnectionError)
+
+
+def test_single_flight_does_not_cache_completed_calls():
+    flights = utils.SingleFlight()
+    func = mock.Mock(side_effect=[1, 2])
+
+    assert flights.do("key_mock", func) == 1
+    assert flights.do("key_mock", func) == 2